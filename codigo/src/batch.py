@@ -0,0 +1,400 @@
+"""
+Generador de Mapas Topográficos 3D - Exportación por lotes (sin servidor ni navegador)
+Recorre un barrido de semillas y/o una rejilla de parámetros, genera cada terreno y lo
+exporta (PNG/SVG/NPY) en un pool de procesos. Cada mapa terminado se anota en
+manifest.jsonl; al relanzar el mismo comando se reanuda desde el manifiesto.
+
+Uso:
+    python run.py batch --out generados/lote --seeds 1-1000 --formats png,npy
+    python batch.py --out lote --seeds 1-50 --grid terrain_roughness=20,50,80 --grid azimuth_angle=45,315
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Asegurar que el directorio src esté en el path
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from controller import config
+from controller.config import CRATER_PARAMS, DEFAULT_HEIGHT, DEFAULT_WIDTH, TERRAIN_PARAMS, VISUAL_PARAMS
+
+MANIFEST_NAME = 'manifest.jsonl'
+FORMATS = ('png', 'svg', 'npy')
+
+# Secciones de parámetros (mismo orden que MapController.handle_update)
+SECTIONS = (
+    ('terrain', TERRAIN_PARAMS),
+    ('visual', VISUAL_PARAMS),
+    ('craters', CRATER_PARAMS),
+)
+
+# Modelo reutilizado por cada proceso del pool: (ancho, alto, backend) -> MapModel
+_worker_models = {}
+
+
+# ============== Rejilla de parámetros ============================
+
+def parse_seeds(spec):
+    """
+    Semillas de una especificación tipo '1-100', '7,9,12' o '1-10,50'.
+
+    Returns:
+        Lista de semillas en orden y sin duplicados
+    """
+    seeds = []
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            lo, hi = (int(v) for v in part.split('-', 1))
+            if hi < lo:
+                raise ValueError(f"Rango de semillas invertido: {part}")
+            seeds.extend(range(lo, hi + 1))
+        else:
+            seeds.append(int(part))
+    if not seeds:
+        raise ValueError(f"Especificación de semillas vacía: {spec!r}")
+    return list(dict.fromkeys(seeds))
+
+
+def _parse_value(text):
+    """Valor de la línea de comandos: JSON si se puede (50, 0.4, true), si no texto ('#ff7825')"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def resolve_key(key):
+    """
+    Sección de un parámetro: 'terrain_roughness' o con prefijo 'visual.azimuth_angle'.
+
+    Returns:
+        (sección, nombre)
+    """
+    if '.' in key:
+        section, name = key.split('.', 1)
+        if section not in dict(SECTIONS):
+            raise ValueError(f"Sección desconocida: {section} (terrain, visual, craters)")
+        return section, name
+    matches = [section for section, defaults in SECTIONS if key in defaults]
+    if len(matches) != 1:
+        raise ValueError(f"Parámetro desconocido o ambiguo: {key} (usa sección.parámetro)")
+    return matches[0], key
+
+
+def parse_grid(entries, grid_file=None):
+    """
+    Ejes de la rejilla desde --grid clave=v1,v2,... y/o un JSON {clave: [valores]}.
+
+    Returns:
+        Lista de ((sección, nombre), [valores]) en orden de aparición
+    """
+    axes = {}
+    if grid_file:
+        with open(grid_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for key, values in data.items():
+            axes[resolve_key(key)] = values if isinstance(values, list) else [values]
+    for entry in entries or []:
+        if '=' not in entry:
+            raise ValueError(f"Eje de rejilla inválido: {entry!r} (esperado clave=v1,v2,...)")
+        key, values = entry.split('=', 1)
+        axes[resolve_key(key.strip())] = [_parse_value(v.strip()) for v in values.split(',')]
+    return list(axes.items())
+
+
+def expand_items(axes, seeds=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, backend=None):
+    """
+    Producto cartesiano de la rejilla (y las semillas): un trabajo por mapa.
+    El id de cada trabajo es un hash de sus parámetros, estable entre ejecuciones.
+    """
+    axes = list(axes)
+    if seeds is not None:
+        axes = [axis for axis in axes if axis[0] != ('terrain', 'seed')] + [(('terrain', 'seed'), list(seeds))]
+    backend = str(backend or getattr(config, 'NOISE_BACKEND', 'fbm')).lower()
+    keys = [key for key, _ in axes]
+    for combo in itertools.product(*(values for _, values in axes)):
+        params = {section: {} for section, _ in SECTIONS}
+        for (section, name), value in zip(keys, combo):
+            params[section][name] = value
+        yield {
+            'id': item_id(params, width, height, backend),
+            'params': params,
+            'width': int(width),
+            'height': int(height),
+            'backend': backend,
+        }
+
+
+def item_id(params, width, height, backend):
+    """Id estable de un mapa: semilla legible + hash de parámetros, tamaño y backend"""
+    canonical = json.dumps([params, int(width), int(height), backend], sort_keys=True, separators=(',', ':'))
+    digest = hashlib.blake2b(canonical.encode('utf-8'), digest_size=5).hexdigest()
+    seed = params.get('terrain', {}).get('seed', TERRAIN_PARAMS['seed'])
+    return f"s{seed}_{digest}"
+
+
+def validate_axes(axes):
+    """Valida cada valor de la rejilla con las reglas del modelo (falla antes de lanzar el pool)"""
+    from model.map_model import MapModel
+    model = MapModel(2, 2)
+    validators = {
+        'terrain': model._validate_terrain_params,
+        'visual': model._validate_visual_params,
+        'craters': model._validate_crater_params,
+    }
+    for (section, name), values in axes:
+        for value in values:
+            if name not in validators[section]({name: value}):
+                raise ValueError(f"Parámetro no soportado: {section}.{name}")
+
+
+# ============== Manifiesto ============================
+
+def load_manifest(out_dir):
+    """
+    Últimos registros del manifiesto por id (los de una línea cortada se ignoran).
+
+    Returns:
+        Dict id -> registro
+    """
+    records = {}
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # escritura interrumpida
+            if isinstance(record, dict) and 'id' in record:
+                records[record['id']] = record
+    return records
+
+
+def is_complete(record, formats):
+    """True si el registro terminó bien y tiene todos los formatos pedidos"""
+    return bool(record) and record.get('status') == 'ok' and set(formats) <= set(record.get('files', {}))
+
+
+# ============== Worker ============================
+
+def _init_worker():
+    """Initializer del pool: backend de matplotlib sin ventanas"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _get_model(width, height, backend):
+    from model.map_model import MapModel
+    key = (width, height, backend)
+    model = _worker_models.get(key)
+    if model is None:
+        # Cada mapa del lote es distinto: la caché de heightmaps nunca acertaría
+        model = _worker_models[key] = MapModel(width, height, cache={'max_bytes': 0})
+    return model
+
+
+def run_item(job):
+    """
+    Genera y exporta un mapa (proceso del pool).
+
+    Args:
+        job: (item, out_dir, formats, scale, include_grid, verbose)
+
+    Returns:
+        Registro del manifiesto ('status': 'ok' | 'error')
+    """
+    import numpy as np
+    from view.visualization import export_map_clean
+
+    item, out_dir, formats, scale, include_grid, verbose = job
+    start = time.perf_counter()
+    record = {'id': item['id'], 'params': item['params'], 'width': item['width'],
+              'height': item['height'], 'backend': item['backend']}
+    # El backend del mapa solo rige durante este trabajo (con workers=1 es el proceso principal)
+    previous_backend = config.NOISE_BACKEND
+    try:
+        config.NOISE_BACKEND = item['backend']
+        model = _get_model(item['width'], item['height'], item['backend'])
+        model.reset_to_defaults()
+        params = item['params']
+        model.update_terrain_params(**params.get('terrain', {}))
+        model.update_visual_params(**params.get('visual', {}))
+        model.update_crater_params(**params.get('craters', {}))
+        terrain = model.generate()
+
+        files = {}
+        for fmt in formats:
+            name = f"{item['id']}.{fmt}"
+            path = os.path.join(out_dir, name)
+            # Restos de una ejecución interrumpida: se reescriben
+            if os.path.exists(path):
+                os.remove(path)
+            if fmt == 'npy':
+                np.save(path, terrain)
+            else:
+                quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+                with quiet:
+                    export_map_clean(model.generator, model.visual_params, fmt=fmt, save_path=path,
+                                     include_grid=include_grid, scale=scale)
+            files[fmt] = name
+        record.update(status='ok', files=files, stats={
+            'min_height': float(terrain.min()),
+            'max_height': float(terrain.max()),
+        })
+    except Exception as e:
+        record.update(status='error', error=f"{type(e).__name__}: {e}")
+    finally:
+        config.NOISE_BACKEND = previous_backend
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+# ============== Ejecución ============================
+
+def run_batch(items, out_dir, formats=('png',), workers=0, scale=1, include_grid=None,
+              resume=True, verbose=False, log=print):
+    """
+    Ejecuta el lote: reparte los mapas pendientes en un pool de procesos y anota
+    cada resultado en el manifiesto en cuanto termina.
+
+    Args:
+        items: Trabajos de expand_items
+        out_dir: Directorio de salida (se crea si no existe)
+        formats: Subconjunto de FORMATS
+        workers: Procesos (0 = todos los núcleos, 1 = en este proceso)
+        resume: Saltar los mapas ya completos según el manifiesto
+        log: Función de salida de progreso
+
+    Returns:
+        Dict con contadores: total, skipped, ok, errors
+    """
+    formats = tuple(formats)
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Formatos no soportados: {', '.join(sorted(unknown))}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    done = load_manifest(out_dir) if resume else {}
+    items = list({item['id']: item for item in items}.values())
+    pending = [item for item in items if not is_complete(done.get(item['id']), formats)]
+    counts = {'total': len(items), 'skipped': len(items) - len(pending), 'ok': 0, 'errors': 0}
+    if counts['skipped']:
+        log(f"Reanudando: {counts['skipped']} de {counts['total']} mapas ya están en el manifiesto")
+
+    workers = int(workers or 0)
+    workers = max(1, workers if workers > 0 else (os.cpu_count() or 1))
+    jobs = ((item, out_dir, formats, scale, include_grid, verbose) for item in pending)
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    # Una línea cortada por una interrupción no debe pegarse al siguiente registro
+    needs_newline = False
+    if os.path.isfile(manifest_path) and os.path.getsize(manifest_path) > 0:
+        with open(manifest_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+
+    with open(manifest_path, 'a', encoding='utf-8') as manifest:
+        if needs_newline:
+            manifest.write('\n')
+        def record_result(record):
+            manifest.write(json.dumps(record, sort_keys=True) + '\n')
+            manifest.flush()
+            finished = counts['ok'] + counts['errors'] + 1
+            if record['status'] == 'ok':
+                counts['ok'] += 1
+                log(f"[{finished}/{len(pending)}] {record['id']} ok ({record['seconds']:.2f}s)")
+            else:
+                counts['errors'] += 1
+                log(f"[{finished}/{len(pending)}] {record['id']} ERROR: {record['error']}")
+
+        if workers == 1 or len(pending) <= 1:
+            _init_worker()
+            for job in jobs:
+                record_result(run_item(job))
+            return counts
+
+        # Envío acotado: miles de mapas sin encolar miles de futures
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker) as pool:
+            in_flight = set()
+            try:
+                for job in itertools.chain(jobs, [None]):
+                    if job is not None:
+                        in_flight.add(pool.submit(run_item, job))
+                    while in_flight and (job is None or len(in_flight) >= 2 * workers):
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            record_result(future.result())
+            except KeyboardInterrupt:
+                for future in in_flight:
+                    future.cancel()
+                raise
+    return counts
+
+
+def _parse_args(argv=None):
+    """Parsea argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(
+        prog='batch',
+        description='Exportación por lotes de mapas topográficos (barrido de semillas / rejilla de parámetros)'
+    )
+    parser.add_argument('--out', required=True, help='Directorio de salida (contiene manifest.jsonl)')
+    parser.add_argument('--seeds', default=None, help="Semillas: '1-1000', '3,7,9' o combinaciones")
+    parser.add_argument('--grid', action='append', default=[], metavar='CLAVE=V1,V2',
+                        help="Eje de la rejilla (repetible), p. ej. terrain_roughness=20,50,80 o visual.azimuth_angle=45,315")
+    parser.add_argument('--grid-file', default=None, help='JSON {clave: [valores]} con más ejes de la rejilla')
+    parser.add_argument('--formats', default='png', help=f"Formatos separados por comas ({', '.join(FORMATS)})")
+    parser.add_argument('--width', type=int, default=DEFAULT_WIDTH, help='Ancho del terreno')
+    parser.add_argument('--height', type=int, default=DEFAULT_HEIGHT, help='Alto del terreno')
+    parser.add_argument('--backend', default=None, help="Backend de ruido ('fbm', 'perlin', 'spectral')")
+    parser.add_argument('--scale', type=int, choices=(1, 2, 4), default=1, help='Escala de exportación PNG/SVG')
+    parser.add_argument('--no-grid', action='store_true', help='Exportar sin grilla ni ejes')
+    parser.add_argument('--workers', type=int, default=0, help='Procesos (0 = todos los núcleos, 1 = sin pool)')
+    parser.add_argument('--no-resume', action='store_true', help='Ignorar el manifiesto y regenerar todo')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar la salida de cada exportación')
+    return parser, parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Punto de entrada del modo por lotes. Devuelve el código de salida"""
+    parser, args = _parse_args(argv)
+    try:
+        axes = parse_grid(args.grid, args.grid_file)
+        seeds = parse_seeds(args.seeds) if args.seeds else None
+        validate_axes(axes + ([(('terrain', 'seed'), seeds)] if seeds else []))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    formats = [f.strip().lower() for f in args.formats.split(',') if f.strip()]
+    items = expand_items(axes, seeds, width=args.width, height=args.height, backend=args.backend)
+
+    start = time.perf_counter()
+    try:
+        counts = run_batch(
+            items, args.out, formats=formats, workers=args.workers, scale=args.scale,
+            include_grid=False if args.no_grid else None,
+            resume=not args.no_resume, verbose=args.verbose
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        print("\nInterrumpido. Relanza el mismo comando para reanudar desde el manifiesto.")
+        return 130
+    print(f"\nLote terminado en {time.perf_counter() - start:.1f}s: {counts['ok']} generados, "
+          f"{counts['skipped']} ya existentes, {counts['errors']} con error -> {args.out}")
+    return 1 if counts['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
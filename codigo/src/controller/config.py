@@ -41,6 +41,8 @@ VISUAL_PARAMS = {
     'azimuth_angle': 315,
     'line_color': '#ff7825',
     'sea_level': 0.0,        # Nivel del mar (líneas bajo este nivel son punteadas)
+    # Render de contornos: 'merged' (máx. 2 colecciones: sólida/punteada) o 'per_level'
+    'contour_mode': 'merged',
     # Controles de ejes y grilla (UI web)
     'show_axis_labels': True,
     'grid_color': '#00ffff',
@@ -60,12 +62,38 @@ WINDOW_CONFIG = {
     }
 }
 
+# Caché de heightmaps por parámetros de generación
+# (LRU en memoria con presupuesto en bytes + nivel opcional de archivos .npy)
+HEIGHTMAP_CACHE = {
+    'max_bytes': 256 * 1024 * 1024,
+    'disk_dir': None,            # p. ej. 'generados/cache' para persistir entre sesiones
+    'disk_max_bytes': 2 * 1024 * 1024 * 1024,
+}
+
 # Configuración de renderizado
 RENDER_CONFIG = {
     'preview_dpi': 150,
     'export_dpi': 300,
     'default_format': 'png',
     'available_scales': [1, 2, 4],
+    # 'matplotlib' (mplot3d, con etiquetas de ejes) o 'raster' (proyección NumPy + Agg directo, sin etiquetas)
+    'preview_backend': 'matplotlib',
+    # Preview progresiva: mapas con al menos estos píxeles muestran antes un borrador
+    # diezmado (máx. draft_max_pixels) renderizado con el backend raster a draft_dpi
+    'progressive_min_pixels': 1_000_000,
+    'draft_max_pixels': 250_000,
+    'draft_dpi': 72,
+    # El borrador cuesta ~25-40% de la generación completa (el ruido se sortea a
+    # resolución completa para que sea el mismo terreno): se omite si la última
+    # generación completa del mismo tamaño y backend tardó menos de draft_min_seconds
+    'draft_min_seconds': 0.5,
+    # Exportación SVG: 'native' (escritor directo por capas, view/svg_writer.py) o
+    # 'matplotlib' (savefig SVG + metadata + utils/svg_optimizer.py)
+    'svg_backend': 'native',
+    # Paths SVG (ambos backends): decimales de las coordenadas y tolerancia de simplificación
+    # Douglas-Peucker en px/pt de salida (0 = sin simplificar)
+    'svg_precision': 2,
+    'svg_simplify_tolerance': 0.0,
 }
 
 # Dimensiones del terreno (16:9)
@@ -79,12 +107,35 @@ DEFAULT_WIDTH = 160
 DEFAULT_HEIGHT = 90
 
 # Backend y límites de robustez
-# Backend de ruido: 'perlin' o 'fbm' (fbm recomendado para alto rendimiento)
+# Backend de ruido: 'perlin' (vectorizado con NumPy), 'fbm' o 'spectral' (síntesis FFT 1/f^beta)
 NOISE_BACKEND = 'fbm'
 
 # Límites para evitar bloqueos por valores extremos
 SEED_MIN = 1
 SEED_MAX = 10_000_000
 MAX_OCTAVES = 7
-# Si la resolución es muy alta, conmutar Perlin -> fBm automáticamente
-PERLIN_MAX_PIXELS = 160_000
+# Densidad máxima de cráteres (estampado por lotes, cientos por mapa)
+MAX_CRATERS = 500
+# Conmutación opcional Perlin -> fBm por resolución (None = sin límite;
+# el backend Perlin es vectorizado y ya escala a mapas 4K+)
+PERLIN_MAX_PIXELS = None
+
+# Generación por teselas con halo (memoria acotada para mapas gigantes)
+# Mapas con al menos TILED_MIN_PIXELS se generan por bloques (None = nunca)
+TILED_MIN_PIXELS = 4096 * 4096
+TILE_SIZE = 1024
+# Bloque fijo del ruido blanco en modo teselado: el resultado no depende de TILE_SIZE
+TILE_NOISE_BLOCK = 256
+
+# Paralelismo opcional del fBm (octavas o teselas): None/1 = en serie, 0 = todos los núcleos.
+# El resultado es idéntico con cualquier número de workers.
+FBM_WORKERS = None
+# Pool de concurrent.futures de las teselas: 'process' (spawn) o 'thread'.
+# El fBm sin teselar usa siempre hilos (franjas sobre arrays compartidos)
+FBM_EXECUTOR = 'process'
+
+# Exportaciones en segundo plano (pool de procesos, view/export_jobs.py)
+# Procesos del pool: 0 = todos los núcleos
+EXPORT_WORKERS = 0
+# Trabajos terminados que se conservan para consulta/descarga
+EXPORT_JOBS_KEEP = 32
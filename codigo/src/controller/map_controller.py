@@ -1,3 +1,4 @@
+import math
 import os
 import sys
 from typing import Dict, Any, Optional
@@ -8,7 +9,7 @@ if __name__ == "__main__":
 
 from model.map_model import MapModel
 from controller.render_controller import RenderController
-from .config import VISUAL_PARAMS
+from .config import RENDER_CONFIG, VISUAL_PARAMS
 
 class MapController:
     """
@@ -25,15 +26,19 @@ class MapController:
     
     # ============== Actualizacion de parametros ===========================
 
-    def handle_update(self, params: dict) -> Dict[str, Any]:
+    def handle_update(self, params: dict, on_draft=None) -> Dict[str, Any]:
         """
         Handles the update if params and regenerate the map
 
         Args:
             params: Dict with keywords 'terrain', 'visual', 'craters'
+            on_draft: Optional callback(draft_generator) for progressive rendering.
+                Called with a low-resolution draft before regenerating a large
+                terrain (see draft_factor); returning False cancels the update.
 
         Returns:
-            Dict with result: {'ok': bool, 'preview': str, 'error': str}
+            Dict with result: {'ok': bool, 'preview': str, 'error': str},
+            plus 'cancelled': True if on_draft cancelled it
         """
         try:
             # Actualizar los parametros del modelo
@@ -58,8 +63,17 @@ class MapController:
             if 'craters' in params:
                 self.model.update_crater_params(**params['craters'])
 
-            # Regenerar terreno
-            heightmap = self.model.generate()
+            # Regenerar terreno solo si cambiaron parámetros de terreno/cráteres;
+            # los cambios visuales pasan directamente al render
+            if self.model.terrain_dirty:
+                # Progresivo: borrador de baja resolución antes del terreno completo,
+                # salvo que el heightmap completo ya esté en la caché
+                factor = 1
+                if on_draft is not None and not self.model.has_cached_terrain():
+                    factor = self.draft_factor()
+                if factor > 1 and on_draft(self.model.generate_draft(factor)) is False:
+                    return {'ok': True, 'cancelled': True}
+                self.model.generate()
 
             # If we have a preview dir, render a preview path for UI/tests
             result = {
@@ -79,6 +93,28 @@ class MapController:
         except Exception as e:
             return {'ok': False, 'error': f"Error inesperado: {str(e)}"}
         
+    def draft_factor(self) -> int:
+        """
+        Decimation of the progressive draft for the current map size.
+
+        Returns:
+            1 (no draft) below RENDER_CONFIG['progressive_min_pixels'] or when the
+            last full generation of this size took less than
+            RENDER_CONFIG['draft_min_seconds'] (the draft would only delay it),
+            otherwise the factor that brings the draft under
+            RENDER_CONFIG['draft_max_pixels']
+        """
+        min_pixels = RENDER_CONFIG.get('progressive_min_pixels')
+        max_pixels = max(1, int(RENDER_CONFIG.get('draft_max_pixels', 250_000)))
+        generator = self.model.generator
+        pixels = int(generator.width) * int(generator.height)
+        if not min_pixels or pixels < min_pixels:
+            return 1
+        seconds = self.model.expected_generate_seconds()
+        if seconds is not None and seconds < float(RENDER_CONFIG.get('draft_min_seconds') or 0):
+            return 1
+        return max(1, math.ceil(math.sqrt(pixels / max_pixels)))
+        
     def handle_terrain_update(self, **kwargs) -> Dict[str, Any]:
         """Actualiza solo parametros del terreno"""
         return self.handle_update({'terrain': kwargs})
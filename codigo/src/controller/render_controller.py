@@ -10,13 +10,17 @@ from typing import Dict, Any
 if __name__ == "__main__":
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from controller import config
+
 # Importar funciones de visualización
 from view.visualization import (
     export_preview_image as _export_preview,
+    render_preview_png as _render_preview_png,
     export_map_clean as _export_clean,
     export_with_dialog as _export_dialog,
     ensure_unique_path
 )
+from view.raster_preview import get_raster_renderer as _get_raster_renderer
 
 
 class RenderController:
@@ -43,9 +47,38 @@ class RenderController:
         Returns:
             Ruta del archivo generado
         """
-        _export_preview(generator, visual_params, output_path)
+        backend = config.RENDER_CONFIG.get('preview_backend', 'matplotlib')
+        _export_preview(generator, visual_params, output_path, backend=backend)
         return output_path
     
+    def render_preview_bytes(self, generator, visual_params: Dict[str, Any]) -> bytes:
+        """
+        Genera el preview del mapa en memoria, sin escribir a disco.
+        
+        Args:
+            generator: Instancia de TopographicMapGenerator
+            visual_params: Parámetros de visualización
+            
+        Returns:
+            Bytes del PNG
+        """
+        backend = config.RENDER_CONFIG.get('preview_backend', 'matplotlib')
+        return _render_preview_png(generator, visual_params, backend=backend)
+    
+    def render_draft_bytes(self, draft_generator, visual_params: Dict[str, Any]) -> bytes:
+        """
+        Genera el borrador de la preview progresiva (backend raster a baja resolución).
+        
+        Args:
+            draft_generator: Generador borrador (ver MapModel.generate_draft)
+            visual_params: Parámetros de visualización
+            
+        Returns:
+            Bytes del PNG
+        """
+        dpi = int(config.RENDER_CONFIG.get('draft_dpi', 72))
+        return _get_raster_renderer(dpi).render(draft_generator, visual_params)
+    
     def export_map(
         self,
         generator,
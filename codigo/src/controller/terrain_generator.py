@@ -1,10 +1,40 @@
 """
 Módulo de generación de terreno topográfico
 """
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
 import numpy as np
-from noise import pnoise3
 from scipy.ndimage import gaussian_filter
 from . import config
+from .perlin_noise import PerlinNoise
+from .spectral_noise import decimate_noise, decimated_standard_normal, spectral_terrain
+
+# Suavizado final aplicado al terreno base
+SMOOTH_SIGMA = 0.8
+
+
+def _gaussian_radius(sigma, truncate=4.0):
+    """Radio del kernel que usa scipy.ndimage.gaussian_filter"""
+    return int(truncate * float(sigma) + 0.5)
+
+
+def _filtered_noise_std(sigma, truncate=4.0):
+    """Desviación típica de ruido blanco unitario tras gaussian_filter 2D.
+
+    El kernel 2D es separable (k ⊗ k), así que std = sum(k**2).
+    """
+    r = _gaussian_radius(sigma, truncate)
+    x = np.arange(-r, r + 1, dtype=np.float64)
+    k = np.exp(-0.5 * (x / float(sigma)) ** 2)
+    k /= k.sum()
+    return float((k ** 2).sum())
 
 
 class TopographicMapGenerator:
@@ -17,10 +47,56 @@ class TopographicMapGenerator:
         self.fig = None
         self.ax = None
         self.last_backend = None
+        # Resultados intermedios de generate_terrain (ver _generate_unit_relief)
+        self._stages = {}
+        # Etapas recalculadas en la última llamada (diagnóstico)
+        self.last_stages = ()
+        # Píxeles del mapa completo por celda y tamaño de ese mapa (borradores, ver make_draft)
+        self.cell_size = 1
+        self.full_size = None
+
+    def make_draft(self, factor):
+        """Generador borrador con la malla diezmada 1/factor por eje.
+
+        factor se redondea a la potencia de 2 inferior (máx. 64). Las escalas
+        (ruido, suavizado, radio y centros de cráteres) siguen en píxeles del
+        mapa completo y el ruido blanco es el mismo flujo promediado por
+        bloques, así que con los mismos parámetros y semilla el borrador es
+        una versión de baja resolución del mismo terreno.
+        """
+        factor = 1 << (min(max(1, int(factor)), 64).bit_length() - 1)
+        full_w, full_h = self._full_shape()
+        draft = TopographicMapGenerator(
+            width=max(2, -(-full_w // factor)),
+            height=max(2, -(-full_h // factor))
+        )
+        draft.cell_size = factor
+        draft.full_size = (full_w, full_h)
+        return draft
+
+    def _full_shape(self):
+        """(ancho, alto) del mapa completo al que corresponde esta malla"""
+        if self.full_size is not None:
+            return self.full_size
+        return int(self.width), int(self.height)
         
     def generate_terrain(self, terrain_roughness, height_variation, seed,
-                         crater_enabled, num_craters, crater_size, crater_depth, base_height=20.0):
-        """Genera el terreno usando Perlin noise 3D"""
+                         crater_enabled, num_craters, crater_size, crater_depth, base_height=20.0,
+                         tiled=None, out=None):
+        """Genera el terreno usando Perlin noise o fBm.
+
+        tiled: None = automático (config.TILED_MIN_PIXELS), True/False fuerza el modo.
+        out: array float32 (width, height) preasignado donde escribir el terreno,
+             p. ej. np.lib.format.open_memmap(...) para mapas mayores que la RAM.
+             Implica modo teselado.
+
+        Las etapas se memorizan entre llamadas: cambiar solo base_height es una
+        suma, cambiar height_variation reescala el relieve suavizado en caché y
+        cambiar los cráteres los vuelve a aplicar sobre ese relieve. En modo
+        teselado (mapas grandes, salvo borradores) no se memoriza nada y cada
+        etapa se aplica in situ sobre el mismo array, para no retener varias
+        copias del mapa.
+        """
         # Normalizar/limitar semillas muy grandes para evitar bloqueos o valores extremos
         try:
             seed = int(seed)
@@ -31,7 +107,6 @@ class TopographicMapGenerator:
         if seed < getattr(config, 'SEED_MIN', 1):
             seed = getattr(config, 'SEED_MIN', 1)
         np.random.seed(seed)
-        rng = np.random.default_rng(int(seed))
         
         # Conversión de parámetros intuitivos a técnicos
         # Permitir valores mínimos bajos para terreno plano
@@ -39,138 +114,238 @@ class TopographicMapGenerator:
         octaves = max(1, int(1 + terrain_roughness * 0.05))
         octaves = min(octaves, getattr(config, 'MAX_OCTAVES', 7))
         persistence = 0.1 + terrain_roughness * 0.004
-        # Desplazamiento z moderado para evitar enormes saltos con semillas gigantes
-        z_offset = (seed % 100000) / 100.0
-        # Backend automático
-        pixels = int(self.width) * int(self.height)
-        configured_backend = getattr(config, 'NOISE_BACKEND', 'fbm').lower()
-        backend = configured_backend
-        if configured_backend == 'perlin' and pixels > getattr(config, 'PERLIN_MAX_PIXELS', 160_000):
-            backend = 'fbm'
+        base_sigma = max(1.0, scale * 0.25)
+        # Escalas en píxeles del mapa completo -> celdas de esta malla
+        cell = int(self.cell_size)
+        scale /= cell
+        base_sigma /= cell
+        backend, tiled = self.resolve_mode(tiled=tiled, out=out)
         self.last_backend = backend
 
-        # Generación del terreno base
-        if backend == 'perlin':
-            self.terrain = np.zeros((self.width, self.height), dtype=np.float32)
-            base_val = int(seed % (2**31 - 1))
-            for i in range(self.width):
-                for j in range(self.height):
-                    value = pnoise3(
-                        i / scale, j / scale, z_offset,
-                        octaves=octaves,
-                        persistence=persistence,
-                        lacunarity=2.0,
-                        repeatx=1024, repeaty=1024, repeatz=1024,
-                        base=base_val
-                    )
-                    self.terrain[i, j] = value
-            self.terrain *= float(height_variation)
-        else:
-            self.terrain = self._generate_fbm_terrain(
-                width=self.width,
-                height=self.height,
-                base_sigma=max(1.0, scale * 0.25),
+        # Etapas memorizadas: relieve unitario (ruido + suavizado + normalización)
+        # -> escala de altura y cráteres -> altura base. Cada etapa solo se
+        # recalcula si cambian sus parámetros. En modo teselado (incluido `out`)
+        # no se memoriza nada: unidad, relieve y terreno serían ~3 copias del mapa
+        # (los borradores sí, su malla es pequeña).
+        memo = out is None and (not tiled or cell > 1)
+        base_key = (int(self.width), int(self.height), cell, seed, backend, bool(tiled),
+                    float(scale), int(octaves), float(persistence))
+        stages = self._stages if memo else {}
+        recomputed = []
+
+        unit = stages.get('unit') if stages.get('base_key') == base_key else None
+        if unit is None:
+            unit = self._generate_unit_relief(
+                backend=backend,
+                seed=seed,
+                scale=scale,
+                base_sigma=base_sigma,
                 octaves=octaves,
                 persistence=persistence,
-                rng=rng
-            ).astype(np.float32)
-            self.terrain *= float(height_variation)
+                tiled=tiled,
+                out=out
+            )
+            stages = {'base_key': base_key, 'unit': unit}
+            recomputed.append('noise')
 
-        # Suavizado del terreno
-        self.terrain = gaussian_filter(self.terrain, sigma=0.8)
+        with_craters = bool(crater_enabled) and int(num_craters) > 0
+        crater_key = (
+            float(height_variation),
+            (int(num_craters), float(crater_size), float(crater_depth)) if with_craters else None
+        )
+        relief = stages.get('relief') if stages.get('crater_key') == crater_key else None
+        if relief is None:
+            # Ruido, suavizado y normalización son lineales en height_variation:
+            # basta reescalar el relieve unitario (rango [0, height_variation * (max - min)])
+            if memo:
+                relief = unit * np.float32(height_variation)
+            else:
+                unit *= np.float32(height_variation)
+                relief = unit
+
+            # Aplicar cráteres DESPUÉS de normalización
+            # Así los cráteres se aplican sobre una base estable y mantienen su efecto
+            if with_craters:
+                self._apply_craters_visible(
+                    num_craters=int(num_craters),
+                    crater_size=float(crater_size),
+                    crater_depth=float(crater_depth),
+                    rng=np.random.default_rng(int(seed)),
+                    terrain=relief
+                )
+            stages['crater_key'] = crater_key
+            stages['relief'] = relief
+            recomputed.append('relief')
 
-        # Normalizar terreno ANTES de cráteres para tener base consistente
-        # Esto asegura que el terreno base esté en rango [0, height_variation]
-        min_val = float(self.terrain.min())
-        self.terrain -= min_val
-        
-        # Aplicar cráteres DESPUÉS de normalización
-        # Así los cráteres se aplican sobre una base estable y mantienen su efecto
-        if crater_enabled and num_craters > 0:
-            self._apply_craters_visible(
-                num_craters=int(num_craters),
-                crater_size=float(crater_size),
-                crater_depth=float(crater_depth),
-                rng=rng
-            )
-        
         # Añadir altura base mínima para efecto "pastel" AL FINAL
         # Esto asegura que siempre haya profundidad visible
-        self.terrain += float(base_height)
+        if memo:
+            terrain = relief + np.float32(base_height)
+        else:
+            relief += np.float32(base_height)
+            terrain = relief
+        recomputed.append('base_height')
+
+        # Publicar el terreno terminado de una vez: quien lea self.terrain desde
+        # otro hilo nunca ve un mapa a medio construir (sin cráteres o sin base)
+        self.terrain = terrain
+
+        # Sin memo el relieve unitario se ha transformado in situ: no reutilizable
+        self._stages = stages if memo else {}
+        self.last_stages = tuple(recomputed)
 
         np.random.seed(None)
 
-    def _apply_craters_visible(self, num_craters, crater_size, crater_depth, rng):
+    def resolve_mode(self, tiled=None, out=None):
+        """Backend y modo teselado que usará generate_terrain con la configuración actual.
+
+        Dependen del tamaño del mapa completo (PERLIN_MAX_PIXELS, TILED_MIN_PIXELS),
+        así que un borrador resuelve lo mismo que su mapa. Ambos cambian el
+        heightmap resultante para una misma semilla.
+
+        Returns:
+            (backend, tiled) efectivos
+        """
+        full_w, full_h = self._full_shape()
+        pixels = full_w * full_h
+        backend = str(getattr(config, 'NOISE_BACKEND', 'fbm')).lower()
+        perlin_limit = getattr(config, 'PERLIN_MAX_PIXELS', None)
+        if backend == 'perlin' and perlin_limit and pixels > perlin_limit:
+            backend = 'fbm'
+
+        tiled_min = getattr(config, 'TILED_MIN_PIXELS', None)
+        if tiled is None:
+            tiled = out is not None or bool(tiled_min and pixels >= tiled_min)
+        if tiled and backend == 'spectral':
+            # La FFT es global: por teselas se usa fBm (mismo espectro medio)
+            backend = 'fbm'
+        return backend, bool(tiled)
+
+    def _generate_unit_relief(self, backend, seed, scale, base_sigma, octaves, persistence,
+                              tiled, out=None):
+        """Etapa base: ruido + suavizado + desplazamiento a mínimo 0, con height_variation = 1.
+
+        Devuelve el relieve desplazado a mínimo 0, sin reescalar: rango
+        [0, max - min] del ruido suavizado (float32). Es la etapa cara del
+        pipeline y no depende de height_variation, cráteres ni altura base.
+        """
+        if tiled:
+            # Ruido + suavizado por teselas sobre la salida preasignada
+            unit = self._generate_tiled_terrain(
+                backend=backend,
+                seed=seed,
+                scale=scale,
+                base_sigma=base_sigma,
+                octaves=octaves,
+                persistence=persistence,
+                height_variation=1.0,
+                out=out
+            )
+        else:
+            if backend == 'perlin':
+                unit = PerlinNoise(seed).fractal(
+                    width=self.width,
+                    height=self.height,
+                    scale=scale,
+                    octaves=octaves,
+                    persistence=persistence,
+                    lacunarity=2.0
+                )
+            elif backend == 'spectral':
+                full_w, full_h = self._full_shape()
+                unit = spectral_terrain(
+                    width=full_w,
+                    height=full_h,
+                    base_sigma=base_sigma * self.cell_size,
+                    octaves=octaves,
+                    persistence=persistence,
+                    seed=seed,
+                    decimate=self.cell_size
+                )
+            else:
+                unit = self._generate_fbm_terrain(
+                    width=self.width,
+                    height=self.height,
+                    base_sigma=base_sigma,
+                    octaves=octaves,
+                    persistence=persistence,
+                    seed=seed
+                ).astype(np.float32)
+            # Suavizado del terreno (en modo teselado ya se aplicó por bloque)
+            unit = gaussian_filter(unit, sigma=SMOOTH_SIGMA / float(self.cell_size))
+
+        # Normalizar terreno ANTES de cráteres para tener base consistente
+        unit -= np.float32(unit.min())
+        return unit
+
+    def _apply_craters_visible(self, num_craters, crater_size, crater_depth, rng, terrain=None):
         """Cráteres visibles para cualquier variación de altura/rugosidad.
         - Profundidad controlada por crater_depth (0.1 a 1.0)
         - Centro hundido con transición suave
         - Rim (borde) elevado más pronunciado
         - El cráter más nuevo domina en zonas solapadas
+
+        Todos los cráteres comparten radio, así que el perfil radial se
+        precalcula una vez (_crater_stamp) como tres coeficientes por celda y
+        cada cráter se estampa con dos operaciones in situ sobre su ventana.
+        `terrain` es el array a modificar (por defecto self.terrain).
         """
+        num_craters = int(num_craters)
+        if num_craters <= 0:
+            return
+        if terrain is None:
+            terrain = self.terrain
         # Relieve global (evitar 0)
-        relief = float(np.ptp(self.terrain)) or 1.0
+        relief = float(np.ptp(terrain)) or 1.0
         # Amplitud del cráter: componente ABSOLUTA + componente relativa
         # Esto asegura que los cráteres sean visibles incluso en terrenos planos
         depth_factor = np.clip(crater_depth, 0.1, 1.0)
         # Profundidad base absoluta (5.0 unidades) + profundidad relativa al terreno
         amp = (5.0 + relief * 0.35) * depth_factor
-        # Aplanado del parche para ganar contraste (0..1)
-        flatten = 0.6
-
-        for _ in range(int(num_craters)):
-            # Radio base según control de tamaño
-            R = int(12 + crater_size * 25)
-            R = max(5, min(R, min(self.width, self.height) // 2 - 2))
-            rim_w = max(2, int(0.25 * R))  # Rim más ancho
-
-            # Centro aleatorio evitando bordes
-            margin = 6 + R + rim_w
-            if (self.width <= 2 * margin) or (self.height <= 2 * margin):
-                # Si el terreno es muy pequeño, caer en el centro
-                cx = self.width // 2
-                cy = self.height // 2
-            else:
-                cx = int(rng.integers(margin, self.width - margin))
-                cy = int(rng.integers(margin, self.height - margin))
-
-            # Ventana del parche
-            ix0 = max(0, cx - (R + rim_w))
-            ix1 = min(self.width, cx + (R + rim_w) + 1)
-            jy0 = max(0, cy - (R + rim_w))
-            jy1 = min(self.height, cy + (R + rim_w) + 1)
-
-            # Malla de distancias (recordar: shape = (width, height))
-            ii, jj = np.ogrid[ix0:ix1, jy0:jy1]
-            r = np.sqrt((ii - cx) ** 2 + (jj - cy) ** 2)
-
-            # Perfil lunar mejorado
-            profile = np.zeros((ix1 - ix0, jy1 - jy0), dtype=float)
-            r0 = 0.65 * R  # radio del fondo plano
-            # Fondo plano hundido (más profundo según crater_depth)
-            profile[r <= r0] = -amp
-            # Transición suave al borde
-            mask_trans = (r > r0) & (r <= R)
-            if mask_trans.any():
-                t = (r[mask_trans] - r0) / (R - r0)
-                profile[mask_trans] = -amp * (1.0 - (3.0 * t**2 - 2.0 * t**3))
-            # Rim elevado MÁS PRONUNCIADO
-            mask_rim = (r > R) & (r <= R + rim_w)
-            if mask_rim.any():
-                tr = (r[mask_rim] - R) / rim_w
-                # Elevación más alta y más visible
-                bell = np.exp(-((tr - 0.35) ** 2) / (2 * 0.15**2))
-                profile[mask_rim] += 0.8 * amp * bell  # Aumentado de 0.55 a 0.8
-
-            # Aplanar el parche para aumentar contraste
-            patch = self.terrain[ix0:ix1, jy0:jy1].copy()
-            baseline = float(patch.mean())
-            mask_all = r <= (R + rim_w)
-            patch[mask_all] = (1 - flatten) * patch[mask_all] + flatten * baseline
-
-            # Sobrescritura suave priorizando el cráter actual
-            weight = np.clip(1.0 - (r / (R + rim_w)) ** 2, 0.0, 1.0)
-            combined = patch * (1 - 0.85 * weight) + (baseline + profile) * (0.85 * weight)
-            self.terrain[ix0:ix1, jy0:jy1] = np.where(mask_all, combined, self.terrain[ix0:ix1, jy0:jy1])
+
+        # Radio y centros en píxeles del mapa completo (cell_size > 1 en borradores)
+        cell = int(self.cell_size)
+        full_w, full_h = self._full_shape()
+
+        # Radio base según control de tamaño
+        R = int(12 + crater_size * 25)
+        R = max(5, min(R, min(full_w, full_h) // 2 - 2))
+        rim_w = max(2, int(0.25 * R))  # Rim más ancho
+
+        # Centros aleatorios evitando bordes (mismo orden de sorteo: x, y por cráter)
+        margin = 6 + R + rim_w
+        if (full_w <= 2 * margin) or (full_h <= 2 * margin):
+            # Si el terreno es muy pequeño, caer en el centro
+            centers = np.tile([full_w // 2, full_h // 2], (num_craters, 1))
+        else:
+            centers = rng.integers([margin, margin], [full_w - margin, full_h - margin],
+                                   size=(num_craters, 2))
+        if cell != 1:
+            centers = np.minimum(np.rint(centers / cell).astype(int), [self.width - 1, self.height - 1])
+            R = max(1, int(round(R / cell)))
+            rim_w = max(1, int(round(rim_w / cell)))
+        ext = R + rim_w
+
+        # Estampado: dentro del disco nuevo = parche * keep + media * mix + offset
+        keep, mix, shape = _crater_stamp(R, rim_w)
+        offset = (amp * shape).astype(terrain.dtype)
+        keep = keep.astype(terrain.dtype)
+        mix = mix.astype(terrain.dtype)
+        scratch = np.empty_like(offset)
+
+        # En orden de creación: cada cráter ve los anteriores (el más nuevo domina)
+        for cx, cy in centers.tolist():
+            ix0, ix1 = max(0, cx - ext), min(self.width, cx + ext + 1)
+            jy0, jy1 = max(0, cy - ext), min(self.height, cy + ext + 1)
+            window = (slice(ix0 - (cx - ext), ix1 - (cx - ext)),
+                      slice(jy0 - (cy - ext), jy1 - (cy - ext)))
+            patch = terrain[ix0:ix1, jy0:jy1]
+            baseline = patch.mean()
+            tmp = scratch[window]
+            np.multiply(mix[window], baseline, out=tmp)
+            tmp += offset[window]
+            patch *= keep[window]
+            patch += tmp
 
     def get_heightmap_payload(self):
         """Serializa el hieghmap para el visor WebGL"""
@@ -183,6 +358,41 @@ class TopographicMapGenerator:
             'z': hm.astype(np.float32).tolist()
         }
     
+    def get_heightmap_binary(self, fmt='f32'):
+        """Serializa el heightmap como bytes little-endian para el visor WebGL.
+
+        El orden es el plano que espera el visor (z[j * width + i], es decir
+        terrain.T en orden C), así el cliente lo envuelve en un Float32Array
+        sin copias ni JSON.
+
+        Args:
+            fmt: 'f32' (float32) o 'u16' (cuantizado a [min, max] en 65535 pasos)
+
+        Returns:
+            (bytes, meta) con meta = {'width', 'height', 'min', 'max', 'format'},
+            o (None, meta) si aún no hay terreno
+        """
+        fmt = str(fmt).lower()
+        if fmt not in ('f32', 'u16'):
+            raise ValueError(f"fmt debe ser 'f32' o 'u16', recibido: {fmt}")
+        hm = getattr(self, 'terrain', None)
+        meta = {'width': int(self.width), 'height': int(self.height),
+                'min': 0.0, 'max': 0.0, 'format': fmt}
+        if hm is None:
+            return None, meta
+
+        mn, mx = float(hm.min()), float(hm.max())
+        meta['min'], meta['max'] = mn, mx
+        if fmt == 'f32':
+            data = np.ascontiguousarray(hm.T, dtype='<f4')
+        else:
+            scale = 65535.0 / (mx - mn) if mx > mn else 0.0
+            q = np.subtract(hm.T, mn, dtype=np.float32, order='C')
+            q *= np.float32(scale)
+            q += np.float32(0.5)
+            data = q.astype('<u2')
+        return data.tobytes(), meta
+
     def set_heightmap(self, z, normalize=True):
         """Permite cargar un heightmap externo (Para segunda fase)"""
         z = np.asarray(z, dtype=np.float32)
@@ -192,20 +402,409 @@ class TopographicMapGenerator:
                 z = (z - mn) / (mx - mn)
         self.terrain = z
         self.width, self.height = int(z.shape[0]), int(z.shape[1])
+        self._stages = {}
+
+    def set_heightmap_bytes(self, data, fmt='f32', width=None, height=None, normalize=True):
+        """Carga un heightmap externo desde un buffer binario sin listas intermedias.
 
-    def _generate_fbm_terrain(self, width, height, base_sigma, octaves, persistence, rng):
-        """fBm 2D vectorizado usando suma de ruidos gaussianos multi-escala."""
+        Los formatos crudos usan el mismo orden plano que get_heightmap_binary
+        (z[j * width + i]) y se envuelven con np.frombuffer, sin copia.
+
+        Args:
+            data: bytes/bytearray/memoryview con el contenido
+            fmt: 'f32' (float32 LE), 'u16' (uint16 LE) o 'png' (PNG en escala de grises, 8/16 bits)
+            width, height: dimensiones, obligatorias para los formatos crudos
+            normalize: reescalar a [0, 1] como set_heightmap
+
+        Returns:
+            (width, height) del heightmap cargado
+        """
+        fmt = str(fmt).lower()
+        if fmt == 'png':
+            try:
+                from PIL import Image
+            except ImportError as e:
+                raise ValueError("Se requiere Pillow para importar PNG") from e
+            import io
+            with Image.open(io.BytesIO(data)) as img:
+                if img.mode not in ('I;16', 'I;16B', 'I', 'L'):
+                    img = img.convert('L')
+                rows = np.asarray(img)
+            if rows.ndim != 2:
+                raise ValueError(f"PNG debe ser de un canal, recibido: {rows.shape}")
+            # Filas de la imagen = eje y del terreno
+            z = rows.T
+        elif fmt in ('f32', 'u16'):
+            try:
+                width, height = int(width), int(height)
+            except (TypeError, ValueError):
+                raise ValueError("width y height son obligatorios para formatos crudos")
+            if width < 2 or height < 2:
+                raise ValueError(f"Dimensiones inválidas: {width}x{height}")
+            dtype = np.dtype('<f4') if fmt == 'f32' else np.dtype('<u2')
+            expected = width * height * dtype.itemsize
+            nbytes = memoryview(data).nbytes
+            if nbytes != expected:
+                raise ValueError(f"Tamaño del buffer {nbytes} != {expected} ({width}x{height} {fmt})")
+            z = np.frombuffer(data, dtype=dtype).reshape(height, width).T
+        else:
+            raise ValueError(f"fmt debe ser 'f32', 'u16' o 'png', recibido: {fmt}")
+
+        # Única copia: conversión a float32 (el buffer crudo es de solo lectura)
+        if normalize or z.dtype != np.float32:
+            z = z.astype(np.float32)
+        if normalize:
+            mn, mx = float(z.min()), float(z.max())
+            z -= np.float32(mn)
+            if mx > mn:
+                z *= np.float32(1.0 / (mx - mn))
+        self.terrain = z
+        self.width, self.height = int(z.shape[0]), int(z.shape[1])
+        self._stages = {}
+        return self.width, self.height
+
+    def _generate_fbm_terrain(self, width, height, base_sigma, octaves, persistence, seed):
+        """fBm 2D vectorizado usando suma de ruidos gaussianos multi-escala.
+
+        Cada octava usa su propio flujo aleatorio (SeedSequence.spawn), así que
+        las octavas, y el filtrado de cada una por franjas, pueden calcularse en
+        paralelo (FBM_WORKERS, ver _banded_fbm_octaves) y el resultado es
+        idéntico bit a bit con cualquier número de workers.
+        """
+        streams = np.random.SeedSequence(int(seed)).spawn(int(octaves))
+        # Borrador: mismo ruido de la malla completa promediado por bloques
+        cell = int(self.cell_size)
+        shape = self._full_shape() if cell > 1 else (int(width), int(height))
+        jobs = [
+            (shape, max(0.6, float(base_sigma) * cell / 2 ** k) / cell, stream, cell)
+            for k, stream in enumerate(streams)
+        ]
+        workers = _resolve_workers()
+        if workers > 1:
+            # Franjas con halo: escala con los workers aunque haya pocas octavas
+            fields = _banded_fbm_octaves(jobs, workers)
+        else:
+            fields = (_fbm_octave(job) for job in jobs)
         acc = np.zeros((width, height), dtype=np.float32)
         amp = 1.0
-        sigma = float(base_sigma)
-        for _ in range(int(octaves)):
-            n = rng.standard_normal((width, height), dtype=np.float32)
-            s = max(0.6, sigma)
-            f = gaussian_filter(n, sigma=s, mode='reflect')
-            std = float(f.std()) or 1.0
-            f = f / std
+        # Acumulación en orden fijo de octava (determinista)
+        for f in fields:
             acc += amp * f
             amp *= float(persistence)
-            sigma /= 2.0
         m = float(np.max(np.abs(acc))) or 1.0
         return (acc / m)
+
+    def _generate_tiled_terrain(self, backend, seed, scale, base_sigma, octaves, persistence,
+                                height_variation, out=None):
+        """Genera ruido base + suavizado por teselas con halo.
+
+        Cada tesela se calcula sobre una ventana ampliada con un halo igual al
+        radio del mayor kernel gaussiano (octava base + suavizado final), de modo
+        que el núcleo recortado coincide con filtrar el campo completo y no hay
+        costuras. La memoria de trabajo depende de TILE_SIZE, no del mapa.
+        Las teselas se reparten entre FBM_WORKERS si está configurado.
+        """
+        W, H = int(self.width), int(self.height)
+        if out is None:
+            out = np.empty((W, H), dtype=np.float32)
+        elif out.shape != (W, H):
+            raise ValueError(f"out debe tener forma {(W, H)}, recibido: {out.shape}")
+
+        tile = max(16, int(getattr(config, 'TILE_SIZE', 1024)))
+        block = int(getattr(config, 'TILE_NOISE_BLOCK', 256))
+        # Borrador: sigmas en celdas de esta malla (bloques de ruido diezmados)
+        cell = int(self.cell_size)
+        halo = _gaussian_radius(SMOOTH_SIGMA / cell)
+        if backend != 'perlin':
+            halo += _gaussian_radius(max(0.6, base_sigma * cell) / cell)
+
+        jobs = []
+        for x0 in range(0, W, tile):
+            for y0 in range(0, H, tile):
+                x1, y1 = min(W, x0 + tile), min(H, y0 + tile)
+                window = (max(0, x0 - halo), min(W, x1 + halo), max(0, y0 - halo), min(H, y1 + halo))
+                jobs.append((backend, (x0, x1, y0, y1), window, seed, scale, base_sigma,
+                             octaves, persistence, block, cell))
+
+        peak = 0.0
+        for (x0, x1, y0, y1), core, core_peak in _parallel_map(_render_tile, jobs, _resolve_workers()):
+            out[x0:x1, y0:y1] = core
+            peak = max(peak, core_peak)
+
+        # Escala final (lineal, conmuta con el suavizado)
+        factor = float(height_variation)
+        if backend != 'perlin':
+            factor /= (peak or 1.0)
+        out *= np.float32(factor)
+        return out
+
+
+@lru_cache(maxsize=32)
+def _crater_stamp(R, rim_w, flatten=0.6, blend=0.85):
+    """Coeficientes del estampado de un cráter de radio R (perfil radial tabulado).
+
+    Sobre la ventana (2*(R+rim_w)+1)^2 centrada en el cráter, el resultado es
+    parche * keep + media_del_parche * mix + amp * shape, equivalente a aplanar
+    el parche hacia su media (flatten) y mezclarlo con media + perfil lunar con
+    peso blend * (1 - (r/(R+rim_w))^2). Fuera del disco keep = 1 y mix = shape = 0.
+
+    Returns:
+        (keep, mix, shape) arrays float64 de solo lectura
+    """
+    ext = R + rim_w
+    ii, jj = np.ogrid[-ext:ext + 1, -ext:ext + 1]
+    r = np.sqrt(ii ** 2 + jj ** 2)
+
+    # Perfil lunar con amplitud unitaria
+    profile = np.zeros(r.shape, dtype=float)
+    r0 = 0.65 * R  # radio del fondo plano
+    # Fondo plano hundido
+    profile[r <= r0] = -1.0
+    # Transición suave al borde
+    mask_trans = (r > r0) & (r <= R)
+    t = (r[mask_trans] - r0) / (R - r0)
+    profile[mask_trans] = -(1.0 - (3.0 * t**2 - 2.0 * t**3))
+    # Rim elevado
+    mask_rim = (r > R) & (r <= ext)
+    tr = (r[mask_rim] - R) / rim_w
+    profile[mask_rim] += 0.8 * np.exp(-((tr - 0.35) ** 2) / (2 * 0.15**2))
+
+    # Sobrescritura suave priorizando el cráter actual
+    mask_all = r <= ext
+    weight = blend * np.clip(1.0 - (r / ext) ** 2, 0.0, 1.0)
+    keep = np.where(mask_all, (1.0 - flatten) * (1.0 - weight), 1.0)
+    mix = np.where(mask_all, flatten * (1.0 - weight) + weight, 0.0)
+    shape = np.where(mask_all, profile * weight, 0.0)
+    for arr in (keep, mix, shape):
+        arr.setflags(write=False)
+    return keep, mix, shape
+
+
+# ---- Trabajo por octava / tesela (nivel de módulo para poder usar procesos) ----
+
+def _resolve_workers():
+    """Número de workers configurado (None/1 = en serie, 0 = todos los núcleos)"""
+    workers = getattr(config, 'FBM_WORKERS', None)
+    if workers is None:
+        return 1
+    workers = int(workers)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    return max(1, workers)
+
+
+# Pools persistentes por tipo ('thread' / 'process'): crear y cerrar uno por
+# llamada cuesta caro (con spawn cada worker relanza el intérprete)
+_pools = {}          # tipo -> (workers, executor) en uso para nuevos trabajos
+_pool_users = {}     # executor -> llamadas que aún le envían trabajos
+_retired = set()     # executors reemplazados: se cierran cuando quedan sin usuarios
+_pool_lock = threading.Lock()
+
+
+def _new_pool(kind, workers):
+    if kind == 'thread':
+        return ThreadPoolExecutor(max_workers=workers)
+    # spawn: el servidor tiene hilos (planificador, threadpool del hub, exportaciones)
+    # y fork no es seguro con hilos; mismo contexto que view/export_jobs.py
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+@contextmanager
+def _borrow_pool(kind, workers):
+    """Pool del módulo para (tipo, workers) mientras dure el bloque.
+
+    Si cambia la configuración se crea otro; el anterior sigue vivo hasta que
+    terminen las llamadas que lo usan (p. ej. borrador y mapa completo a la vez).
+    """
+    with _pool_lock:
+        spec_workers, pool = _pools.get(kind, (None, None))
+        if pool is None or spec_workers != workers:
+            if not _pools and not _retired:
+                atexit.register(_shutdown_pools)
+            if pool is not None:
+                _retired.add(pool)
+            pool = _new_pool(kind, workers)
+            _pools[kind] = (workers, pool)
+        _pool_users[pool] = _pool_users.get(pool, 0) + 1
+    try:
+        yield pool
+    except BrokenExecutor:
+        # Un worker murió: el siguiente uso crea un pool nuevo
+        with _pool_lock:
+            if _pools.get(kind, (None, None))[1] is pool:
+                del _pools[kind]
+                _retired.add(pool)
+        raise
+    finally:
+        with _pool_lock:
+            _pool_users[pool] -= 1
+            close = pool in _retired and not _pool_users[pool]
+            if close:
+                _retired.discard(pool)
+                del _pool_users[pool]
+        if close:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _shutdown_pools():
+    """Cierra todos los pools del módulo (registrado con atexit)"""
+    with _pool_lock:
+        pools = [pool for _, pool in _pools.values()] + list(_retired)
+        _pools.clear()
+        _retired.clear()
+        _pool_users.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _parallel_map(fn, jobs, workers):
+    """map() ordenado, en serie o sobre el pool persistente del módulo (FBM_EXECUTOR).
+
+    Como mucho 2 * workers trabajos en vuelo (igual que batch.py), así que los
+    resultados pendientes de consumir no se acumulan en memoria.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield fn(job)
+        return
+    kind = str(getattr(config, 'FBM_EXECUTOR', 'process')).lower()
+    with _borrow_pool('thread' if kind == 'thread' else 'process', workers) as pool:
+        in_flight = deque()
+        try:
+            for job in jobs:
+                in_flight.append(pool.submit(fn, job))
+                if len(in_flight) >= 2 * workers:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _banded_fbm_octaves(jobs, workers):
+    """Octavas del fBm sin teselar repartidas entre `workers` hilos.
+
+    Cada octava sortea su ruido en un trabajo propio (mismo flujo que
+    _fbm_octave) y el filtro gaussiano se aplica por franjas de filas con un
+    halo igual al radio del kernel, así que el resultado es idéntico bit a bit
+    al de la versión en serie. Se usan hilos con los arrays en memoria
+    compartida (el RNG de NumPy y scipy.ndimage liberan el GIL), sin enviar la
+    malla entre procesos. Como mucho `workers` octavas a la vez.
+    """
+    with _borrow_pool('thread', workers) as pool:
+        for first in range(0, len(jobs), workers):
+            group = jobs[first:first + workers]
+            noises = list(pool.map(_fbm_noise, [(shape, stream, decimate)
+                                                for shape, _, stream, decimate in group]))
+            fields = [np.empty_like(n) for n in noises]
+            rows = len(noises[0])
+            step = max(64, -(-rows // (2 * workers)))
+            bands = [
+                (n, sigma, x0, min(rows, x0 + step), f)
+                for n, f, (_, sigma, _, _) in zip(noises, fields, group)
+                for x0 in range(0, rows, step)
+            ]
+            for _ in pool.map(_filter_band, bands):
+                pass
+            del noises, bands
+            for f in fields:
+                std = float(f.std()) or 1.0
+                f /= std
+                yield f
+
+
+def _fbm_noise(job):
+    """Ruido blanco de una octava; con decimate > 1 promediado por bloques (borrador)"""
+    shape, stream, decimate = job
+    rng = np.random.default_rng(stream)
+    if decimate > 1:
+        return decimated_standard_normal(rng, shape, decimate)
+    return rng.standard_normal(shape, dtype=np.float32)
+
+
+def _filter_band(job):
+    """Filtra las filas [x0:x1) de `noise` en `out` (halo = radio del kernel: mismo resultado)"""
+    noise, sigma, x0, x1, out = job
+    r = _gaussian_radius(sigma)
+    lo, hi = max(0, x0 - r), min(len(noise), x1 + r)
+    out[x0:x1] = gaussian_filter(noise[lo:hi], sigma=sigma, mode='reflect')[x0 - lo:x1 - lo]
+
+
+def _fbm_octave(job):
+    """Una octava del fBm: ruido blanco propio filtrado y normalizado.
+
+    Con decimate > 1, shape es la malla completa y el ruido se promedia por
+    bloques decimate x decimate (borrador del mismo terreno).
+    """
+    shape, sigma, stream, decimate = job
+    n = _fbm_noise((shape, stream, decimate))
+    f = gaussian_filter(n, sigma=sigma, mode='reflect')
+    std = float(f.std()) or 1.0
+    f /= std
+    return f
+
+
+def _render_tile(job):
+    """Calcula una tesela (ventana con halo), la suaviza y devuelve el núcleo"""
+    (backend, (x0, x1, y0, y1), (hx0, hx1, hy0, hy1), seed, scale, base_sigma, octaves, persistence,
+     block, decimate) = job
+    peak = 0.0
+    if backend == 'perlin':
+        field = PerlinNoise(seed).fractal(
+            width=hx1 - hx0, height=hy1 - hy0, scale=scale,
+            octaves=octaves, persistence=persistence, lacunarity=2.0,
+            x0=hx0, y0=hy0
+        )
+    else:
+        field = _fbm_window(hx0, hx1, hy0, hy1, base_sigma, octaves, persistence, seed, block, decimate)
+        # Pico global del fBm antes de suavizar (normalización /max|acc|)
+        peak = float(np.max(np.abs(field[x0 - hx0:x1 - hx0, y0 - hy0:y1 - hy0])))
+    field = gaussian_filter(field, sigma=SMOOTH_SIGMA / decimate, mode='reflect')
+    return (x0, x1, y0, y1), field[x0 - hx0:x1 - hx0, y0 - hy0:y1 - hy0], peak
+
+
+def _fbm_window(x0, x1, y0, y1, base_sigma, octaves, persistence, seed, block, decimate=1):
+    """fBm sobre la ventana [x0:x1, y0:y1] del mapa con ruido direccionable.
+
+    El ruido blanco se genera por bloques fijos de `block` celdas con semilla
+    (seed, octava, bx, by), así que cualquier ventana reproduce exactamente los
+    mismos valores que sus vecinas en la zona compartida. La normalización por
+    octava usa la desviación teórica del filtro. Con decimate > 1 las
+    coordenadas y sigmas están en celdas de la malla diezmada.
+    """
+    acc = np.zeros((x1 - x0, y1 - y0), dtype=np.float32)
+    amp = 1.0
+    sigma = float(base_sigma)
+    for octave in range(int(octaves)):
+        n = _block_noise(x0, x1, y0, y1, seed, octave, block, decimate)
+        s = max(0.6, sigma * decimate) / decimate
+        f = gaussian_filter(n, sigma=s, mode='reflect')
+        acc += np.float32(amp / _filtered_noise_std(s)) * f
+        amp *= float(persistence)
+        sigma /= 2.0
+    return acc
+
+
+def _block_noise(x0, x1, y0, y1, seed, octave, block, decimate=1):
+    """Ruido normal estándar de la ventana, ensamblado desde bloques fijos.
+
+    Con decimate > 1 cada bloque se promedia por celdas decimate x decimate
+    (block debe ser múltiplo de decimate) y la ventana está en esas celdas.
+    """
+    full_block, block = block, block // decimate
+    n = np.empty((x1 - x0, y1 - y0), dtype=np.float32)
+    for bx in range(x0 // block, (x1 - 1) // block + 1):
+        for by in range(y0 // block, (y1 - 1) // block + 1):
+            rng = np.random.default_rng([int(seed), int(octave), bx, by])
+            values = rng.standard_normal((full_block, full_block), dtype=np.float32)
+            if decimate > 1:
+                values = decimate_noise(values, decimate)
+            # Intersección bloque / ventana
+            ax0, ax1 = max(x0, bx * block), min(x1, (bx + 1) * block)
+            ay0, ay1 = max(y0, by * block), min(y1, (by + 1) * block)
+            n[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = values[
+                ax0 - bx * block:ax1 - bx * block,
+                ay0 - by * block:ay1 - by * block
+            ]
+    return n
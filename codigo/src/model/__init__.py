@@ -1,3 +1,4 @@
 from .map_model import MapModel
+from .heightmap_cache import HeightmapCache
 
-__all__ = ['MapModel']
\ No newline at end of file
+__all__ = ['MapModel', 'HeightmapCache']
\ No newline at end of file
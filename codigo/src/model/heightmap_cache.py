@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Bump when the generation pipeline changes so stale disk entries are ignored
+CACHE_VERSION = 2
+
+
+class HeightmapCache:
+    """
+    Content-addressed LRU cache of generated heightmaps.
+    Responsible for:
+    - Deriving a stable key from the generation parameters.
+    - Keeping recent heightmaps in memory within a byte budget.
+    - Optionally persisting them as .npy files in a disk tier.
+    - Counting hits, misses and evictions.
+    """
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 disk_max_bytes: Optional[int] = None):
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(**params) -> str:
+        """
+        Stable hash of the generation parameters.
+
+        Floats are rounded so that 8 and 8.0 map to the same key; crater
+        settings are ignored when craters are disabled.
+        """
+        normalized = {}
+        for name, value in params.items():
+            if isinstance(value, (bool, np.bool_)):
+                value = bool(value)
+            elif isinstance(value, (int, float, np.integer, np.floating)):
+                value = round(float(value), 6)
+            normalized[name] = value
+        if not normalized.get('crater_enabled', False):
+            for name in ('num_craters', 'crater_size', 'crater_depth'):
+                normalized.pop(name, None)
+        normalized['_version'] = CACHE_VERSION
+        payload = json.dumps(normalized, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached heightmap (read-only) or None"""
+        with self._lock:
+            hm = self._entries.get(key)
+            if hm is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return hm
+
+        hm = self._load_from_disk(key)
+        with self._lock:
+            if hm is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, hm)
+            return hm
+
+    def __contains__(self, key: str) -> bool:
+        """True if get(key) would hit (memory or disk); counters are not touched"""
+        with self._lock:
+            if key in self._entries:
+                return True
+        path = self._disk_path(key)
+        return bool(path) and os.path.isfile(path)
+
+    def put(self, key: str, heightmap: np.ndarray) -> np.ndarray:
+        """
+        Store a heightmap. The array is marked read-only (no copy) so that
+        later in-place edits cannot corrupt the cached value.
+
+        Returns:
+            The stored (read-only) array
+        """
+        hm = np.asarray(heightmap)
+        hm.setflags(write=False)
+        with self._lock:
+            self._insert(key, hm)
+        self._save_to_disk(key, hm)
+        return hm
+
+    def clear(self):
+        """Drop the memory tier (disk files are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and occupancy of the cache"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    # =============== Internals ========================
+
+    def _insert(self, key: str, hm: np.ndarray):
+        """Insert under the lock, evicting least-recently-used entries"""
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key).nbytes
+        if hm.nbytes > self.max_bytes:
+            # Too large for the memory tier: keep only on disk
+            return
+        self._entries[key] = hm
+        self._bytes += hm.nbytes
+        while self._bytes > self.max_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f'{key}.npy')
+
+    def _load_from_disk(self, key: str) -> Optional[np.ndarray]:
+        path = self._disk_path(key)
+        if not path or not os.path.isfile(path):
+            return None
+        try:
+            hm = np.load(path, allow_pickle=False)
+            os.utime(path)  # LRU order of the disk tier
+        except Exception:
+            return None
+        hm.setflags(write=False)
+        return hm
+
+    def _save_to_disk(self, key: str, hm: np.ndarray):
+        path = self._disk_path(key)
+        if not path or os.path.exists(path):
+            return
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, hm, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._prune_disk()
+
+    def _prune_disk(self):
+        """Remove the oldest .npy files while the disk tier exceeds its budget"""
+        if not self.disk_max_bytes:
+            return
+        try:
+            files = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir)
+                     if name.endswith('.npy')]
+            files = [(os.path.getmtime(p), os.path.getsize(p), p) for p in files]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                pass
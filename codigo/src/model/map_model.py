@@ -1,19 +1,26 @@
 import os
 import sys
+import time
 from typing import Optional, Dict, Any
 
+import numpy as np
+
 # Asegurar que el directorio src esté en el path
 if __name__ == "__main__":
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from controller.terrain_generator import TopographicMapGenerator
+from controller import config as generator_config
 from controller.config import (
     TERRAIN_PARAMS,
     VISUAL_PARAMS,
     CRATER_PARAMS,
     DEFAULT_WIDTH,
-    DEFAULT_HEIGHT
+    DEFAULT_HEIGHT,
+    HEIGHTMAP_CACHE,
+    MAX_CRATERS
 )
+from model.heightmap_cache import HeightmapCache
 
 class MapModel:
     """
@@ -23,7 +30,14 @@ class MapModel:
     - Validating changes to parameters.
     - Coordinating the terrain generation process.
     """
-    def __init__(self, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT):
+    def __init__(self, width: int = DEFAULT_WIDTH, height: int = DEFAULT_HEIGHT,
+                 cache: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            width, height: Terrain size in cells
+            cache: HeightmapCache arguments (default HEIGHTMAP_CACHE);
+                {'max_bytes': 0} keeps nothing, for one-off generations
+        """
         # Deep copy of default parameters to avoid mutation
         self.terrain_params = TERRAIN_PARAMS.copy()  # Initialize terrain parameters
         self.visual_params = VISUAL_PARAMS.copy()    # Initialize visual parameters
@@ -32,8 +46,17 @@ class MapModel:
         # Initialize the terrain generator
         self._generator = TopographicMapGenerator(width, height)
 
+        # Heightmaps already generated, keyed by generation parameters
+        self._cache = HeightmapCache(**(HEIGHTMAP_CACHE if cache is None else cache))
+
         # Internal state
         self._last_heightmap: Optional[Any] = None
+        # Generator of the last progressive draft (see generate_draft)
+        self._draft: Optional[TopographicMapGenerator] = None
+        # Terrain must be (re)generated: terrain/crater params changed since last generate()
+        self._terrain_dirty = True
+        # Seconds of the last full generation, keyed by (width, height, backend)
+        self._generate_seconds: Dict[tuple, float] = {}
     
     @property
     def generator(self) -> TopographicMapGenerator:
@@ -44,6 +67,20 @@ class MapModel:
     def heightmap(self):
         """Last generated heightmap"""
         return self._last_heightmap
+
+    @property
+    def terrain_dirty(self) -> bool:
+        """True if terrain or crater parameters changed since the last generation"""
+        return self._terrain_dirty or self._last_heightmap is None
+
+    @property
+    def cache(self) -> HeightmapCache:
+        """Heightmap cache shared by all generations of this model"""
+        return self._cache
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters of the heightmap cache"""
+        return self._cache.stats()
     
     #================ Parameters update ======================
 
@@ -68,6 +105,7 @@ class MapModel:
         if 'terrain_roughness' in validated:
             result['roughness'] = validated['terrain_roughness']
         # Persist both canonical and alias keys
+        self._mark_dirty_if_changed(self.terrain_params, validated)
         self.terrain_params.update(result)
         return result
         
@@ -105,8 +143,14 @@ class MapModel:
             Dict with validated parameters
         """
         validated = self._validate_crater_params(kwargs)
+        self._mark_dirty_if_changed(self.crater_params, validated)
         self.crater_params.update(validated)
         return validated
+
+    def _mark_dirty_if_changed(self, current: Dict[str, Any], validated: Dict[str, Any]):
+        """Flag the terrain for regeneration only if a value actually changed"""
+        if any(current.get(key) != value for key, value in validated.items()):
+            self._terrain_dirty = True
     
     # =============== VALIDATION ========================
        
@@ -211,6 +255,12 @@ class MapModel:
             # No hay límites fijos, depende de la altura del terreno
             validated['sea_level'] = sea_level
 
+        if 'contour_mode' in params:
+            mode = str(params['contour_mode'])
+            if mode not in ('merged', 'per_level'):
+                raise ValueError(f"contour_mode debe ser 'merged' o 'per_level', recibido: {mode}")
+            validated['contour_mode'] = mode
+
         return validated
     
     def _validate_crater_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -222,8 +272,8 @@ class MapModel:
 
         if 'density' in params:
             density = int(params['density'])
-            if not 0 <= density <= 10:
-                raise ValueError(f"density debe estar entre 0 y 10, recibido: {density}")
+            if not 0 <= density <= MAX_CRATERS:
+                raise ValueError(f"density debe estar entre 0 y {MAX_CRATERS}, recibido: {density}")
             validated['density'] = density
 
         if 'size' in params:
@@ -242,15 +292,132 @@ class MapModel:
     
     # =============== TERRAIN GENERATION ========================
 
-    def generate(self) -> Any:
+    def generate(self, force: bool = False) -> Any:
         """
-        Generate terrain using current parameters
-        
+        Generate terrain using current parameters.
+        If no terrain/crater parameter changed since the last call, the
+        current heightmap is returned without regenerating.
+
+        Args:
+            force: Regenerate even if parameters did not change
+
         Returns:
             Generated heightmap(numpy array)
         """
+        if not force and not self.terrain_dirty:
+            return self._last_heightmap
+
+        gen_params = self._generation_params()
+
+        # Reutilizar un heightmap ya generado con los mismos parámetros
+        key = self._cache_key(gen_params)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._generator.terrain = cached
+            self._generator.last_backend = self._generator.resolve_mode()[0]
+        else:
+            # Generar terreno con todos los parámetros
+            start = time.perf_counter()
+            self._generator.generate_terrain(**gen_params)
+            self._generate_seconds[self._cost_key()] = time.perf_counter() - start
+            self._generator.terrain = self._cache.put(key, self._generator.terrain)
+
+        # Guardar el heightmap generado
+        self._last_heightmap = self._generator.terrain
+        self._terrain_dirty = False
+        return self._last_heightmap
+
+    def has_cached_terrain(self) -> bool:
+        """
+        Whether generate() would reuse a cached heightmap for the current parameters.
+
+        Returns:
+            True if the terrain is up to date or its heightmap is in the cache
+        """
+        if not self.terrain_dirty:
+            return True
+        return self._cache_key(self._generation_params()) in self._cache
+
+    def expected_generate_seconds(self) -> Optional[float]:
+        """
+        Duration of the last full generation with the current size and backend.
+
+        Returns:
+            Seconds, or None if no terrain of this size was generated yet
+        """
+        return self._generate_seconds.get(self._cost_key())
+
+    def generate_draft(self, factor: int) -> TopographicMapGenerator:
+        """
+        Generate a low-resolution draft of the terrain for the current parameters.
+        The main generator, heightmap and dirty flag are left untouched.
+
+        Args:
+            factor: Decimation per axis (see TopographicMapGenerator.make_draft)
+
+        Returns:
+            Draft generator holding the decimated terrain
+        """
+        draft = self._generator.make_draft(factor)
+        if self._draft is not None and (self._draft.full_size, self._draft.cell_size) == \
+                (draft.full_size, draft.cell_size):
+            # Reuse the draft generator so its stage memo survives between drafts
+            draft = self._draft
+        draft.generate_terrain(**self._generation_params())
+        self._draft = draft
+        return draft
+
+    def install_heightmap(self, terrain) -> np.ndarray:
+        """
+        Make an imported heightmap the current terrain.
+        The array is copied into an owned, C-contiguous, read-only float32 buffer,
+        so views over a request body or a transposed frombuffer never reach the
+        renderers. The heightmap and dirty flag describe the imported map until
+        a terrain or crater parameter changes.
+
+        Args:
+            terrain: Heightmap (width, height), e.g. from TopographicMapGenerator.set_heightmap_bytes
+
+        Returns:
+            The installed heightmap
+        """
+        hm = np.array(terrain, dtype=np.float32, order='C')
+        if hm.ndim != 2:
+            raise ValueError(f"El heightmap debe ser 2D, recibido: {hm.shape}")
+        hm.setflags(write=False)
+        self._generator.set_heightmap(hm, normalize=False)
+        self._last_heightmap = hm
+        self._terrain_dirty = False
+        # Drafts of the previous parameters no longer match the terrain
+        self._draft = None
+        return hm
+
+    def _cost_key(self) -> tuple:
+        """Size, backend and tiling of the generator, the main drivers of generation time"""
+        backend, tiled = self._generator.resolve_mode()
+        return int(self._generator.width), int(self._generator.height), backend, tiled
+
+    def _cache_key(self, gen_params: Dict[str, Any]) -> str:
+        """
+        HeightmapCache key of a heightmap generated with gen_params.
+        Uses the backend and tiling generate_terrain actually resolves (both change
+        the map for the same seed), plus the noise block of the tiled mode.
+        """
+        backend, tiled = self._generator.resolve_mode()
+        return self._cache.make_key(
+            width=self._generator.width,
+            height=self._generator.height,
+            backend=backend,
+            tiled=tiled,
+            noise_block=int(getattr(generator_config, 'TILE_NOISE_BLOCK', 256)) if tiled else None,
+            max_octaves=getattr(generator_config, 'MAX_OCTAVES', 7),
+            **gen_params
+        )
+
+    def _generation_params(self) -> Dict[str, Any]:
+        """Arguments of generate_terrain for the current parameters"""
         # Preparar parámetros usando los nombres normalizados
-        gen_params = {
+        return {
             'terrain_roughness': self.terrain_params.get('terrain_roughness', 50),
             'height_variation': self.terrain_params.get('height_variation', 8.0),
             'seed': self.terrain_params.get('seed', 42),
@@ -260,13 +427,6 @@ class MapModel:
             'crater_depth': self.crater_params.get('depth', 0.6),
             'base_height': self.terrain_params.get('base_height', 20.0)
         }
-
-        # Generar terreno con todos los parámetros
-        self._generator.generate_terrain(**gen_params)
-
-        # Guardar el heightmap generado
-        self._last_heightmap = self._generator.terrain
-        return self._last_heightmap
     
     # =============== Utilidades ========================
 
@@ -291,6 +451,7 @@ class MapModel:
         self.visual_params = VISUAL_PARAMS.copy()
         self.crater_params = CRATER_PARAMS.copy()
         self._last_heightmap = None
+        self._terrain_dirty = True
         # Provide alias keys for compatibility after reset
         if 'height_variation' in self.terrain_params:
             self.terrain_params['vh'] = self.terrain_params['height_variation']
@@ -7,6 +7,13 @@ from pathlib import Path
 from typing import Dict, List, Set, Optional, Tuple
 import re
 
+import numpy as np
+
+from utils.svg_paths import SVG_PRECISION, format_line_path, parse_line_path
+
+# Namespaces de salida: SVG como namespace por defecto (sin prefijos) y xlink para <use>
+SVG_NSMAP = {None: 'http://www.w3.org/2000/svg', 'xlink': 'http://www.w3.org/1999/xlink'}
+
 
 def safe_print(message: str):
     """Imprime mensajes de forma segura manejando errores de encoding en Windows"""
@@ -17,16 +24,35 @@ def safe_print(message: str):
         safe_message = message.encode('ascii', 'replace').decode('ascii')
         print(safe_message)
 
+
 class SVGOptimizer:
     """Optimizador SVG que reorganiza estructura para mejor edición"""
     
-    def __init__(self, input_path: str):
-        self.tree = etree.parse(input_path)
+    def __init__(self, source, metadata: Optional[Dict[str, str]] = None,
+                 precision: Optional[int] = SVG_PRECISION, simplify_tolerance: float = 0.0):
+        """
+        Args:
+            source: Ruta del SVG, objeto tipo archivo (p. ej. BytesIO con la salida de
+                savefig) o árbol/elemento lxml ya parseado
+            metadata: Parámetros terrain-render-params a inyectar. Si None, se leen del SVG
+            precision: Decimales de las coordenadas de los paths (None = sin compactar)
+            simplify_tolerance: Tolerancia Douglas-Peucker en unidades de salida
+                (px/pt del SVG); 0 = sin simplificar
+        """
+        self.precision = precision
+        self.simplify_tolerance = float(simplify_tolerance or 0.0)
+        self.stats = {}
+        if isinstance(source, etree._ElementTree):
+            self.tree = source
+        elif isinstance(source, etree._Element):
+            self.tree = source.getroottree()
+        else:
+            self.tree = etree.parse(source)
         self.root = self.tree.getroot()
         self.ns = {'svg': 'http://www.w3.org/2000/svg'}
         
-        # Extraer metadata
-        self.metadata = self._extract_metadata()
+        # Metadata inyectada (exportación en memoria) o extraída del SVG
+        self.metadata = dict(metadata) if metadata is not None else self._extract_metadata()
         
         # Extraer colores de la metadata
         self.grid_color = self.metadata.get('grid-color', '#00ffff').lower()
@@ -69,6 +95,9 @@ class SVGOptimizer:
         """Pipeline de optimización sin scour"""
         safe_print("\n[>] Iniciando optimizacion SVG...")
         
+        # Paso 0: Indexar el árbol en un único recorrido
+        self._index_tree()
+        
         # Paso 1: Extraer elementos importantes
         safe_print("   [1] Extrayendo elementos...")
         style_elem, defs_elem = self._extract_important_elements()
@@ -89,25 +118,94 @@ class SVGOptimizer:
             terrain_lines, terrain_cake
         )
         
-        # Paso 4: Guardar metadata
-        safe_print("   [5] Preservando metadata...")
+        # Paso 4: Compactar paths (precisión, comandos relativos, simplificación)
+        if self.precision is not None:
+            safe_print("   [5] Compactando paths...")
+            self._compact_paths(new_root)
+        
+        # Paso 5: Guardar metadata
+        safe_print("   [6] Preservando metadata...")
         self._preserve_metadata(new_root)
         
-        # Paso 5: Escribir resultado
-        safe_print("   [6] Escribiendo archivo...")
+        # Paso 6: Escribir resultado
+        safe_print("   [7] Escribiendo archivo...")
         self._write(new_root, output_path)
         
         safe_print("[OK] Optimizacion completada\n")
     
+    def _index_tree(self) -> None:
+        """Indexa el árbol en un único recorrido (iterwalk con eventos start/end)
+        
+        Construye:
+        - by_id: id -> elemento
+        - groups: todos los <g> en orden de documento (equivale a findall('.//svg:g'))
+        - paths: todos los <path> en orden de documento; cada <g> guarda el rango
+          [inicio, fin) de sus paths descendientes, así _paths_of() es un slice
+        - style/defs y los line2d dentro de axes_1 (con su número)
+        Los enlaces al padre los mantiene lxml (getparent() es O(1)).
+        """
+        svg = '{http://www.w3.org/2000/svg}'
+        self.by_id = {}
+        self.groups = []
+        self.paths = []
+        self.style = None
+        self.defs = []
+        self.axes_line2d = []
+        self._path_span = {}
+        axes_1 = None        # Primer <g id="axes_1">
+        inside_axes = False  # ¿El recorrido está dentro de axes_1?
+        
+        for event, elem in etree.iterwalk(self.root, events=('start', 'end')):
+            tag = elem.tag
+            if not isinstance(tag, str):
+                continue  # Comentarios / instrucciones de procesamiento
+            
+            if event == 'end':
+                if tag == svg + 'g':
+                    self._path_span[elem] = (self._path_span[elem], len(self.paths))
+                    if elem is axes_1:
+                        inside_axes = False
+                continue
+            
+            elem_id = elem.get('id')
+            if elem_id and elem_id not in self.by_id:
+                self.by_id[elem_id] = elem
+            
+            if tag == svg + 'path':
+                self.paths.append(elem)
+            elif tag == svg + 'g':
+                self.groups.append(elem)
+                self._path_span[elem] = len(self.paths)
+                lower_id = (elem_id or '').lower()
+                if axes_1 is None and elem_id == 'axes_1':
+                    axes_1 = elem
+                    inside_axes = True
+                elif inside_axes and 'line2d' in lower_id:
+                    match = re.search(r'line2d[_-]?(\d+)', lower_id)
+                    if match:
+                        self.axes_line2d.append((int(match.group(1)), elem))
+            elif tag == svg + 'style':
+                if self.style is None:
+                    self.style = elem
+            elif tag == svg + 'defs':
+                self.defs.append(elem)
+    
+    def _paths_of(self, elem) -> List:
+        """Paths descendientes de un <g> (orden de documento) sin volver a recorrerlo"""
+        span = self._path_span.get(elem)
+        if span is None:
+            return elem.findall('.//svg:path', self.ns)
+        return self.paths[span[0]:span[1]]
+    
     def _extract_important_elements(self) -> Tuple[Optional[etree.Element], Optional[etree.Element]]:
         """Extrae <style> y <defs> para preservarlos"""
         from copy import deepcopy
         
         # Extraer style (usualmente en el primer defs)
-        style = self.root.find('.//svg:style', self.ns)
+        style = self.style
         
         # Obtener TODOS los defs porque matplotlib los distribuye por el documento
-        all_defs = self.root.findall('.//svg:defs', self.ns)
+        all_defs = self.defs
         
         # Crear un único defs combinado con todos los elementos importantes
         combined_defs = None
@@ -152,16 +250,14 @@ class SVGOptimizer:
         terrain_lines = []    # Contornos del terreno (QuadContourSet) - Terrain
         terrain_cake = []     # Líneas verticales del pastel (line2d) - Terrain
         
-        # Encontrar TODOS los grupos en el SVG (recursivamente)
-        all_groups = self.root.findall('.//svg:g', self.ns)
+        # Todos los grupos del SVG (del índice, en orden de documento)
+        all_groups = self.groups
         
         safe_print(f"      Total grupos encontrados: {len(all_groups)}")
         
         # PASO 1: CLASIFICAR elementos por nombres ORIGINALES, jerarquía y estructura
         # (SIN renombrar - usamos IDs originales para facilitar la lógica)
         
-        import re
-        
         for elem in all_groups:
             elem_id = (elem.get('id', '') or '').lower()
             
@@ -224,8 +320,8 @@ class SVGOptimizer:
             
             # === TERRAIN ELEMENTS ===
             
-            # QuadContourSet: Siempre son contornos de terreno (Terrain Lines)
-            elif 'quadcontourset' in elem_id:
+            # QuadContourSet / TerrainContour: Siempre son contornos de terreno (Terrain Lines)
+            elif 'quadcontourset' in elem_id or 'terraincontour' in elem_id:
                 terrain_lines.append(elem)
                 continue
         
@@ -233,18 +329,9 @@ class SVGOptimizer:
         # Los rangos de line2d varían según el archivo
         # Estrategia: Los últimos N line2d en axes_1 son estructurales (Grid BBox + Terrain Cake)
         
-        # Buscar axes_1
-        axes_1_elem = self.root.find('.//svg:g[@id="axes_1"]', self.ns)
-        if axes_1_elem is not None:
-            # Encontrar todos los line2d dentro de axes_1 (recursivamente)
-            line2d_in_axes = []
-            for elem in axes_1_elem.findall('.//svg:g', self.ns):
-                elem_id = (elem.get('id', '') or '').lower()
-                if 'line2d' in elem_id:
-                    match = re.search(r'line2d[_-]?(\d+)', elem_id)
-                    if match:
-                        line_num = int(match.group(1))
-                        line2d_in_axes.append((line_num, elem))
+        # line2d dentro de axes_1 (recolectados al indexar)
+        if self.by_id.get('axes_1') is not None:
+            line2d_in_axes = list(self.axes_line2d)
             
             # Ordenar por número
             line2d_in_axes.sort(key=lambda x: x[0])
@@ -289,16 +376,16 @@ class SVGOptimizer:
         terrain_counter = 1
         
         # Renombrar axes_1 como TerrainVector_1
-        axes_1 = self.root.find('.//svg:g[@id="axes_1"]', self.ns)
+        axes_1 = self.by_id.get('axes_1')
         if axes_1 is not None:
             axes_1.set('id', f'TerrainVector_{terrain_counter}')
             safe_print(f"         Renombrado: axes_1 -> TerrainVector_{terrain_counter}")
             terrain_counter += 1
         
-        # Renombrar todos los QuadContourSet como TerrainVector
+        # Renombrar todos los QuadContourSet / TerrainContour como TerrainVector
         for elem in terrain_lines:
             original_id = elem.get('id', '')
-            if 'quadcontourset' in original_id.lower():
+            if any(k in original_id.lower() for k in ('quadcontourset', 'terraincontour')):
                 new_id = f'TerrainVector_{terrain_counter}'
                 elem.set('id', new_id)
                 safe_print(f"         Renombrado: {original_id} -> {new_id}")
@@ -329,180 +416,12 @@ class SVGOptimizer:
                     style = descendant.get('style', '')
                     if 'stroke-opacity' in style:
                         # Eliminar stroke-opacity del style
-                        import re
                         style = re.sub(r'stroke-opacity:\s*[\d.]+;\s*', '', style)
                         style = re.sub(r';\s*stroke-opacity:\s*[\d.]+', '', style)
                         style = re.sub(r'stroke-opacity:\s*[\d.]+\s*', '', style)
                         descendant.set('style', style.strip())
 
     
-    def _has_grid_color(self, elem) -> bool:
-        """Verifica si un elemento tiene grid-color (en cualquier path hijo)"""
-        grid_normalized = self.grid_color.replace('#', '').lower()
-        
-        # Buscar en todos los paths descendientes
-        paths = elem.findall('.//svg:path', self.ns)
-        for path in paths:
-            # Verificar en atributo stroke directo
-            stroke = (path.get('stroke', '') or '').lower().replace('#', '')
-            if grid_normalized in stroke:
-                return True
-            
-            # Verificar en atributo style
-            style = (path.get('style', '') or '').lower()
-            if f'stroke: #{grid_normalized}' in style or f'stroke:#{grid_normalized}' in style:
-                return True
-        
-        return False
-    
-    def _has_terrain_color(self, elem) -> bool:
-        """Verifica si un elemento tiene terrain-color (en cualquier path hijo)"""
-        terrain_normalized = self.terrain_color.replace('#', '').lower()
-        
-        paths = elem.findall('.//svg:path', self.ns)
-        for path in paths:
-            # Verificar atributo stroke directo
-            stroke = (path.get('stroke', '') or '').lower().replace('#', '')
-            if terrain_normalized in stroke:
-                return True
-            
-            # Verificar en atributo style
-            style = (path.get('style', '') or '').lower()
-            if f'stroke: #{terrain_normalized}' in style or f'stroke:#{terrain_normalized}' in style:
-                return True
-        
-        return False
-    
-    def _is_terrain_cake_line(self, elem, elem_id: str) -> bool:
-        """Detecta si es una línea del pastel (line2d vertical)"""
-        # Las líneas del pastel son line2d con solo 2 comandos (M y L)
-        terrain_normalized = self.terrain_color.replace('#', '').lower()
-        paths = elem.findall('.//svg:path', self.ns)
-        
-        for path in paths:
-            d = path.get('d', '').strip()
-            
-            # Contar comandos M y L en el path
-            # Las líneas del pastel tienen: M x1 y1 L x2 y2 (solo 2 puntos)
-            commands = [cmd.strip() for cmd in d.split() if cmd.strip() in ['M', 'L']]
-            
-            # Si tiene exactamente M y L (2 comandos), verificar que tenga color de terreno
-            if len(commands) == 2 and commands[0] == 'M' and commands[1] == 'L':
-                # Verificar que el path tenga el color del terreno
-                stroke = (path.get('stroke', '') or '').lower().replace('#', '')
-                if terrain_normalized in stroke:
-                    return True
-                
-                # Verificar en atributo style
-                style = (path.get('style', '') or '').lower()
-                if f'stroke: #{terrain_normalized}' in style or f'stroke:#{terrain_normalized}' in style:
-                    return True
-        
-        return False
-    
-    def _is_axis_height_element(self, elem, elem_id: str) -> bool:
-        """Detecta elementos de eje de altura (líneas horizontales paralelas)"""
-        # IDs comunes para líneas de contorno (grid, no terrain)
-        if any(keyword in elem_id for keyword in ['line3dcollection', 'contour', 'patch3d']):
-            # Verificar que sea grid-color, no terrain-color
-            paths = elem.findall('.//svg:path', self.ns)
-            grid_normalized = self.grid_color.replace('#', '').lower()
-            terrain_normalized = self.terrain_color.replace('#', '').lower()
-            
-            for path in paths:
-                # Verificar atributo stroke directo
-                stroke = (path.get('stroke', '') or '').lower().replace('#', '')
-                if grid_normalized in stroke and terrain_normalized not in stroke:
-                    return True
-                
-                # Verificar en atributo style
-                style = (path.get('style', '') or '').lower()
-                has_grid = f'stroke: #{grid_normalized}' in style or f'stroke:#{grid_normalized}' in style
-                has_terrain = f'stroke: #{terrain_normalized}' in style or f'stroke:#{terrain_normalized}' in style
-                
-                if has_grid and not has_terrain:
-                    return True
-        
-        return False
-    
-    def _is_axis_y_element(self, elem, elem_id: str) -> bool:
-        """Detecta elementos del eje Y basándose en el padre axis3d_2"""
-        # Buscar si el elemento o alguno de sus ancestros está dentro de axis3d_2
-        current = elem
-        while current is not None:
-            parent = current.getparent()
-            if parent is not None:
-                parent_id = (parent.get('id', '') or '').lower()
-                if parent_id == 'axis3d_2':
-                    # Excluir la línea negra del eje (line2d_10)
-                    if elem_id == 'line2d_10':
-                        return False
-                    return True
-            current = parent
-        return False
-    
-    def _is_axis_x_element(self, elem, elem_id: str) -> bool:
-        """Detecta elementos del eje X basándose en el padre axis3d_1"""
-        # Buscar si el elemento o alguno de sus ancestros está dentro de axis3d_1
-        current = elem
-        while current is not None:
-            parent = current.getparent()
-            if parent is not None:
-                parent_id = (parent.get('id', '') or '').lower()
-                if parent_id == 'axis3d_1':
-                    # Excluir la línea negra del eje (line2d_1)
-                    if elem_id == 'line2d_1':
-                        return False
-                    return True
-            current = parent
-        return False
-    
-    def _is_axis_height_element_tick(self, elem, elem_id: str) -> bool:
-        """Detecta elementos del eje de altura basándose en el padre axis3d_3"""
-        # Buscar si el elemento o alguno de sus ancestros está dentro de axis3d_3
-        current = elem
-        while current is not None:
-            parent = current.getparent()
-            if parent is not None:
-                parent_id = (parent.get('id', '') or '').lower()
-                if parent_id == 'axis3d_3':
-                    # Excluir la línea negra del eje (line2d_20)
-                    if elem_id == 'line2d_20':
-                        return False
-                    return True
-            current = parent
-        return False
-        
-        # Buscar <use> referencias con xtick en descendientes
-        for child in elem.iter():
-            child_id = (child.get('id', '') or '').lower()
-            if 'xtick' in child_id:
-                return True
-        
-        return False
-    
-    def _is_terrain_element(self, elem, elem_id: str) -> bool:
-        """Detecta elementos del terreno (line-color)"""
-        # IDs comunes para terreno
-        if any(keyword in elem_id for keyword in ['line3dcollection', 'patch3d', 'poly3d', 'surface', 
-                                                    'quadcontourset', 'line2d', 'axes']):
-            terrain_normalized = self.terrain_color.replace('#', '').lower()
-            
-            # Buscar paths con terrain-color (en stroke directo o en style)
-            paths = elem.findall('.//svg:path', self.ns)
-            for path in paths:
-                # Verificar atributo stroke directo
-                stroke = (path.get('stroke', '') or '').lower().replace('#', '')
-                if terrain_normalized in stroke:
-                    return True
-                
-                # Verificar en atributo style
-                style = (path.get('style', '') or '').lower()
-                if f'stroke: #{terrain_normalized}' in style or f'stroke:#{terrain_normalized}' in style:
-                    return True
-        
-        return False
-    
     def _extract_tick_coordinate(self, text_elem) -> str:
         """Extrae el número de coordenada de un elemento text"""
         # El texto está en un comentario HTML antes del <g> con style
@@ -549,7 +468,7 @@ class SVGOptimizer:
         new_tick.set('id', f'Tick {coordinate} ({axis_name})')
         
         # Extraer paths de line2d directamente (sin crear subgrupo "Tick line")
-        for path in line2d_elem.findall('.//svg:path', self.ns):
+        for path in self._paths_of(line2d_elem):
             new_tick.append(path)
         
         # Extraer el <g> interno del text que contiene los vectores del número
@@ -596,9 +515,8 @@ class SVGOptimizer:
                 Terrain Cake/
         """
         
-        # Crear root SVG
-        new_root = etree.Element('{http://www.w3.org/2000/svg}svg')
-        new_root.set('xmlns', 'http://www.w3.org/2000/svg')
+        # Crear root SVG (namespace por defecto: los hijos se serializan sin prefijo)
+        new_root = etree.Element('{http://www.w3.org/2000/svg}svg', nsmap=SVG_NSMAP)
         
         # Copiar atributos del original
         for attr, value in self.root.attrib.items():
@@ -631,7 +549,7 @@ class SVGOptimizer:
             
             # Extraer paths directamente (sin subgrupo line2d_n)
             for line2d_elem in grid_bbox_lines:
-                for path in line2d_elem.findall('.//svg:path', self.ns):
+                for path in self._paths_of(line2d_elem):
                     bbox_group.append(path)
         
         # Axis Height Elements
@@ -650,7 +568,7 @@ class SVGOptimizer:
                 
                 # grid3d_1 contiene líneas paralelas para Axis X (invertido)
                 if 'grid3d' in elem_id:
-                    for path in elem.findall('.//svg:path', self.ns):
+                    for path in self._paths_of(elem):
                         parallel_lines_paths.append(path)
                 # Detectar Axis Label (text_n directo de axis3d_3)
                 elif self._is_axis_label(elem):
@@ -730,7 +648,7 @@ class SVGOptimizer:
                 
                 # grid3d_2 va a Paralel Lines
                 if 'grid3d' in elem_id:
-                    for path in elem.findall('.//svg:path', self.ns):
+                    for path in self._paths_of(elem):
                         parallel_lines_paths.append(path)
                 # Detectar Axis Label (text_n directo de axis3d_2)
                 elif self._is_axis_label(elem):
@@ -810,7 +728,7 @@ class SVGOptimizer:
                 
                 # grid3d_3 contiene líneas paralelas para Axis Height (invertido)
                 if 'grid3d' in elem_id:
-                    for path in elem.findall('.//svg:path', self.ns):
+                    for path in self._paths_of(elem):
                         parallel_lines_paths.append(path)
                 # Detectar Axis Label (text_n directo de axis3d_1)
                 elif self._is_axis_label(elem):
@@ -887,7 +805,11 @@ class SVGOptimizer:
                 lines_group.set('opacity', '0.8')
                 
                 for elem in terrain_lines:
-                    for path in elem.findall('.//svg:path', self.ns):
+                    paths = self._paths_of(elem)
+                    if self.precision is not None:
+                        # Un path por estilo dentro de cada nivel/colección
+                        paths = self._merge_paths(paths)
+                    for path in paths:
                         lines_group.append(path)
             
             # Terrain Cake (líneas verticales del pastel)
@@ -898,7 +820,7 @@ class SVGOptimizer:
                 
                 terrain_normalized = self.terrain_color.replace('#', '').lower()
                 for elem in terrain_cake:
-                    for path in elem.findall('.//svg:path', self.ns):
+                    for path in self._paths_of(elem):
                         # Solo agregar paths que tengan el color de terreno
                         stroke = (path.get('stroke', '') or '').lower().replace('#', '')
                         style = (path.get('style', '') or '').lower()
@@ -914,6 +836,54 @@ class SVGOptimizer:
         
         return new_root
     
+    def _merge_paths(self, paths: List) -> List:
+        """Fusiona paths contiguos con el mismo estilo (todos los atributos salvo d/id)
+        en un único path con varios subtrayectos"""
+        merged = []
+        run_key = None
+        run_ds = []
+        for path in paths:
+            d = path.get('d', '')
+            if not d.lstrip().startswith('M'):
+                key = None  # Sin moveto absoluto inicial: no se puede concatenar
+            else:
+                key = tuple(sorted((k, v) for k, v in path.attrib.items() if k not in ('d', 'id')))
+            if key is not None and key == run_key:
+                run_ds.append(d)
+                continue
+            if len(run_ds) > 1:
+                merged[-1].set('d', ' '.join(run_ds))
+            merged.append(path)
+            run_key = key
+            run_ds = [d]
+        if len(run_ds) > 1:
+            merged[-1].set('d', ' '.join(run_ds))
+        self.stats['paths_merged'] = self.stats.get('paths_merged', 0) + len(paths) - len(merged)
+        return merged
+    
+    def _compact_paths(self, new_root: etree.Element) -> None:
+        """Reescribe los paths de líneas con coordenadas cuantizadas y comandos relativos
+        (y Douglas-Peucker si hay tolerancia). Los glifos en defs (curvas) no se tocan."""
+        vertices_in = 0
+        vertices_out = 0
+        compacted = 0
+        # Solo el contenido visible: los glifos de defs se quedan como están
+        render = new_root.find('svg:g[@id="Terrain Render"]', self.ns)
+        for path in (render.iter('{http://www.w3.org/2000/svg}path') if render is not None else ()):
+            parsed = parse_line_path(path.get('d', ''))
+            if parsed is None:
+                continue
+            d, written = format_line_path(*parsed, precision=self.precision,
+                                          tolerance=self.simplify_tolerance)
+            path.set('d', d)
+            vertices_in += len(parsed[0])
+            vertices_out += written
+            compacted += 1
+        self.stats.update(paths_compacted=compacted, vertices_in=vertices_in, vertices_out=vertices_out)
+        safe_print(f"      Paths compactados: {compacted} "
+                   f"(fusionados: {self.stats.get('paths_merged', 0)})")
+        safe_print(f"      Vertices: {vertices_in} -> {vertices_out}")
+    
     def _preserve_metadata(self, new_root: etree.Element):
         """Preserva metadata en el nuevo SVG"""
         if not self.metadata:
@@ -923,11 +893,12 @@ class SVGOptimizer:
         safe_print(f"      [+] Preservando {len(self.metadata)} parametros de metadata")
         
         # Crear metadata element
+        # En el namespace SVG, como el resto del documento (sin xmlns="" al serializar)
         metadata = etree.Element('{http://www.w3.org/2000/svg}metadata')
-        terrain_params = etree.SubElement(metadata, 'terrain-render-params')
+        terrain_params = etree.SubElement(metadata, '{http://www.w3.org/2000/svg}terrain-render-params')
         
         for key, value in self.metadata.items():
-            param = etree.SubElement(terrain_params, 'param')
+            param = etree.SubElement(terrain_params, '{http://www.w3.org/2000/svg}param')
             param.set('name', key)
             param.set('value', value)
         
@@ -936,59 +907,56 @@ class SVGOptimizer:
         safe_print(f"      [OK] Metadata insertada en el arbol SVG")
     
     def _write(self, new_root: etree.Element, output_path: str):
-        """Escribe el SVG optimizado sin prefijos de namespace"""
-        # Convertir árbol con namespaces a string XML
-        xml_string = etree.tostring(
-            new_root, 
-            pretty_print=True, 
-            xml_declaration=True, 
-            encoding='utf-8'
-        ).decode('utf-8')
-        
-        # Limpiar prefijos y namespaces para compatibilidad con Figma
-        # 1. Quitar todos los prefijos ns0:
-        xml_string = xml_string.replace('ns0:', '')
-        
-        # 2. Quitar xmlns:ns0 declaration
-        xml_string = xml_string.replace('xmlns:ns0="http://www.w3.org/2000/svg"', '')
-        
-        # 3. Asegurar que <svg> tenga xmlns (sin duplicar)
-        # Primero quitar espacios dobles que puedan quedar
-        xml_string = xml_string.replace('  xmlns="', ' xmlns="')
-        
-        # Si <svg> no tiene xmlns, agregarlo
-        if '<svg ' in xml_string and 'xmlns="http://www.w3.org/2000/svg"' not in xml_string.split('<svg ')[1].split('>')[0]:
-            xml_string = xml_string.replace('<svg ', '<svg xmlns="http://www.w3.org/2000/svg" ', 1)
+        """Escribe el SVG optimizado sin prefijos de namespace
         
-        # Escribir archivo
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(xml_string)
+        Los namespaces se limpian sobre el árbol (SVG por defecto y xlink declarados una
+        vez en <svg>) y libxml2 serializa directamente al archivo: sin construir el
+        documento como string ni pasadas de str.replace.
+        """
+        etree.cleanup_namespaces(new_root, top_nsmap=SVG_NSMAP)
+        etree.ElementTree(new_root).write(
+            output_path,
+            pretty_print=True,
+            xml_declaration=True,
+            encoding='utf-8'
+        )
 
 # Función pública para optimización
-def optimize_svg(input_path: str, output_path: str) -> bool:
+def optimize_svg(source, output_path: str, metadata: Optional[Dict[str, str]] = None,
+                 precision: Optional[int] = SVG_PRECISION, simplify_tolerance: float = 0.0) -> bool:
     """
-    Optimiza un archivo SVG reorganizando su estructura.
+    Optimiza un SVG reorganizando su estructura y compactando sus paths.
     
     Args:
-        input_path: Ruta del SVG original
-        output_path: Ruta donde guardar el SVG optimizado
+        source: Ruta del SVG original u objeto tipo archivo (BytesIO de savefig);
+            se parsea una sola vez
+        output_path: Ruta donde guardar el SVG optimizado (única escritura)
+        metadata: Parámetros terrain-render-params a inyectar (None = leerlos del SVG)
+        precision: Decimales de las coordenadas (None = no compactar paths)
+        simplify_tolerance: Tolerancia Douglas-Peucker en unidades de salida (0 = desactivada)
         
     Returns:
         True si la optimización fue exitosa
     """
     try:
-        optimizer = SVGOptimizer(input_path)
+        if hasattr(source, 'getbuffer'):
+            original_size = source.getbuffer().nbytes
+        else:
+            original_size = Path(source).stat().st_size
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        optimizer = SVGOptimizer(source, metadata=metadata, precision=precision,
+                                 simplify_tolerance=simplify_tolerance)
         optimizer.optimize(output_path)
         
-        # Estadísticas
-        original_size = Path(input_path).stat().st_size
+        # Estadísticas reales (bytes antes/después)
         optimized_size = Path(output_path).stat().st_size
-        reduction = (1 - optimized_size / original_size) * 100
+        reduction = (1 - optimized_size / original_size) * 100 if original_size else 0.0
         
         safe_print(f"[OK] Optimizacion completada:")
-        safe_print(f"   Original: {original_size / 1024:.1f} KB")
-        safe_print(f"   Optimizado: {optimized_size / 1024:.1f} KB")
-        safe_print(f"   Reduccion de grupos: ~65%")
+        safe_print(f"   Original: {original_size / 1024:.1f} KB ({original_size} bytes)")
+        safe_print(f"   Optimizado: {optimized_size / 1024:.1f} KB ({optimized_size} bytes)")
+        safe_print(f"   Reduccion: {reduction:.1f}%")
         
         return True
     except Exception as e:
@@ -0,0 +1,173 @@
+"""
+Compactación de paths SVG de solo líneas
+Parseo, simplificación Douglas-Peucker y serialización con comandos relativos y
+coordenadas cuantizadas. Solo depende de NumPy: la usan el escritor SVG nativo
+(view/svg_writer.py) y el optimizador (utils/svg_optimizer.py)
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Decimales de las coordenadas tras la compactación (None = no compactar paths)
+SVG_PRECISION = 2
+
+
+def parse_line_path(d: str) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Parsea un path de solo líneas.
+
+    Returns:
+        (puntos Nx2 absolutos, índice del primer punto de cada subtrayecto, cerrado por
+        subtrayecto) o None si el path usa otros comandos y no se debe tocar
+    """
+    if not d or not d.lstrip().startswith('M'):
+        return None
+    chunks = d.split('M')[1:]
+    counts = np.array([chunk.count('L') + 1 for chunk in chunks])
+    closed = np.array(['z' in chunk or 'Z' in chunk for chunk in chunks])
+    body = d.replace('M', ' ').replace('L', ' ').replace('z', ' ').replace('Z', ' ').replace(',', ' ')
+    try:
+        values = np.array(body.split(), dtype=float)
+    except ValueError:
+        return None  # Otros comandos (curvas, relativos, H/V)
+    if len(values) != 2 * counts.sum():
+        return None  # Coordenadas implícitas (sin comando por punto): no se toca
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return values.reshape(-1, 2), starts, closed
+
+
+def simplify_polylines(points: np.ndarray, starts: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker vectorizado sobre varias polilíneas concatenadas.
+    En cada ronda divide a la vez todos los tramos cuyo vértice más lejano supera
+    `tolerance` (unidades de salida). Conserva siempre los extremos de cada polilínea.
+
+    Returns:
+        Máscara booleana de vértices a conservar
+    """
+    n = len(points)
+    if tolerance <= 0:
+        return np.ones(n, dtype=bool)
+    keep = np.zeros(n, dtype=bool)
+    keep[starts] = True
+    keep[np.append(starts[1:] - 1, n - 1)] = True
+    idx = np.arange(n)
+    pending = ~keep  # Vértices aún sin decidir
+    while pending.any():
+        prev = np.maximum.accumulate(np.where(keep, idx, 0))
+        nxt = np.minimum.accumulate(np.where(keep, idx, n - 1)[::-1])[::-1]
+        cand = np.flatnonzero(pending)
+        a, b = prev[cand], nxt[cand]
+        chord = points[b] - points[a]
+        rel = points[cand] - points[a]
+        norm = np.hypot(chord[:, 0], chord[:, 1])
+        cross = np.abs(chord[:, 0] * rel[:, 1] - chord[:, 1] * rel[:, 0])
+        # Cuerda nula (polilínea cerrada): distancia al extremo
+        dist = np.where(norm > 0, cross / np.where(norm > 0, norm, 1.0), np.hypot(rel[:, 0], rel[:, 1]))
+        over = dist > tolerance
+        if not over.any():
+            break
+        # Por tramo (identificado por su inicio a), el vértice más lejano pasa a conservarse
+        order = np.lexsort((-dist[over], a[over]))
+        seg = a[over][order]
+        first = np.r_[True, seg[1:] != seg[:-1]]
+        keep[cand[over][order][first]] = True
+        # Tramos sin ningún vértice fuera de tolerancia quedan resueltos (se descartan)
+        split = np.isin(a, seg[first])
+        pending[cand[~split]] = False
+        pending[keep] = False
+    return keep
+
+
+def _format_fixed(values: np.ndarray, precision: int, prefix: np.ndarray, suffix: np.ndarray) -> str:
+    """Formatea enteros cuantizados (unidades de 10^-precision) como decimales compactos,
+    vectorizado: cada número ocupa una fila de bytes [prefijo][signo][entero][.][fracción][sufijo]
+    y una máscara descarta ceros a la izquierda, ceros finales y el punto si sobra.
+
+    Args:
+        values: Enteros int64
+        precision: Decimales
+        prefix: Un byte por número (b' ' separador, o el comando que lo precede; 0 = nada)
+        suffix: Un byte por número (b'z' al cerrar un subtrayecto; 0 = nada)
+    """
+    n = len(values)
+    if n == 0:
+        return ''
+    scale = 10 ** precision
+    mag = np.abs(values)
+    int_part, frac_part = np.divmod(mag, scale)
+    int_width = max(1, len(str(int(int_part.max()))))
+    width = 2 + int_width + (1 + precision if precision else 0) + 1
+
+    chars = np.zeros((n, width), dtype=np.uint8)
+    mask = np.zeros((n, width), dtype=bool)
+    chars[:, 0] = prefix
+    mask[:, 0] = prefix != 0
+    chars[:, 1] = ord('-')
+    mask[:, 1] = values < 0
+
+    # Parte entera: sin ceros a la izquierda (al menos un dígito)
+    rest = int_part.copy()
+    for col in range(1 + int_width, 1, -1):
+        rest, digit = np.divmod(rest, 10)
+        chars[:, col] = digit + ord('0')
+    col_idx = np.arange(int_width)
+    ndigits = np.maximum(1, np.floor(np.log10(np.maximum(int_part, 1))).astype(np.int64) + 1)
+    mask[:, 2:2 + int_width] = col_idx >= (int_width - ndigits)[:, None]
+
+    # Fracción: el punto y los dígitos hasta el último distinto de cero
+    if precision:
+        dot = 2 + int_width
+        chars[:, dot] = ord('.')
+        mask[:, dot] = frac_part != 0
+        rest = frac_part.copy()
+        for j in range(precision - 1, -1, -1):
+            rest, digit = np.divmod(rest, 10)
+            chars[:, dot + 1 + j] = digit + ord('0')
+            mask[:, dot + 1 + j] = (frac_part % 10 ** (precision - j)) != 0
+
+    chars[:, -1] = suffix
+    mask[:, -1] = suffix != 0
+    return chars[mask].tobytes().decode('ascii')
+
+
+def format_line_path(points: np.ndarray, starts: np.ndarray, closed: np.ndarray,
+                     precision: int = SVG_PRECISION, tolerance: float = 0.0) -> Tuple[str, int]:
+    """Serializa subtrayectos con comandos relativos (m/l/z) y coordenadas cuantizadas.
+    Las coordenadas absolutas se redondean antes de calcular los deltas, así el error
+    no se acumula a lo largo del path.
+
+    Returns:
+        (d, vértices escritos)
+    """
+    precision = int(precision)
+    scale = 10 ** precision
+    n = len(points)
+    is_start = np.zeros(n, dtype=bool)
+    is_start[starts] = True
+    keep = simplify_polylines(points, starts, tolerance) if tolerance > 0 else np.ones(n, dtype=bool)
+    q = np.rint(points * scale).astype(np.int64)
+    # Vértices repetidos tras cuantizar no aportan nada
+    keep[1:] &= np.any(q[1:] != q[:-1], axis=1) | is_start[1:]
+    q = q[keep]
+    is_start = is_start[keep]
+    starts = np.flatnonzero(is_start)
+
+    # Deltas respecto al punto actual: el anterior, o el inicio del subtrayecto previo si se cerró
+    deltas = np.empty_like(q)
+    deltas[0] = q[0]
+    deltas[1:] = q[1:] - q[:-1]
+    reopen = starts[1:][closed[:-1]]
+    deltas[reopen] = q[reopen] - q[starts[:-1][closed[:-1]]]
+
+    # Comando antes de cada coordenada: M/m al iniciar subtrayecto, l en el segundo punto
+    m = len(q)
+    prefix = np.full((m, 2), ord(' '), dtype=np.uint8)
+    prefix[starts, 0] = ord('m')
+    prefix[0, 0] = ord('M')
+    second = np.flatnonzero(~is_start & np.r_[False, is_start[:-1]])
+    prefix[second, 0] = ord('l')
+    suffix = np.zeros((m, 2), dtype=np.uint8)
+    last = np.append(starts[1:] - 1, m - 1)
+    suffix[last[closed], 1] = ord('z')
+
+    d = _format_fixed(deltas.ravel(), precision, prefix.ravel(), suffix.ravel())
+    return d.replace(' -', '-'), m
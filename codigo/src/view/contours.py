@@ -0,0 +1,84 @@
+"""
+Motor de contornos: extrae todas las curvas de nivel en una sola pasada
+Compartido por el dibujo interactivo, la exportación y la preview
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from contourpy import LineType, contour_generator
+
+# Número de juegos de contornos (heightmap, niveles) que se conservan
+CONTOUR_CACHE_SIZE = 8
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def heightmap_digest(terrain):
+    """Huella del contenido del heightmap (forma, tipo y bytes)"""
+    data = np.ascontiguousarray(terrain)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{data.shape}{data.dtype.str}'.encode('ascii'))
+    h.update(data.view(np.uint8).reshape(-1))
+    return h.hexdigest()
+
+
+def extract_contours(terrain, levels):
+    """Polilíneas 3D de todas las curvas de nivel del terreno.
+
+    Usa un único generador de contourpy para todos los niveles (el preproceso
+    de la malla se hace una vez) y cachea el resultado por (contenido del
+    heightmap, niveles), así que re-renderizar con otra cámara o estilo no
+    vuelve a recorrer la malla.
+
+    Args:
+        terrain: array (width, height) indexado terrain[x, y]
+        levels: secuencia de alturas
+
+    Returns:
+        Lista (una entrada por nivel) de listas de arrays (N, 3) con columnas
+        x, y, z=nivel. Los arrays son de solo lectura.
+    """
+    levels = tuple(float(level) for level in np.atleast_1d(levels))
+    if not levels:
+        return []
+    key = (heightmap_digest(terrain), levels)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    W, H = terrain.shape
+    gen = contour_generator(
+        np.arange(W, dtype=np.float64),
+        np.arange(H, dtype=np.float64),
+        np.asarray(terrain.T, dtype=np.float64),
+        line_type=LineType.Separate
+    )
+    result = []
+    for level, lines in zip(levels, gen.multi_lines(levels)):
+        polylines = []
+        for xy in lines:
+            if len(xy) < 2:
+                continue
+            xyz = np.empty((len(xy), 3), dtype=np.float64)
+            xyz[:, :2] = xy
+            xyz[:, 2] = level
+            xyz.setflags(write=False)
+            polylines.append(xyz)
+        result.append(polylines)
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CONTOUR_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def clear_contour_cache():
+    """Vacía la caché de contornos"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,291 @@
+"""
+Trabajos de exportación en un pool de procesos
+Las exportaciones (300 dpi, hasta escala 4, optimización SVG) corren fuera del
+proceso del servidor; el heightmap viaja por memoria compartida
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from controller import config
+from view.visualization import ensure_unique_path, resolve_export_path
+
+# Cola de progreso del worker (fijada por el initializer del pool)
+_progress_queue = None
+
+
+class TerrainSnapshot:
+    """Vista mínima de un generador (terrain, width, height) para exportar en el worker"""
+
+    def __init__(self, terrain):
+        self.terrain = terrain
+        self.width, self.height = terrain.shape
+
+
+class ExportJob:
+    """Estado de un trabajo de exportación (lo que consulta la UI por polling)"""
+
+    def __init__(self, job_id, fmt, path):
+        self.id = job_id
+        self.fmt = fmt
+        self.path = path
+        self.status = 'queued'  # queued | running | done | error
+        self.progress = 0.0
+        self.stage = 'en cola'
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in ('done', 'error')
+
+    def to_dict(self):
+        return {
+            'ok': self.status != 'error',
+            'job': self.id,
+            'status': self.status,
+            'progress': round(self.progress, 3),
+            'stage': self.stage,
+            'format': self.fmt,
+            'path': self.path,
+            'filename': os.path.basename(self.path),
+            'error': self.error,
+        }
+
+
+def _init_worker(queue):
+    """Initializer del pool: cola de progreso y backend sin ventanas"""
+    global _progress_queue
+    _progress_queue = queue
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _export_worker(job_id, shm_name, shape, dtype, visual_params, fmt, path, include_grid, scale):
+    """Exporta un snapshot del heightmap (proceso del pool). Devuelve la ruta escrita"""
+    from view.visualization import export_map_clean
+
+    def progress(fraction, stage):
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, fraction, stage))
+
+    progress(0.0, 'inicio')
+    # Copia privada: el segmento compartido se libera antes del render
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        terrain = np.array(np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+    finally:
+        shm.close()
+    export_map_clean(
+        TerrainSnapshot(terrain), visual_params,
+        fmt=fmt, save_path=path,
+        include_grid=include_grid, scale=scale,
+        progress=progress
+    )
+    if not os.path.isfile(path):
+        raise RuntimeError(f"La exportación no generó {path}")
+    return path
+
+
+class ExportJobManager:
+    """
+    Cola de exportaciones sobre un ProcessPoolExecutor.
+    Responsable de:
+    - Copiar el heightmap a memoria compartida (sin serializarlo por el pipe).
+    - Reservar la ruta final de cada trabajo (dos trabajos nunca comparten archivo).
+    - Seguir estado y progreso de cada trabajo (id, etapa, fracción, error).
+    - Conservar los últimos `keep` trabajos terminados para su descarga.
+    El pool se crea al primer submit; varios trabajos corren en paralelo.
+    """
+
+    def __init__(self, max_workers=None, keep=None):
+        workers = getattr(config, 'EXPORT_WORKERS', 0) if max_workers is None else max_workers
+        workers = int(workers or 0)
+        self.max_workers = max(1, workers if workers > 0 else (os.cpu_count() or 1))
+        self.keep = int(getattr(config, 'EXPORT_JOBS_KEEP', 32) if keep is None else keep)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._shm = {}
+        self._pool = None
+        self._queue = None
+        self._listener = None
+
+    def submit(self, generator, visual_params, fmt='png', save_path=None, include_grid=None, scale=1):
+        """
+        Encola la exportación del terreno actual y vuelve de inmediato.
+        La copia a memoria compartida es la instantánea del trabajo: quien llama
+        debe impedir que el terreno cambie durante esta llamada (en el servidor
+        web, con el lock del RenderScheduler).
+
+        Args:
+            generator: Generador con terrain (se copia: cambios posteriores no afectan)
+            visual_params: Parámetros de visualización (se copian)
+            fmt, save_path, include_grid, scale: como export_map_clean
+
+        Returns:
+            Id del trabajo
+        """
+        terrain = generator.terrain
+        if terrain is None:
+            raise ValueError("No hay mapa generado para exportar.")
+        fmt = str(fmt).lower()
+        if fmt not in ('png', 'svg'):
+            raise ValueError(f"Formato de exportación no soportado: {fmt}")
+
+        terrain = np.ascontiguousarray(terrain)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, terrain.nbytes))
+        np.ndarray(terrain.shape, dtype=terrain.dtype, buffer=shm.buf)[...] = terrain
+
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            job = ExportJob(job_id, fmt, self._reserve_path(fmt, save_path))
+            self._jobs[job_id] = job
+            self._shm[job_id] = shm
+            pool = self._ensure_pool()
+        try:
+            future = pool.submit(
+                _export_worker, job_id, shm.name, terrain.shape, terrain.dtype.str,
+                dict(visual_params), fmt, job.path, include_grid, scale
+            )
+        except Exception as e:
+            self._finish(job_id, error=e)
+            raise
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return job_id
+
+    def get(self, job_id):
+        """Trabajo por id (None si no existe o ya se descartó)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """Estado del trabajo como dict (para JSON/Eel)"""
+        job = self.get(job_id)
+        if job is None:
+            return {'ok': False, 'job': job_id, 'status': 'unknown', 'error': 'Trabajo desconocido'}
+        with self._lock:
+            return job.to_dict()
+
+    def wait(self, job_id, timeout=None, sleep=time.sleep, interval=0.1):
+        """
+        Espera a que termine el trabajo. `sleep` permite ceder el control
+        (p. ej. gevent.sleep en el servidor). Devuelve False si vence el timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job.done:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            sleep(interval)
+
+    def output_files(self):
+        """Rutas de salida de los trabajos conservados (no deben borrarse)"""
+        with self._lock:
+            return [job.path for job in self._jobs.values()]
+
+    def close(self):
+        """Cancela lo pendiente, detiene el pool y libera la memoria compartida"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            queue, self._queue = self._queue, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if queue is not None:
+            queue.put(None)
+            self._listener.join(5)
+        with self._lock:
+            segments, self._shm = list(self._shm.values()), {}
+        for shm in segments:
+            self._release(shm)
+
+    # =============== Internals ========================
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            # spawn: el servidor tiene hilos (Eel/gevent, planificador) y fork no es seguro
+            ctx = multiprocessing.get_context('spawn')
+            self._queue = ctx.Queue()
+            self._listener = threading.Thread(
+                target=self._drain_progress, args=(self._queue,), name='export-progress', daemon=True
+            )
+            self._listener.start()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=ctx,
+                initializer=_init_worker, initargs=(self._queue,)
+            )
+            atexit.register(self.close)
+        return self._pool
+
+    def _reserve_path(self, fmt, save_path):
+        """Ruta final única, también frente a trabajos aún sin escribir"""
+        path = resolve_export_path(fmt, save_path)
+        taken = {job.path for job in self._jobs.values() if not job.done}
+        base, ext = os.path.splitext(path)
+        n = 1
+        while path in taken:
+            path = ensure_unique_path(f"{base} ({n}){ext}")
+            n += 1
+        return path
+
+    def _drain_progress(self, queue):
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            job_id, fraction, stage = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.done:
+                    continue
+                job.status = 'running'
+                job.progress = max(job.progress, float(fraction))
+                job.stage = stage
+
+    def _on_done(self, job_id, future):
+        if future.cancelled():
+            self._finish(job_id, error='Exportación cancelada')
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"Error en exportación {job_id}:")
+            traceback.print_exception(type(error), error, error.__traceback__)
+        self._finish(job_id, error=error)
+
+    def _finish(self, job_id, error=None):
+        with self._lock:
+            shm = self._shm.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.finished = time.time()
+                if error is None:
+                    job.status, job.progress, job.stage = 'done', 1.0, 'listo'
+                else:
+                    job.status, job.stage, job.error = 'error', 'error', str(error)
+            self._prune()
+        if shm is not None:
+            self._release(shm)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _release(shm):
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
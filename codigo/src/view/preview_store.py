@@ -0,0 +1,43 @@
+"""
+Almacén en memoria de la preview actual
+Sustituye a tmp/preview.png: el PNG vive en RAM, versionado por ETag
+"""
+import hashlib
+import threading
+
+# Ruta HTTP desde la que se sirve la preview
+PREVIEW_ROUTE = '/preview.png'
+
+
+class PreviewStore:
+    """
+    Última preview renderizada (bytes PNG) con su ETag.
+    Responsable de:
+    - Guardar/leer el PNG de forma segura entre hilos (Eel y bottle).
+    - Derivar el ETag del contenido (misma imagen => mismo ETag).
+    - Dar una URL versionada para que el <img> no reutilice una imagen vieja.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._etag = None
+
+    def put(self, data: bytes) -> str:
+        """Guarda una nueva preview y devuelve su ETag"""
+        etag = hashlib.blake2b(data, digest_size=12).hexdigest()
+        with self._lock:
+            self._data = bytes(data)
+            self._etag = etag
+        return etag
+
+    def get(self):
+        """Devuelve (bytes, etag) de la preview actual, o (None, None) si aún no hay"""
+        with self._lock:
+            return self._data, self._etag
+
+    def url(self):
+        """URL versionada de la preview actual (None si aún no hay)"""
+        with self._lock:
+            etag = self._etag
+        return f'{PREVIEW_ROUTE}?v={etag}' if etag else None
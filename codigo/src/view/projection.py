@@ -0,0 +1,83 @@
+"""
+Caché de proyección para geometría 3D estática (contornos)
+Cambiar solo la cámara re-proyecta las polilíneas ya empaquetadas, sin recalcular nada más
+"""
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+# Vistas proyectadas que conserva cada colección (órbita ida/vuelta, reset de vista)
+PROJECTION_CACHE_SIZE = 8
+
+
+def pack_polylines(polylines):
+    """Empaqueta polilíneas (N_i, 3) en un único array homogéneo (N, 4).
+
+    Returns:
+        (points, splits): puntos x, y, z, 1 concatenados e índices de corte
+        para np.split
+    """
+    if not polylines:
+        return np.empty((0, 4)), np.empty(0, dtype=np.intp)
+    lengths = np.fromiter((len(p) for p in polylines), dtype=np.intp, count=len(polylines))
+    points = np.ones((int(lengths.sum()), 4))
+    points[:, :3] = np.concatenate(polylines)
+    return points, np.cumsum(lengths[:-1])
+
+
+def project_points(points, M):
+    """Proyecta puntos homogéneos (N, 4) con la matriz 4x4 de Axes3D.
+
+    Returns:
+        Array (N, 3) con x, y en coordenadas de datos proyectadas y z de profundidad
+    """
+    xyzw = points @ np.asarray(M).T
+    return xyzw[:, :3] / xyzw[:, 3:4]
+
+
+class CachedLine3DCollection(Line3DCollection):
+    """
+    Line3DCollection para geometría que no cambia entre renders.
+    Responsable de:
+    - Empaquetar las polilíneas 3D una sola vez (un array contiguo).
+    - Proyectarlas con un único producto matricial por vista.
+    - Recordar las últimas vistas (clave = matriz de proyección del eje), de
+      modo que los dos draws de savefig(bbox_inches='tight') y las vistas ya
+      visitadas no vuelven a proyectar ni a construir Paths.
+    """
+
+    def __init__(self, lines, **kwargs):
+        self._views = OrderedDict()
+        self.projections = 0  # número de proyecciones calculadas (diagnóstico)
+        super().__init__(lines, **kwargs)
+
+    def set_segments(self, segments):
+        """Fija las polilíneas 3D y descarta las vistas memorizadas"""
+        self._points, self._splits = pack_polylines(list(segments))
+        self._views = OrderedDict()
+        super().set_segments(segments)
+
+    def do_3d_projection(self):
+        """Proyecta (o recupera) los segmentos para la matriz actual del eje"""
+        if len(self._points) == 0:
+            LineCollection.set_segments(self, [])
+            return np.nan
+
+        M = np.asarray(self.axes.M)
+        key = M.tobytes()
+        cached = self._views.get(key)
+        if cached is None:
+            xyz = project_points(self._points, M)
+            LineCollection.set_segments(self, np.split(xyz[:, :2], self._splits))
+            cached = (self._paths, min(float(xyz[:, 2].min()), 1e9))
+            self._views[key] = cached
+            while len(self._views) > PROJECTION_CACHE_SIZE:
+                self._views.popitem(last=False)
+            self.projections += 1
+        else:
+            self._views.move_to_end(key)
+            self._paths = cached[0]
+            self.stale = True
+        return cached[1]
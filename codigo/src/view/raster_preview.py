@@ -0,0 +1,278 @@
+"""
+Backend de preview rasterizado directo
+Proyecta la geometría 3D cacheada con NumPy y dibuja líneas antialias con Agg,
+sin pasar por el dibujo de mplot3d ni por savefig
+"""
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+from matplotlib import colors as mcolors
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg, RendererAgg
+from matplotlib.figure import Figure
+from matplotlib.path import Path
+from matplotlib.transforms import IdentityTransform
+
+from view.contours import extract_contours, heightmap_digest
+from view.projection import pack_polylines, project_points
+
+# Margen (px) alrededor del contenido al recortar la imagen
+_CROP_PAD = 4
+# Nivel zlib del PNG: la preview es efímera, prima la velocidad sobre el tamaño
+_PNG_COMPRESS_LEVEL = 1
+# Píxel RGBA (0, 0, 0, 255) como uint32 nativo, para rellenar el lienzo de una vez
+_OPAQUE_BLACK = np.frombuffer(bytes((0, 0, 0, 255)), dtype=np.uint32)[0]
+
+
+class RasterPreviewRenderer:
+    """
+    Preview rápida: proyección NumPy + rasterizado Agg directo a PNG.
+    Responsable de:
+    - Cachear la geometría 3D empaquetada (contornos sólidos/punteados,
+      soportes, base y perímetro) por (heightmap, niveles, sea_level).
+    - Obtener la matriz de proyección y la transformación a píxeles de un
+      Axes3D que nunca se dibuja (misma cámara que export_preview_image).
+    - Dibujar cada grupo de líneas como un único Path y recortar al contenido.
+    No dibuja etiquetas de ticks ni títulos de ejes (solo grilla y caja).
+    """
+
+    def __init__(self, figsize=(12, 8), dpi=150):
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111, projection='3d')
+        width, height = (int(round(v)) for v in self.fig.bbox.size)
+        self.renderer = RendererAgg(width, height, dpi)
+        self._lock = threading.Lock()
+        self._geometry_key = None
+        self._geometry = None
+
+    def render(self, generator, visual_params, out_path=None):
+        """Renderiza la preview y devuelve los bytes PNG (y los escribe en out_path si se indica)"""
+        if generator.terrain is None:
+            raise ValueError("No hay terreno generado. Llama a generate_terrain() primero.")
+        with self._lock:
+            png = self._render(generator, visual_params)
+        if out_path:
+            out_dir = os.path.dirname(out_path)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            with open(out_path, 'wb') as f:
+                f.write(png)
+        return png
+
+    # =============== Internals ========================
+
+    def _render(self, generator, visual_params):
+        from view.visualization import _compute_adaptive_ticks, _compute_levels, _compute_z_base
+
+        terrain = generator.terrain
+        W, H = generator.width, generator.height
+        min_h = float(terrain.min())
+        max_h = float(terrain.max())
+        z_base = _compute_z_base(min_h, max_h)
+        z_top = max_h + 1
+        levels = _compute_levels(min_h, max_h, visual_params['num_contour_levels'])
+        sea_level = visual_params.get('sea_level', 0.0)
+        geometry = self._get_geometry(generator, levels, sea_level, z_base)
+
+        # Misma cámara y caja que el preview de matplotlib
+        ax = self.ax
+        ax.view_init(elev=visual_params['elevation_angle'], azim=visual_params['azimuth_angle'])
+        ax.set_xlim(0, W - 1)
+        ax.set_ylim(0, H - 1)
+        ax.set_zlim(z_base, z_top)
+        # Borradores (cell_size > 1): el relieve en unidades de celda mantiene las proporciones
+        cell = getattr(generator, 'cell_size', 1)
+        ax.set_box_aspect((W, H, max((max_h - z_base) + 1, 1) / cell))
+        ax.apply_aspect()
+        M = ax.get_proj()
+        to_pixels = ax.transData
+
+        def project(points):
+            xyz = project_points(points, M)
+            return to_pixels.transform(xyz[:, :2])
+
+        renderer = self.renderer
+        # Fondo negro opaco (como facecolor='black' en savefig)
+        np.asarray(renderer.buffer_rgba()).view(np.uint32).fill(_OPAQUE_BLACK)
+        bounds = []
+
+        def stroke(points, splits, rgba, lw, dashed=False):
+            if len(points) == 0:
+                return
+            xy = project(points)
+            codes = np.full(len(xy), Path.LINETO, dtype=Path.code_type)
+            codes[0] = Path.MOVETO
+            codes[splits] = Path.MOVETO
+            gc = renderer.new_gc()
+            gc.set_foreground(rgba, isRGBA=True)
+            gc.set_alpha(rgba[3])
+            gc.set_linewidth(lw)
+            gc.set_antialiased(True)
+            if dashed:
+                pattern = np.asarray(rcParams['lines.dashed_pattern'], dtype=float)
+                if rcParams['lines.scale_dashes']:
+                    pattern = pattern * lw
+                gc.set_dashes(0, pattern)
+                gc.set_capstyle(rcParams['lines.dash_capstyle'])
+            else:
+                gc.set_capstyle(rcParams['lines.solid_capstyle'])
+            renderer.draw_path(gc, Path(xy, codes), IdentityTransform())
+            gc.restore()
+            bounds.append((xy.min(axis=0), xy.max(axis=0)))
+
+        # Grilla y caja (detrás), según parámetros de ejes
+        if bool(visual_params.get('show_axis_labels', True)):
+            try:
+                grid_rgba = mcolors.to_rgba(visual_params.get('grid_color', '#00ffff'),
+                                            alpha=float(visual_params.get('grid_opacity', 0.35)))
+            except ValueError:
+                grid_rgba = (0.0, 1.0, 1.0, float(visual_params.get('grid_opacity', 0.35)))
+            grid_lw = float(visual_params.get('grid_width', 0.6))
+            lims = np.array([[0, W - 1], [0, H - 1], [z_base, z_top]], dtype=float)
+            ticks = [ax.get_xticks(), ax.get_yticks(), _compute_adaptive_ticks(z_base, z_top)]
+            stroke(*self._grid_lines(M, lims, ticks), grid_rgba, grid_lw)
+            stroke(*self._box_edges(lims), grid_rgba, grid_lw)
+
+        # Contornos y estructura del "pastel"
+        line_color = visual_params.get('line_color', '#ff7825')
+        contour_rgba = mcolors.to_rgba(line_color, alpha=0.85)
+        support_rgba = mcolors.to_rgba(line_color, alpha=0.6)
+        stroke(*geometry['solid'], contour_rgba, 1.0)
+        stroke(*geometry['dashed'], contour_rgba, 1.0, dashed=True)
+        stroke(*geometry['supports'], support_rgba, 1.0)
+        stroke(*geometry['base'], support_rgba, 0.9)
+        stroke(*geometry['perimeter'], contour_rgba, 1.0)
+
+        return self._encode_png(bounds)
+
+    def _get_geometry(self, generator, levels, sea_level, z_base):
+        """Geometría 3D empaquetada por grupo de estilo (cacheada)"""
+        terrain = generator.terrain
+        key = (heightmap_digest(terrain), tuple(levels), float(sea_level), float(z_base))
+        if key == self._geometry_key:
+            return self._geometry
+
+        solid, dashed = [], []
+        for level, polylines in zip(levels, extract_contours(terrain, levels)):
+            (dashed if level < sea_level else solid).extend(polylines)
+
+        self._geometry = {
+            'solid': pack_polylines(solid),
+            'dashed': pack_polylines(dashed),
+        }
+        for name, polylines in structure_polylines(terrain, z_base).items():
+            self._geometry[name] = pack_polylines(polylines)
+        self._geometry_key = key
+        return self._geometry
+
+    @staticmethod
+    def _box_edges(lims):
+        """12 aristas de la caja de límites (equivale a _draw_bounding_box)"""
+        (x0, x1), (y0, y1), (z0, z1) = lims
+        bottom = [(x0, y0, z0), (x1, y0, z0), (x1, y1, z0), (x0, y1, z0), (x0, y0, z0)]
+        top = [(x, y, z1) for x, y, _ in bottom]
+        columns = [[(x, y, z0), (x, y, z1)] for x, y, _ in bottom[:4]]
+        return pack_polylines([np.array(bottom), np.array(top)] + [np.array(c) for c in columns])
+
+    @staticmethod
+    def _grid_lines(M, lims, ticks):
+        """Líneas de grilla sobre los paneles del fondo (como axis3d.draw_grid).
+
+        Para cada eje, el panel lejano es el lado (mín. o máx.) cuya cara
+        proyectada queda más profunda; cada línea va del borde cercano de un
+        panel, pasa por la arista donde se unen los paneles lejanos y termina
+        en el borde cercano del otro.
+        """
+        mins, maxs = lims[:, 0], lims[:, 1]
+        center = (mins + maxs) / 2.0
+        highs = np.zeros(3, dtype=bool)
+        for i in range(3):
+            lo, hi = center.copy(), center.copy()
+            lo[i], hi[i] = mins[i], maxs[i]
+            depth = project_points(np.array([[*lo, 1.0], [*hi, 1.0]]), M)[:, 2]
+            highs[i] = depth[1] > depth[0]
+        far = np.where(highs, maxs, mins)
+        near = np.where(highs, mins, maxs)
+
+        lines = []
+        for index in range(3):
+            for t in ticks[index]:
+                if not mins[index] <= t <= maxs[index]:
+                    continue
+                xyz0 = far.copy()
+                xyz0[index] = t
+                line = np.array([xyz0, xyz0, xyz0])
+                line[0, index - 2] = near[index - 2]
+                line[2, index - 1] = near[index - 1]
+                lines.append(line)
+        return pack_polylines(lines)
+
+    def _encode_png(self, bounds):
+        """Recorta el lienzo al contenido dibujado y lo codifica como PNG"""
+        renderer = self.renderer
+        rgba = np.asarray(renderer.buffer_rgba())
+        height, width = rgba.shape[:2]
+        if bounds:
+            lo = np.min([b[0] for b in bounds], axis=0)
+            hi = np.max([b[1] for b in bounds], axis=0)
+            x0 = int(max(0, np.floor(lo[0]) - _CROP_PAD))
+            x1 = int(min(width, np.ceil(hi[0]) + _CROP_PAD))
+            # Coordenadas de pantalla con y hacia arriba; el buffer va de arriba abajo
+            r0 = int(max(0, height - np.ceil(hi[1]) - _CROP_PAD))
+            r1 = int(min(height, height - np.floor(lo[1]) + _CROP_PAD))
+        else:
+            x0, x1, r0, r1 = 0, width, 0, height
+
+        return _png_bytes(rgba[r0:r1, x0:x1, :3])
+
+
+def structure_polylines(terrain, z_base):
+    """Polilíneas 3D del "pastel": soportes de las esquinas, base y perímetro superior.
+
+    Returns:
+        Dict {'supports', 'base', 'perimeter'} -> lista de arrays (N, 3)
+    """
+    W, H = terrain.shape
+    corners = [(0, 0), (W - 1, 0), (W - 1, H - 1), (0, H - 1)]
+    supports = [np.array([[i, j, z_base], [i, j, terrain[i, j]]], dtype=float) for i, j in corners]
+    base = [np.array([[i, j, z_base] for i, j in corners + corners[:1]], dtype=float)]
+    # Perímetro superior: los 4 lados en un solo recorrido cerrado
+    ring_x = np.concatenate([np.arange(W), np.full(H - 1, W - 1), np.arange(W - 2, -1, -1),
+                             np.zeros(H - 1, dtype=int)])
+    ring_y = np.concatenate([np.zeros(W, dtype=int), np.arange(1, H), np.full(W - 1, H - 1),
+                             np.arange(H - 2, -1, -1)])
+    perimeter = [np.column_stack([ring_x, ring_y, terrain[ring_x, ring_y]]).astype(float)]
+    return {'supports': supports, 'base': base, 'perimeter': perimeter}
+
+
+def _png_bytes(rgb):
+    """Codifica un array (H, W, 3) uint8 como PNG (filtro 0, una sola pasada zlib)"""
+    height, width = rgb.shape[:2]
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(height, -1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), _PNG_COMPRESS_LEVEL))
+            + chunk(b'IEND', b''))
+
+
+_raster_renderers = {}
+_raster_renderer_lock = threading.Lock()
+
+
+def get_raster_renderer(dpi=150):
+    """Devuelve el RasterPreviewRenderer compartido para ese dpi (se crea en el primer uso)"""
+    with _raster_renderer_lock:
+        renderer = _raster_renderers.get(dpi)
+        if renderer is None:
+            renderer = _raster_renderers[dpi] = RasterPreviewRenderer(dpi=dpi)
+        return renderer
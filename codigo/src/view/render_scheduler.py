@@ -0,0 +1,140 @@
+"""
+Planificador de renders con coalescencia
+Mantiene solo el último juego de parámetros pendiente y lo procesa en un hilo de fondo
+"""
+import threading
+import traceback
+
+
+class RenderJob:
+    """Trabajo de render: número de secuencia, parámetros y consulta de obsolescencia"""
+
+    def __init__(self, scheduler, seq, params):
+        self._scheduler = scheduler
+        self.seq = seq
+        self.params = params
+
+    def superseded(self):
+        """True si llegó un juego de parámetros más reciente después de este"""
+        return self._scheduler.latest_seq != self.seq
+
+
+class RenderScheduler:
+    """
+    Planificador de renders para eventos rápidos (sliders).
+    Responsable de:
+    - Guardar solo el último juego de parámetros pendiente (los intermedios se descartan).
+    - Ejecutar los renders de uno en uno en un hilo de fondo.
+    - Entregar cada resultado terminado a `publish` (p. ej. callback Eel).
+    La latencia queda acotada a ~2 renders, sin importar la frecuencia de eventos.
+
+    render(job) -> resultado; publish(resultado, job). `lock` serializa los
+    trabajos con otras operaciones síncronas sobre el mismo modelo.
+    """
+
+    def __init__(self, render, publish, name='render-scheduler'):
+        self._render = render
+        self._publish = publish
+        self._name = name
+        self._cond = threading.Condition()
+        self._pending = None
+        self._running = False
+        self._closed = False
+        self._thread = None
+        self.lock = threading.RLock()
+        self.latest_seq = 0
+
+        # Contadores
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+
+    def submit(self, params):
+        """
+        Encola un juego de parámetros, reemplazando al pendiente si lo hay.
+
+        Returns:
+            Número de secuencia asignado
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("El planificador de renders está cerrado")
+            self.latest_seq += 1
+            self.submitted += 1
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = RenderJob(self, self.latest_seq, params)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return self.latest_seq
+
+    def run_exclusive(self, fn):
+        """
+        Ejecuta fn() serializado con los renders y en orden de secuencia: toma un
+        número nuevo (el trabajo en curso queda obsoleto y el pendiente, más antiguo,
+        se descarta) y espera el lock. Bloquea el hilo que llama: desde el servidor
+        Eel debe invocarse fuera del bucle de gevent (threadpool del hub).
+
+        Returns:
+            (seq, resultado de fn())
+        """
+        with self._cond:
+            self.latest_seq += 1
+            seq = self.latest_seq
+            if self._pending is not None:
+                self._pending = None
+                self.dropped += 1
+        with self.lock:
+            return seq, fn()
+
+    def read(self, fn):
+        """
+        Ejecuta fn() con el lock de render, sin tocar la cola ni la secuencia: lecturas
+        consistentes del modelo (nunca a mitad de un render). Como run_exclusive,
+        bloquea el hilo que llama.
+
+        Returns:
+            Resultado de fn()
+        """
+        with self.lock:
+            return fn()
+
+    def wait_idle(self, timeout=None):
+        """Espera a que no quede nada pendiente ni en curso. Devuelve False si vence el timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._running, timeout)
+
+    def close(self, timeout=None):
+        """Detiene el hilo de fondo tras el trabajo en curso (el pendiente se descarta)"""
+        with self._cond:
+            self._closed = True
+            self._pending = None
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # =============== Internals ========================
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+                job, self._pending = self._pending, None
+                self._running = True
+            try:
+                with self.lock:
+                    result = self._render(job)
+                self._publish(result, job)
+            except Exception:
+                print(f"Error en render en segundo plano (seq={job.seq}):")
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    self._running = False
+                    self.completed += 1
+                    self._cond.notify_all()
@@ -0,0 +1,355 @@
+"""
+Escritor SVG vectorial nativo para mapas de contornos
+Emite directamente la estructura final por capas (Terrain Render / Grid / Terrain)
+a partir de las polilíneas proyectadas, en una sola pasada y con la metadata en línea:
+sin savefig SVG, sin re-parsear ni re-serializar y sin heurísticas por id
+"""
+import os
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+from matplotlib import colors as mcolors
+from matplotlib import rcParams
+from matplotlib.figure import Figure
+
+from view.contours import extract_contours
+from view.projection import pack_polylines, project_points
+from view.raster_preview import structure_polylines
+from utils.svg_paths import format_line_path
+
+# Decimales de las coordenadas (pt); 0.01 pt está muy por debajo de lo visible
+SVG_PRECISION = 2
+# DPI del lienzo: 1 unidad de usuario SVG = 1 pt, como el backend SVG de matplotlib
+_SVG_DPI = 72
+
+# Alineación de matplotlib -> SVG
+_ANCHOR = {'left': 'start', 'center': 'middle', 'right': 'end'}
+_BASELINE = {'top': 'hanging', 'center': 'central', 'center_baseline': 'central',
+             'bottom': 'text-after-edge', 'baseline': 'alphabetic'}
+
+
+def svg_metadata_params(visual_params):
+    """Parámetros de render que se guardan en <metadata><terrain-render-params>"""
+    return {
+        'grid-color': visual_params.get('grid_color', '#00ffff'),
+        'grid-opacity': str(visual_params.get('grid_opacity', 0.35)),
+        'grid-width': str(visual_params.get('grid_width', 0.6)),
+        'line-color': visual_params.get('line_color', '#ff7825'),
+        'line-opacity': '0.8',
+        'sea-level': str(visual_params.get('sea_level', 0.0)),
+        'elevation-angle': str(visual_params.get('elevation_angle', 25)),
+        'azimuth-angle': str(visual_params.get('azimuth_angle', 125)),
+        'num-contour-levels': str(visual_params.get('num_contour_levels', 15)),
+    }
+
+
+def _hex(color):
+    """Color sólido #rrggbb (la opacidad va en el grupo)"""
+    try:
+        return mcolors.to_hex(color, keep_alpha=False)
+    except ValueError:
+        return '#00ffff'
+
+
+class SVGContourWriter:
+    """
+    Exportación SVG directa de un mapa de contornos.
+    Responsable de:
+    - Configurar un Axes3D igual que export_map_clean (cámara, límites, caja y
+      estilo de ejes) y resolver solo sus decoraciones con draw_without_rendering
+      (grilla, ticks, etiquetas y caja; sin contornos, sin rasterizar).
+    - Proyectar con NumPy los contornos y el "pastel" con la matriz de ese eje.
+    - Escribir las capas finales en streaming: un <path> por nivel de contorno,
+      estilo de trazo en los grupos y paths compactos (comandos relativos,
+      coordenadas cuantizadas y simplificación Douglas-Peucker opcional).
+    Las etiquetas se emiten como <text> (editable) en lugar de glifos como trazos.
+    """
+
+    def __init__(self, generator, visual_params, include_grid=None, scale=1, precision=SVG_PRECISION,
+                 simplify_tolerance=0.0):
+        if generator.terrain is None:
+            raise ValueError("No hay terreno generado. Llama a generate_terrain() primero.")
+        self.generator = generator
+        self.visual_params = visual_params
+        self.show_grid = (bool(visual_params.get('show_axis_labels', True)) if include_grid is None
+                          else bool(include_grid))
+        scale = int(scale) if str(scale).isdigit() else 1
+        self.scale = scale if scale in (1, 2, 4) else 1
+        self.precision = int(precision)
+        self.simplify_tolerance = float(simplify_tolerance or 0.0)
+        self._bounds = []
+
+    def write(self, out_path, progress=None):
+        """Escribe el SVG en out_path. progress(fracción, etapa) es opcional"""
+        from view.visualization import _no_progress
+        progress = progress or _no_progress
+        progress(0.1, 'contornos')
+        scene = self._build_scene()
+        progress(0.5, 'svg')
+        out_dir = os.path.dirname(out_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8', newline='\n') as f:
+            self._emit(f, scene)
+        return out_path
+
+    # =============== Escena ========================
+
+    def _build_scene(self):
+        from view.visualization import (_apply_axes_style, _compute_adaptive_ticks, _compute_levels,
+                                        _compute_z_base)
+
+        generator, vp = self.generator, self.visual_params
+        terrain = generator.terrain
+        W, H = generator.width, generator.height
+        min_h = float(terrain.min())
+        max_h = float(terrain.max())
+        z_base = _compute_z_base(min_h, max_h)
+        levels = _compute_levels(min_h, max_h, vp['num_contour_levels'])
+
+        # Mismo eje que export_map_clean, pero sin artistas del terreno
+        fig = Figure(figsize=(16 * self.scale, 9 * self.scale), dpi=_SVG_DPI, facecolor='black')
+        ax = fig.add_subplot(111, projection='3d')
+        ax.view_init(elev=vp['elevation_angle'], azim=vp['azimuth_angle'])
+        ax.set_xlim(0, W - 1)
+        ax.set_ylim(0, H - 1)
+        ax.set_zlim(z_base, max_h + 1)
+        ax.set_zticks(_compute_adaptive_ticks(z_base, max_h + 1))
+        ax.set_box_aspect((W, H, max((max_h - z_base) + 1, 1)))
+        ax.set_facecolor('black')
+        _apply_axes_style(ax, self.show_grid, vp.get('grid_color', '#00ffff'),
+                          float(vp.get('grid_width', 0.6)), float(vp.get('grid_opacity', 0.35)))
+        fig.draw_without_rendering()
+
+        self._fig_height = fig.bbox.height
+        M, to_display = ax.M, ax.transData
+
+        def project(polylines):
+            points, splits = pack_polylines(polylines)
+            if len(points) == 0:
+                return []
+            xy = to_display.transform(project_points(points, M)[:, :2])
+            return np.split(xy, splits)
+
+        sea_level = vp.get('sea_level', 0.0)
+        contour_levels = []
+        for level, polylines in zip(levels, extract_contours(terrain, levels)):
+            if polylines:
+                contour_levels.append((float(level), level < sea_level, project(polylines)))
+        structure = {name: project(lines) for name, lines in structure_polylines(terrain, z_base).items()}
+
+        scene = {'levels': contour_levels, 'structure': structure, 'axes': []}
+        if self.show_grid:
+            # Caja de límites: líneas añadidas por _draw_bounding_box (ya proyectadas)
+            scene['bbox'] = [to_display.transform(line.get_xydata()) for line in ax.lines]
+            for axis, name in ((ax.zaxis, 'Height'), (ax.yaxis, 'Y'), (ax.xaxis, 'X')):
+                scene['axes'].append(self._axis_scene(axis, name))
+        self._extend_bounds(scene.get('bbox', []))
+        for axis_scene in scene['axes']:
+            self._extend_bounds(axis_scene['grid'])
+        for _, _, lines in contour_levels:
+            self._extend_bounds(lines)
+        for lines in structure.values():
+            self._extend_bounds(lines)
+        return scene
+
+    def _axis_scene(self, axis, name):
+        """Grilla, ticks (línea + etiqueta) y título de un eje, en coordenadas de pantalla"""
+        to_display = axis.axes.transData
+        grid = [to_display.transform(np.asarray(seg, dtype=float)) for seg in axis.gridlines.get_segments()]
+        lo, hi = sorted(axis.get_view_interval())
+        eps = (hi - lo) * 1e-9
+        ticks = []
+        for tick in axis.get_major_ticks():
+            label = tick.label1
+            # Solo los ticks que mplot3d dibuja (dentro de los límites); el resto conserva posiciones viejas
+            if not lo - eps <= tick.get_loc() <= hi + eps:
+                continue
+            if not (tick.get_visible() and label.get_visible() and label.get_text()):
+                continue
+            line = tick.tick1line
+            ticks.append({
+                'text': label.get_text(),
+                'line': line.get_transform().transform(line.get_xydata()) if line.get_visible() else None,
+                'label': self._text_scene(label),
+            })
+        title = axis.label
+        return {
+            'name': name,
+            'grid': grid,
+            'ticks': ticks,
+            'title': self._text_scene(title) if title.get_visible() and title.get_text() else None,
+        }
+
+    def _text_scene(self, text):
+        x, y = text.get_transform().transform(text.get_position())
+        bbox = text.get_window_extent()
+        self._bounds.append((np.array([bbox.x0, bbox.y0]), np.array([bbox.x1, bbox.y1])))
+        return {
+            'text': text.get_text(),
+            'x': float(x), 'y': float(y),
+            'rotation': float(text.get_rotation()),
+            'size': float(text.get_fontsize()),
+            'ha': text.get_horizontalalignment(),
+            'va': text.get_verticalalignment(),
+        }
+
+    def _extend_bounds(self, lines):
+        for xy in lines:
+            if len(xy):
+                self._bounds.append((xy.min(axis=0), xy.max(axis=0)))
+
+    # =============== Escritura ========================
+
+    def _emit(self, f, scene):
+        vp = self.visual_params
+        if self._bounds:
+            lo = np.min([b[0] for b in self._bounds], axis=0)
+            hi = np.max([b[1] for b in self._bounds], axis=0)
+        else:
+            lo, hi = np.zeros(2), np.ones(2)
+        # Recorte al contenido (como bbox_inches='tight', pad_inches=0); SVG con y hacia abajo
+        self._origin = (float(lo[0]), float(self._fig_height - hi[1]))
+        width, height = (float(v) for v in np.ceil((hi - lo) * 100) / 100)
+        fmt = self._fmt
+
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{fmt(width)}pt" height="{fmt(height)}pt" '
+                f'viewBox="0 0 {fmt(width)} {fmt(height)}" version="1.1">\n')
+        f.write(' <metadata>\n  <terrain-render-params>\n')
+        for key, value in svg_metadata_params(vp).items():
+            f.write(f'   <param name={quoteattr(key)} value={quoteattr(str(value))}/>\n')
+        f.write('  </terrain-render-params>\n </metadata>\n')
+        f.write(' <g id="Terrain Render" opacity="1">\n')
+
+        if self.show_grid:
+            self._emit_grid(f, scene)
+        self._emit_terrain(f, scene)
+
+        f.write(' </g>\n</svg>\n')
+
+    def _emit_grid(self, f, scene):
+        vp = self.visual_params
+        color = _hex(vp.get('grid_color', '#00ffff'))
+        opacity = self._fmt(float(vp.get('grid_opacity', 0.35)))
+        stroke = self._stroke_attrs(color, float(vp.get('grid_width', 0.6)))
+
+        f.write('  <g id="Grid" opacity="1">\n')
+        f.write(f'   <g id="Grid BoundingBox" opacity="{opacity}" {stroke}>\n')
+        for xy in scene['bbox']:
+            self._write_path(f, [xy], indent=4)
+        f.write('   </g>\n')
+
+        for axis in scene['axes']:
+            name = axis['name']
+            f.write(f'   <g id={quoteattr(f"Axis {name} Elements")} opacity="1">\n')
+            if axis['title'] is not None:
+                f.write(f'    <g id={quoteattr(f"Axis Label ({name})")} opacity="0.8" fill="#ffffff">\n')
+                self._write_text(f, axis['title'], indent=5)
+                f.write('    </g>\n')
+            f.write(f'    <g id={quoteattr(f"Grid {name}")} opacity="{opacity}" {stroke}>\n')
+            f.write(f'     <g id={quoteattr(f"Axis {name} Paralel Lines")}>\n')
+            for xy in axis['grid']:
+                self._write_path(f, [xy], indent=6)
+            f.write('     </g>\n')
+            for tick in axis['ticks']:
+                tick_id = quoteattr(f"Tick {tick['text']} ({name})")
+                f.write(f'     <g id={tick_id}>\n')
+                if tick['line'] is not None:
+                    self._write_path(f, [tick['line']], indent=6)
+                self._write_text(f, tick['label'], indent=6, fill=color)
+                f.write('     </g>\n')
+            f.write('    </g>\n')
+            f.write('   </g>\n')
+        f.write('  </g>\n')
+
+    def _emit_terrain(self, f, scene):
+        color = _hex(self.visual_params.get('line_color', '#ff7825'))
+        f.write('  <g id="Terrain" opacity="1">\n')
+
+        # Contornos: un <path> por nivel; bajo el nivel del mar, punteados
+        contour_stroke = self._stroke_attrs(color, 1.2)
+        f.write(f'   <g id="Terrain Lines" opacity="0.8" {contour_stroke}>\n')
+        dashes = np.asarray(rcParams['lines.dashed_pattern'], dtype=float)
+        if rcParams['lines.scale_dashes']:
+            dashes = dashes * 1.2
+        dash_attr = f' stroke-dasharray="{",".join(self._fmt(d) for d in dashes)}"'
+        for level, dashed, lines in scene['levels']:
+            extra = dash_attr if dashed else ''
+            self._write_path(f, lines, indent=4, attrs=f'id={quoteattr(f"Level {level:g}")}{extra}')
+        self._write_path(f, scene['structure']['perimeter'], indent=4, attrs='id="Perimeter"')
+        f.write('   </g>\n')
+
+        # "Pastel": soportes verticales y base
+        f.write(f'   <g id="Terrain Cake" opacity="0.6" {self._stroke_attrs(color, 1.5)}>\n')
+        for i, xy in enumerate(scene['structure']['supports'], start=1):
+            self._write_path(f, [xy], indent=4, attrs=f'id="Support {i}"')
+        self._write_path(f, scene['structure']['base'], indent=4, attrs='id="Base" stroke-width="1.2"')
+        f.write('   </g>\n')
+        f.write('  </g>\n')
+
+    def _stroke_attrs(self, color, width):
+        return (f'fill="none" stroke="{color}" stroke-width="{self._fmt(width)}" '
+                f'stroke-linecap="square" stroke-linejoin="round"')
+
+    def _write_path(self, f, lines, indent, attrs=''):
+        """Un <path> con todas las polilíneas (M x,y l dx,dy ...), compactado con format_line_path"""
+        lines = [xy for xy in lines if len(xy) >= 2]
+        if not lines:
+            return
+        ox, oy = self._origin
+        points = np.concatenate(lines)
+        points[:, 0] -= ox
+        points[:, 1] = (self._fig_height - points[:, 1]) - oy
+        starts = np.cumsum([0] + [len(xy) for xy in lines[:-1]])
+        closed = np.zeros(len(lines), dtype=bool)
+        d, _ = format_line_path(points, starts, closed, precision=self.precision,
+                                tolerance=self.simplify_tolerance)
+        f.write(f'{" " * indent}<path {attrs + " " if attrs else ""}d="{d}"/>\n')
+
+    def _write_text(self, f, text, indent, fill=None):
+        ox, oy = self._origin
+        x = text['x'] - ox
+        y = (self._fig_height - text['y']) - oy
+        fmt = self._fmt
+        attrs = [f'x="{fmt(x)}"', f'y="{fmt(y)}"', f'font-size="{fmt(text["size"])}"',
+                 f'font-family={quoteattr(rcParams["font.sans-serif"][0])}',
+                 f'text-anchor="{_ANCHOR.get(text["ha"], "middle")}"',
+                 f'dominant-baseline="{_BASELINE.get(text["va"], "central")}"']
+        if fill:
+            # Dentro de un grupo de trazos: relleno propio y sin contorno
+            attrs += [f'fill="{fill}"', 'stroke="none"']
+        if text['rotation']:
+            # matplotlib gira en sentido antihorario; en SVG (y hacia abajo) el ángulo se invierte
+            attrs.append(f'transform="rotate({fmt(-text["rotation"])} {fmt(x)} {fmt(y)})"')
+        f.write(f'{" " * indent}<text {" ".join(attrs)}>{escape(text["text"])}</text>\n')
+
+    def _fmt(self, value):
+        """Número con la precisión configurada, sin ceros sobrantes"""
+        text = f'{value:.{self.precision}f}'
+        if '.' in text:
+            text = text.rstrip('0').rstrip('.')
+        return text if text not in ('', '-0') else '0'
+
+
+def write_contour_svg(generator, visual_params, out_path, include_grid=None, scale=1, progress=None,
+                      precision=SVG_PRECISION, simplify_tolerance=0.0):
+    """
+    Exporta el mapa como SVG vectorial con el escritor nativo.
+
+    Args:
+        generator: Generador con terrain
+        visual_params: Parámetros de visualización
+        out_path: Ruta del .svg
+        include_grid: Incluir grilla y ejes (None usa visual_params['show_axis_labels'])
+        scale: 1, 2 o 4 (escala del lienzo, como export_map_clean)
+        progress: Callback opcional progress(fracción, etapa)
+        precision: Decimales de las coordenadas
+        simplify_tolerance: Tolerancia Douglas-Peucker en pt de salida (0 = sin simplificar)
+
+    Returns:
+        Ruta escrita
+    """
+    writer = SVGContourWriter(generator, visual_params, include_grid=include_grid, scale=scale,
+                              precision=precision, simplify_tolerance=simplify_tolerance)
+    return writer.write(out_path, progress=progress)
@@ -6,6 +6,8 @@ from matplotlib.widgets import Slider, Button, TextBox
 import random
 import numpy as np
 
+from controller.config import MAX_CRATERS
+
 
 class UIController:
     """Controlador de la interfaz de usuario"""
@@ -148,7 +150,7 @@ class UIController:
         y_start = 0.36
         gap = 0.08
         crater_slider_params = [
-            ('num_craters', 'Densidad', 0, 10, self.terrain_params['num_craters'], True, '%d'),
+            ('num_craters', 'Densidad', 0, MAX_CRATERS, self.terrain_params['num_craters'], True, '%d'),
             ('crater_size', 'Tamaño', 0.1, 1.0, self.terrain_params['crater_size'], False, '%1.1f'),
             ('crater_depth', 'Profundidad', 0.1, 1.0, self.terrain_params['crater_depth'], False, '%1.1f'),
         ]
@@ -1,13 +1,21 @@
 """
 Módulo de visualización 3D del terreno
 """
+import io
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import colors as mcolors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import os
 import sys
+import threading
 from typing import Any, Dict
 
+from view.contours import extract_contours, heightmap_digest
+from view.projection import CachedLine3DCollection
+from view.raster_preview import structure_polylines
+
 
 def safe_print(message: str):
     """Imprime mensajes de forma segura manejando errores de encoding en Windows"""
@@ -30,18 +38,7 @@ def ensure_unique_path(path: str) -> str:
         n += 1
 
 
-# ---- Utilidades compartidas y caché de meshgrid ----
-def _get_meshgrid(generator):
-    """Devuelve X_mesh, Y_mesh cacheados según dimensiones actuales."""
-    W, H = generator.width, generator.height
-    cache = getattr(generator, '_cached_grid', None)
-    if not cache or cache.get('shape') != (W, H):
-        X = np.linspace(0, W - 1, W)
-        Y = np.linspace(0, H - 1, H)
-        X_mesh, Y_mesh = np.meshgrid(X, Y)
-        generator._cached_grid = {'shape': (W, H), 'X': X_mesh, 'Y': Y_mesh}
-    return generator._cached_grid['X'], generator._cached_grid['Y']
-
+# ---- Utilidades compartidas ----
 def _compute_z_base(min_h: float, max_h: float) -> float:
     """
     Calcula la base del mapa 3D.
@@ -115,7 +112,7 @@ def export_preview_image(generator: Any, visual_params: Dict[str, Any], output_p
     export_map_clean(generator, visual_params, fmt='png', save_path=output_path, include_grid=visual_params.get('show_axis_labels', True), scale=1)
 
 
-def draw_map_3d(generator, num_contour_levels, elevation_angle, azimuth_angle, show_axis_labels=True, line_color='#ff7825', sea_level=0.0, grid_color='#00ffff', grid_width=0.6, grid_opacity=0.35):
+def draw_map_3d(generator, num_contour_levels, elevation_angle, azimuth_angle, show_axis_labels=True, line_color='#ff7825', sea_level=0.0, grid_color='#00ffff', grid_width=0.6, grid_opacity=0.35, contour_mode='merged'):
     """Dibuja el mapa topográfico 3D con líneas flotantes y caja en las esquinas"""
     # Verificar que el terreno esté generado
     if generator.terrain is None:
@@ -124,7 +121,6 @@ def draw_map_3d(generator, num_contour_levels, elevation_angle, azimuth_angle, s
     if generator.ax is not None:
         generator.ax.clear()
     # Meshgrid cacheado
-    X_mesh, Y_mesh = _get_meshgrid(generator)
     Z_mesh = generator.terrain.T
     
     min_h = float(Z_mesh.min())
@@ -140,21 +136,8 @@ def draw_map_3d(generator, num_contour_levels, elevation_angle, azimuth_angle, s
     
     # Dibujar líneas de contorno en su altura real (efecto holograma)
     if len(levels) > 0:
-        for level in levels:
-            # Líneas punteadas bajo el nivel del mar, sólidas arriba
-            linestyle = 'dashed' if level < sea_level else 'solid'
-            print(f"DEBUG nivel {level:.2f}: {'PUNTEADA' if level < sea_level else 'SÓLIDA'} (sea_level={sea_level})")
-            generator.ax.contour(
-                X_mesh, Y_mesh, Z_mesh,
-                levels=[level],
-                colors=line_color,
-                linewidths=1.2,
-                linestyles=[linestyle],  # Pasar como lista
-                alpha=0.8,
-                zorder=5,
-                zdir='z',
-                offset=level
-            )
+        _draw_contour_levels(generator.ax, generator.terrain, levels, line_color,
+                             linewidth=1.2, alpha=0.8, sea_level=sea_level, mode=contour_mode)
         
         # Soportes y caja - siempre se dibujan
         corners = [
@@ -201,17 +184,65 @@ def draw_map_3d(generator, num_contour_levels, elevation_angle, azimuth_angle, s
     generator.fig.canvas.draw_idle()
 
 
-def export_map_clean(generator, visual_params, fmt='png', save_path=None, include_grid=None, scale=1):
+def _no_progress(fraction, stage):
+    """Callback de progreso por defecto (no hace nada)"""
+
+
+def resolve_export_path(fmt='png', save_path=None):
+    """Ruta final de una exportación: extensión acorde a fmt y sin sobrescribir.
+    Si save_path es None, usa 'generados' (dentro de codigo) con timestamp.
+    """
+    from datetime import datetime
+    if save_path is None:
+        # Asegurar carpeta de salida (fuera de src, dentro de codigo)
+        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+        out_dir = os.path.join(project_root, 'generados')
+        os.makedirs(out_dir, exist_ok=True)
+        # Nombre con timestamp para evitar sobrescrituras
+        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = os.path.join(out_dir, f'mapa_topografico_3d_{ts}.{fmt}')
+        return ensure_unique_path(filename)
+    # Respetar extensión elegida
+    filename = save_path
+    # Ajustar extensión si no coincide con fmt
+    root, ext = os.path.splitext(filename)
+    if fmt.lower() not in (ext.lower().strip('.')):
+        filename = root + f'.{fmt}'
+    # Asegurar unicidad
+    return ensure_unique_path(filename)
+
+
+def export_map_clean(generator, visual_params, fmt='png', save_path=None, include_grid=None, scale=1,
+                     progress=None, svg_backend=None):
     """Exporta el mapa sin UI, solo las líneas topográficas y la caja de soporte.
     Puede configurar:
     - fmt: 'png' o 'svg'
     - save_path: ruta de salida. Si es None, guarda en 'generados' con timestamp
     - include_grid: True/False para incluir grilla y ejes. Si None, usa visual_params
     - scale: 1, 2 o 4 (escala del lienzo/figura)
+    - progress: callback opcional progress(fracción 0..1, etapa) (trabajos de exportación)
+    - svg_backend: 'native' o 'matplotlib'. Si None, usa RENDER_CONFIG['svg_backend']
     """
     # Verificar que el terreno esté generado
     if generator.terrain is None:
         raise ValueError("No hay terreno generado. Llama a generate_terrain() primero.")
+    progress = progress or _no_progress
+    from controller import config
+    if svg_backend is None:
+        svg_backend = config.RENDER_CONFIG.get('svg_backend', 'native')
+    svg_precision = config.RENDER_CONFIG.get('svg_precision', 2)
+    svg_tolerance = config.RENDER_CONFIG.get('svg_simplify_tolerance', 0.0)
+    if str(fmt).lower() == 'svg' and svg_backend == 'native':
+        # SVG directo por capas: sin figura matplotlib ni post-procesado
+        from view.svg_writer import write_contour_svg
+        filename = resolve_export_path(fmt, save_path)
+        write_contour_svg(generator, visual_params, filename, include_grid=include_grid,
+                          scale=scale, progress=progress, precision=svg_precision,
+                          simplify_tolerance=svg_tolerance)
+        print(f"\nExportado: {filename}")
+        progress(1.0, 'listo')
+        return True
+    progress(0.05, 'contornos')
     
     line_color = visual_params.get('line_color', '#ff7825')
     scale = int(scale) if str(scale).isdigit() else 1
@@ -221,7 +252,6 @@ def export_map_clean(generator, visual_params, fmt='png', save_path=None, includ
     figsize = (base_size[0] * scale, base_size[1] * scale)
     temp_fig = plt.figure(figsize=figsize, facecolor='black')
     temp_ax = temp_fig.add_subplot(111, projection='3d')
-    X_mesh, Y_mesh = _get_meshgrid(generator)
     Z_mesh = generator.terrain.T
     min_h = float(Z_mesh.min())
     max_h = float(Z_mesh.max())
@@ -231,20 +261,9 @@ def export_map_clean(generator, visual_params, fmt='png', save_path=None, includ
     levels = _compute_levels(min_h, max_h, visual_params['num_contour_levels'])
     sea_level = visual_params.get('sea_level', 0.0)
     if len(levels) > 0:
-        for level in levels:
-            # Líneas punteadas bajo el nivel del mar, sólidas arriba
-            linestyle = 'dashed' if level < sea_level else 'solid'
-            temp_ax.contour(
-                X_mesh, Y_mesh, Z_mesh,
-                levels=[level],
-                colors=line_color,
-                linewidths=1.2,
-                linestyles=[linestyle],  # Pasar como lista
-                alpha=0.8,
-                zorder=5,
-                zdir='z',
-                offset=level
-            )
+        _draw_contour_levels(temp_ax, generator.terrain, levels, line_color,
+                             linewidth=1.2, alpha=0.8, sea_level=sea_level,
+                             mode=visual_params.get('contour_mode', 'merged'))
         
     # Soportes y caja con margen inferior - siempre se dibujan
     corners = [
@@ -287,66 +306,38 @@ def export_map_clean(generator, visual_params, fmt='png', save_path=None, includ
     except Exception:
         pass
     
-    from datetime import datetime
     # Resolver ruta de salida
-    if save_path is None:
-        # Asegurar carpeta de salida (fuera de src, dentro de codigo)
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        out_dir = os.path.join(project_root, 'generados')
-        os.makedirs(out_dir, exist_ok=True)
-        # Nombre con timestamp para evitar sobrescrituras
-        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = os.path.join(out_dir, f'mapa_topografico_3d_{ts}.{fmt}')
-        filename = ensure_unique_path(filename)
-    else:
-        # Respetar extensión elegida
-        filename = save_path
-        # Ajustar extensión si no coincide con fmt
-        root, ext = os.path.splitext(filename)
-        if fmt.lower() not in (ext.lower().strip('.')):
-            filename = root + f'.{fmt}'
-        # Asegurar unicidad
-        filename = ensure_unique_path(filename)
+    filename = resolve_export_path(fmt, save_path)
 
+    progress(0.4, 'render')
     dpi = 300
     # Para PNG, escalar DPI adicionalmente para mejorar nitidez
     if str(fmt).lower() == 'png':
         temp_fig.savefig(filename, dpi=dpi, bbox_inches='tight', facecolor='black', pad_inches=0)
     else:
-        # SVG: guardar en temporal, optimizar, y mover al destino final
-        import tempfile
+        # SVG: render en memoria, un solo parseo (metadata + optimización) y una sola escritura
+        buf = io.BytesIO()
+        temp_fig.savefig(buf, format='svg', bbox_inches='tight', facecolor='black', pad_inches=0)
         
-        # Crear archivo temporal para SVG sin optimizar
-        temp_svg_fd, temp_svg_path = tempfile.mkstemp(suffix='.svg', prefix='map_temp_')
-        os.close(temp_svg_fd)  # Cerrar file descriptor
+        progress(0.8, 'svg')
+        from utils.svg_optimizer import optimize_svg
+        from view.svg_writer import svg_metadata_params
+        safe_print("\n[>] Optimizando estructura SVG...")
+        success = optimize_svg(buf, filename, metadata=svg_metadata_params(visual_params),
+                               precision=svg_precision,
+                               simplify_tolerance=svg_tolerance)
         
-        try:
-            # Guardar SVG temporal con matplotlib
-            temp_fig.savefig(temp_svg_path, bbox_inches='tight', facecolor='black', pad_inches=0)
-            
-            # Agregar metadata al SVG temporal
-            _add_svg_metadata(temp_svg_path, visual_params)
-            
-            # Optimizar SVG temporal y guardar en destino final
-            from utils.svg_optimizer import optimize_svg
-            safe_print("\n[>] Optimizando estructura SVG...")
-            success = optimize_svg(temp_svg_path, filename)
-            
-            if not success:
-                # Si falla la optimización, copiar el temporal al destino
-                safe_print("   [!] Usando version sin optimizar")
-                import shutil
-                shutil.copy2(temp_svg_path, filename)
-        finally:
-            # Eliminar archivo temporal
-            try:
-                os.remove(temp_svg_path)
-            except:
-                pass
+        if not success:
+            # Si falla la optimización, guardar la versión sin optimizar con su metadata
+            safe_print("   [!] Usando version sin optimizar")
+            with open(filename, 'wb') as f:
+                f.write(buf.getbuffer())
+            _add_svg_metadata(filename, visual_params)
     
     plt.close(temp_fig)
     
     print(f"\nExportado: {filename}")
+    progress(1.0, 'listo')
     return True
 
 
@@ -380,18 +371,9 @@ def _add_svg_metadata(svg_path, visual_params):
         # Crear elemento de parámetros de terreno
         terrain_params = etree.SubElement(metadata, 'terrain-render-params')
         
-        # Agregar parámetros clave
-        params = {
-            'grid-color': visual_params.get('grid_color', '#00ffff'),
-            'grid-opacity': str(visual_params.get('grid_opacity', 0.35)),
-            'grid-width': str(visual_params.get('grid_width', 0.6)),
-            'line-color': visual_params.get('line_color', '#ff7825'),
-            'line-opacity': '0.8',
-            'sea-level': str(visual_params.get('sea_level', 0.0)),
-            'elevation-angle': str(visual_params.get('elevation_angle', 25)),
-            'azimuth-angle': str(visual_params.get('azimuth_angle', 125)),
-            'num-contour-levels': str(visual_params.get('num_contour_levels', 15)),
-        }
+        # Agregar parámetros clave (los mismos que escribe el backend nativo)
+        from view.svg_writer import svg_metadata_params
+        params = svg_metadata_params(visual_params)
         
         safe_print(f"   [+] Agregando {len(params)} parametros:")
         for key, value in params.items():
@@ -531,76 +513,189 @@ def export_with_dialog(generator, visual_params):
         return export_map_clean(generator, visual_params, fmt='png', save_path=None, include_grid=visual_params.get('show_axis_labels', True), scale=1)
 
 
-def export_preview_image(generator, visual_params, out_path):
+def render_preview_png(generator, visual_params, backend='matplotlib', out_path=None):
+    """Renderiza la previsualización en memoria y devuelve los bytes PNG.
+    backend: 'matplotlib' usa el PreviewRenderer compartido (figura persistente);
+    'raster' usa el RasterPreviewRenderer (sin mplot3d ni savefig, sin etiquetas de ejes).
+    out_path: si se indica, además se escribe el PNG en disco.
+    """
+    if backend == 'raster':
+        from view.raster_preview import get_raster_renderer
+        return get_raster_renderer().render(generator, visual_params, out_path)
+    if backend != 'matplotlib':
+        raise ValueError(f"Backend de preview desconocido: {backend!r}")
+    return get_preview_renderer().render(generator, visual_params, out_path)
+
+
+def export_preview_image(generator, visual_params, out_path, backend='matplotlib'):
     """Renderiza una imagen de previsualización (PNG) para la UI web.
     out_path: ruta absoluta al archivo PNG de salida.
     """
-    # Verificar que el terreno esté generado
-    if generator.terrain is None:
-        raise ValueError("No hay terreno generado. Llama a generate_terrain() primero.")
-    
-    line_color = visual_params.get('line_color', '#ff7825')
-    temp_fig = plt.figure(figsize=(12, 8), facecolor='black')
-    temp_ax = temp_fig.add_subplot(111, projection='3d')
-    X_mesh, Y_mesh = _get_meshgrid(generator)
-    Z_mesh = generator.terrain.T
-    min_h = float(Z_mesh.min())
-    max_h = float(Z_mesh.max())
-    z_base = _compute_z_base(min_h, max_h)
+    render_preview_png(generator, visual_params, backend=backend, out_path=out_path)
+    return out_path
 
-    # Calcular y dibujar niveles - siempre genera niveles, incluso para terreno plano
-    levels = _compute_levels(min_h, max_h, visual_params['num_contour_levels'])
-    sea_level = visual_params.get('sea_level', 0.0)
-    
-    if len(levels) > 0:
-        for level in levels:
-            # Líneas punteadas bajo el nivel del mar, sólidas arriba
-            linestyle = 'dashed' if level < sea_level else 'solid'
-            temp_ax.contour(
-                X_mesh, Y_mesh, Z_mesh,
-                levels=[level], colors=line_color, linewidths=1.0,
-                linestyles=[linestyle], alpha=0.85, zdir='z', offset=level, zorder=5
+
+class PreviewRenderer:
+    """
+    Renderizador de previews con una figura/ejes 3D persistentes.
+    Responsable de:
+    - Mantener viva una única figura Agg (sin pyplot) entre previews.
+    - Rehacer solo los artistas cuyo origen cambió: contornos (heightmap,
+      niveles, estilo), caja/perímetro (heightmap, color) y estilo de ejes
+      (grilla y límites). La cámara y los límites se ajustan en cada llamada.
+    - Serializar los renders con un lock (callbacks Eel en otros hilos).
+    """
+
+    def __init__(self, figsize=(12, 8), dpi=150):
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize, facecolor='black')
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111, projection='3d')
+        self.ax.set_facecolor('black')
+        try:
+            self.ax.set_axisbelow(True)
+        except Exception:
+            pass
+        self._lock = threading.Lock()
+        # Artistas por grupo y clave con la que se construyeron
+        self._artists = {'contours': [], 'structure': [], 'style': []}
+        self._keys = {'contours': None, 'structure': None, 'style': None}
+
+    def render(self, generator, visual_params, out_path=None):
+        """Actualiza la figura con el estado actual y devuelve el PNG en bytes (y lo escribe en out_path si se indica)"""
+        if generator.terrain is None:
+            raise ValueError("No hay terreno generado. Llama a generate_terrain() primero.")
+        buf = io.BytesIO()
+        with self._lock:
+            self._update(generator, visual_params)
+            self.fig.savefig(buf, format='png', dpi=self.dpi, bbox_inches='tight', facecolor='black', pad_inches=0)
+        png = buf.getvalue()
+        if out_path:
+            out_dir = os.path.dirname(out_path)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            with open(out_path, 'wb') as f:
+                f.write(png)
+        return png
+
+    def _update(self, generator, visual_params):
+        ax = self.ax
+        terrain = generator.terrain
+        W, H = generator.width, generator.height
+        digest = heightmap_digest(terrain)
+        min_h = float(terrain.min())
+        max_h = float(terrain.max())
+        z_base = _compute_z_base(min_h, max_h)
+        line_color = visual_params.get('line_color', '#ff7825')
+
+        # Contornos: solo si cambian heightmap, niveles o estilo de línea
+        levels = _compute_levels(min_h, max_h, visual_params['num_contour_levels'])
+        sea_level = visual_params.get('sea_level', 0.0)
+        mode = visual_params.get('contour_mode', 'merged')
+        key = (digest, tuple(levels), sea_level, line_color, mode)
+        if key != self._keys['contours']:
+            self._replace('contours', key, lambda: _draw_contour_levels(
+                ax, terrain, levels, line_color, linewidth=1.0, alpha=0.85,
+                sea_level=sea_level, mode=mode
+            ))
+
+        # Caja con margen inferior y perímetro superior
+        key = (digest, line_color, W, H, z_base)
+        if key != self._keys['structure']:
+            self._replace('structure', key, lambda: self._draw_structure(generator, line_color, z_base))
+
+        ax.view_init(elev=visual_params['elevation_angle'], azim=visual_params['azimuth_angle'])
+        ax.set_xlim(0, W - 1)
+        ax.set_ylim(0, H - 1)
+        ax.set_zlim(z_base, max_h + 1)
+        # Configurar ticks adaptativos para el eje Z
+        ax.set_zticks(_compute_adaptive_ticks(z_base, max_h + 1))
+        z_range = (max_h - z_base) + 1
+        ax.set_box_aspect((W, H, max(z_range, 1)))
+
+        # Estilo de ejes (la bounding box depende de los límites)
+        show_axis_labels = bool(visual_params.get('show_axis_labels', True))
+        grid_color = visual_params.get('grid_color', '#00ffff')
+        grid_width = float(visual_params.get('grid_width', 0.6))
+        grid_opacity = float(visual_params.get('grid_opacity', 0.35))
+        key = (show_axis_labels, grid_color, grid_width, grid_opacity, W, H, z_base, max_h)
+        if key != self._keys['style']:
+            self._replace('style', key, lambda: _apply_axes_style(
+                ax, show_axis_labels, grid_color, grid_width, grid_opacity, cached=True
+            ))
+
+    def _replace(self, group, key, draw):
+        """Quita los artistas del grupo y los vuelve a crear con draw()"""
+        for artist in self._artists[group]:
+            try:
+                artist.remove()
+            except (ValueError, NotImplementedError):
+                pass
+        before = set(self.ax.lines) | set(self.ax.collections)
+        draw()
+        self._artists[group] = [a for a in list(self.ax.lines) + list(self.ax.collections)
+                                if a not in before]
+        self._keys[group] = key
+
+    def _draw_structure(self, generator, line_color, z_base):
+        """Soportes, base y perímetro como colecciones cacheadas (una por estilo)"""
+        structure = structure_polylines(generator.terrain, z_base)
+        styles = (('supports', 0.6, 1.0), ('base', 0.6, 0.9), ('perimeter', 0.85, 1.0))
+        for name, alpha, linewidth in styles:
+            collection = CachedLine3DCollection(
+                structure[name], colors=line_color, linewidths=linewidth, alpha=alpha, zorder=6
             )
-    
-    # Caja con margen inferior - siempre se dibuja
-    corners = [(0,0),(generator.width-1,0),(generator.width-1,generator.height-1),(0,generator.height-1)]
-    for i,j in corners:
-        z_val = generator.terrain[i,j]
-        temp_ax.plot([i,i],[j,j],[z_base,z_val], color=line_color, alpha=0.6, linewidth=1.0, zorder=6)
-    for idx in range(4):
-        i1,j1 = corners[idx]; i2,j2 = corners[(idx+1)%4]
-        temp_ax.plot([i1,i2],[j1,j2],[z_base,z_base], color=line_color, alpha=0.6, linewidth=0.9, zorder=6)
-    rgba = mcolors.to_rgba(line_color, alpha=0.85)
-    _draw_terrain_perimeter(generator, temp_ax, rgba, 1.0)
-    temp_ax.view_init(elev=visual_params['elevation_angle'], azim=visual_params['azimuth_angle'])
-    temp_ax.set_xlim(0, generator.width-1)
-    temp_ax.set_ylim(0, generator.height-1)
-    temp_ax.set_zlim(z_base, max_h+1)
-    # Configurar ticks adaptativos para el eje Z
-    z_ticks = _compute_adaptive_ticks(z_base, max_h + 1)
-    temp_ax.set_zticks(z_ticks)
-    z_range = (max_h - z_base) + 1
-    temp_ax.set_box_aspect((generator.width, generator.height, max(z_range,1)))
-    temp_ax.set_facecolor('black')
-    show_axis_labels = bool(visual_params.get('show_axis_labels', True))
-    grid_color = visual_params.get('grid_color', '#00ffff')
-    grid_width = float(visual_params.get('grid_width', 0.6))
-    grid_opacity = float(visual_params.get('grid_opacity', 0.35))
-    _apply_axes_style(temp_ax, show_axis_labels, grid_color, grid_width, grid_opacity)
-    try:
-        temp_ax.set_axisbelow(True)
-    except Exception:
-        pass
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    temp_fig.savefig(out_path, dpi=150, bbox_inches='tight', facecolor='black', pad_inches=0)
-    plt.close(temp_fig)
-    return out_path
+            self.ax.add_collection3d(collection)
+
+_preview_renderer = None
+_preview_renderer_lock = threading.Lock()
 
 
-def _apply_axes_style(ax, show_axis_labels, grid_color, grid_width, grid_opacity):
+def get_preview_renderer():
+    """Devuelve el PreviewRenderer compartido (se crea en el primer uso)"""
+    global _preview_renderer
+    with _preview_renderer_lock:
+        if _preview_renderer is None:
+            _preview_renderer = PreviewRenderer()
+        return _preview_renderer
+
+
+def _draw_contour_levels(ax, terrain, levels, line_color, linewidth, alpha, sea_level, mode='merged'):
+    """Dibuja las curvas de nivel a su altura real.
+    Las polilíneas salen de extract_contours (una pasada, cacheada).
+    Líneas punteadas bajo el nivel del mar, sólidas arriba.
+    - mode='merged': como máximo 2 colecciones (sólida y punteada), O(1) artistas
+    - mode='per_level': una colección por nivel (un grupo SVG por nivel)
+    """
+    contours = extract_contours(terrain, levels)
+    if mode == 'per_level':
+        groups = [
+            (f'TerrainContour_{idx}', 'dashed' if level < sea_level else 'solid', polylines)
+            for idx, (level, polylines) in enumerate(zip(levels, contours), start=1)
+        ]
+    else:
+        solid, dashed = [], []
+        for level, polylines in zip(levels, contours):
+            (dashed if level < sea_level else solid).extend(polylines)
+        groups = [('TerrainContour_solid', 'solid', solid), ('TerrainContour_dashed', 'dashed', dashed)]
+
+    for gid, linestyle, polylines in groups:
+        if not polylines:
+            continue
+        collection = CachedLine3DCollection(
+            polylines, colors=line_color, linewidths=linewidth,
+            linestyles=linestyle, alpha=alpha, zorder=5
+        )
+        # Id estable en SVG: el optimizador lo clasifica como contorno de terreno
+        collection.set_gid(gid)
+        ax.add_collection3d(collection)
+
+
+def _apply_axes_style(ax, show_axis_labels, grid_color, grid_width, grid_opacity, cached=False):
     """Aplica estilo de ejes y grilla según parámetros de UI.
     - show_axis_labels: activa/desactiva ejes completos
     - grid_color, grid_width, grid_opacity: estilo de grilla
+    - cached: bounding box como una sola colección con proyección cacheada (vista previa)
     """
     if show_axis_labels:
         # Aplica estilo de grilla y ejes 3D mediante _axinfo y tick_params
@@ -657,7 +752,7 @@ def _apply_axes_style(ax, show_axis_labels, grid_color, grid_width, grid_opacity
         except Exception:
             pass
         # Dibuja una bounding box personalizada con los parámetros del grid
-        _draw_bounding_box(ax, rgba, lw)
+        _draw_bounding_box(ax, rgba, lw, cached=cached)
     else:
         ax.grid(False)
         ax.set_xlabel('')
@@ -676,14 +771,26 @@ def _apply_axes_style(ax, show_axis_labels, grid_color, grid_width, grid_opacity
         ax.yaxis.pane.fill = False
         ax.zaxis.pane.fill = False
 
-def _draw_bounding_box(ax, rgba, lw):
+def _draw_bounding_box(ax, rgba, lw, cached=False):
     """Dibuja una caja de contorno personalizada alrededor del volumen visible.
     Usa los límites actuales y dibuja 4 aristas en la base (zmin) y 4 en la parte superior (zmax).
+    Con cached=True las 12 aristas van en un CachedLine3DCollection; si no, como
+    líneas sueltas (el optimizador SVG y svg_writer cuentan con esos line2d).
     """
     try:
         xmin, xmax = ax.get_xlim()
         ymin, ymax = ax.get_ylim()
         zmin, zmax = ax.get_zlim()
+        if cached:
+            bottom = np.array([(xmin, ymin, zmin), (xmax, ymin, zmin), (xmax, ymax, zmin),
+                               (xmin, ymax, zmin), (xmin, ymin, zmin)], dtype=float)
+            top = bottom.copy()
+            top[:, 2] = zmax
+            columns = [np.array([b, t]) for b, t in zip(bottom[:4], top[:4])]
+            ax.add_collection3d(CachedLine3DCollection(
+                [bottom, top] + columns, colors=[rgba], linewidths=lw, zorder=6
+            ))
+            return
         # Esquinas
         corners_bottom = [
             (xmin, ymin, zmin), (xmax, ymin, zmin),
@@ -39,3 +39,7 @@ export async function selectSavePath() {
 export async function exportOptions(opts) {
   return await eel().api_export_options(opts)();
 }
+
+export async function exportStatus(jobId) {
+  return await eel().api_export_status(jobId)();
+}
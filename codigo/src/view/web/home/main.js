@@ -1,6 +1,6 @@
 import { getEls, showLoader, showToast } from './ui.js';
 import { state, applyState } from './state.js';
-import { getState, updatePreview, suggestDownloadPath, selectSavePath, exportOptions } from './api.js';
+import { getState, updatePreview, suggestDownloadPath, selectSavePath, exportOptions, exportStatus } from './api.js';
 import { initLateralMenus } from './menu-controller.js';
 
 /**
@@ -18,43 +18,80 @@ function debounce(func, wait) {
   };
 }
 
+/**
+ * Apply an update result (preview URL and terrain stats) to the page
+ */
+function applyUpdateResult(res) {
+  if (!res || !res.ok) {
+    showToast(res?.error || 'Error al actualizar', 'error');
+    return;
+  }
+
+  if (res.preview) {
+    const els = getEls();
+    // URL versionada por ETag desde el backend (/preview.png?v=...)
+    els.preview.src = res.preview;
+    els.preview.classList.remove('hidden');
+  }
+  
+  if (res.terrain_stats && res.terrain_stats.max_height !== undefined) {
+    const maxHeight = Math.floor(res.terrain_stats.max_height);
+    const els = getEls();
+    if (els.seaLevelSlider) {
+      els.seaLevelSlider.max = String(maxHeight);
+      if (state.visual.sea_level > maxHeight) {
+        state.visual.sea_level = maxHeight;
+        els.seaLevelSlider.value = String(maxHeight);
+        els.seaLevelValue.value = String(maxHeight);
+      }
+    }
+  }
+}
+
+/**
+ * Results pushed by the backend render scheduler (only the latest pending
+ * update is rendered; intermediate slider values are dropped server-side)
+ */
+let lastRequestedSeq = 0;
+let lastShownSeq = 0;
+
+function onPreviewReady(res) {
+  if (!res || (res.seq !== undefined && res.seq < lastShownSeq)) return;
+  lastShownSeq = res.seq ?? lastShownSeq;
+  applyUpdateResult(res);
+  if (res.latest !== false && lastShownSeq >= lastRequestedSeq) {
+    showLoader(false);
+  }
+}
+
+if (window.eel) {
+  window.eel.expose(onPreviewReady, 'onPreviewReady');
+}
+
 /**
  * Update preview by sending current state to backend
  */
 const handleUpdate = debounce(async () => {
   showLoader(true);
+  let pending = false;
   try {
     const params = { terrain: state.terrain, visual: state.visual, craters: state.craters };
     const res = await updatePreview(params);
     
-    if (res && res.ok) {
-      if (res.preview) {
-        const els = getEls();
-        els.preview.src = res.preview + '?t=' + Date.now();
-        els.preview.classList.remove('hidden');
-      }
-      
-      if (res.terrain_stats && res.terrain_stats.max_height !== undefined) {
-        const maxHeight = Math.floor(res.terrain_stats.max_height);
-        const els = getEls();
-        if (els.seaLevelSlider) {
-          els.seaLevelSlider.max = String(maxHeight);
-          if (state.visual.sea_level > maxHeight) {
-            state.visual.sea_level = maxHeight;
-            els.seaLevelSlider.value = String(maxHeight);
-            els.seaLevelValue.value = String(maxHeight);
-          }
-        }
-      }
+    if (res && res.ok && res.pending) {
+      // El resultado llega por onPreviewReady
+      lastRequestedSeq = Math.max(lastRequestedSeq, res.seq ?? 0);
+      // Si el resultado ya llegó antes que esta respuesta, no esperar más
+      pending = lastShownSeq < lastRequestedSeq;
     } else {
-      showToast(res?.error || 'Error al actualizar', 'error');
+      applyUpdateResult(res);
     }
   } catch (error) {
     showToast('Error al actualizar', 'error');
   } finally {
-    showLoader(false);
+    if (!pending) showLoader(false);
   }
-}, 250);
+}, 100);
 
 /**
  * Wire up slider and its value input to state property
@@ -244,12 +281,13 @@ function wireMenuControls(els) {
         includeGrid: state.visual.show_axis_labels
       });
       
-      if (result && result.ok) {
-        showToast(`✓ Exportado exitosamente: ${filename}`, 'success', 4000);
-        // NO cerrar el menú - comportamiento esperado
-      } else {
+      if (!result || !result.ok) {
         showToast(result?.error || 'Error al exportar', 'error');
+        return;
       }
+      // La exportación corre en segundo plano: liberar la UI y seguir su progreso
+      showLoader(false);
+      watchExport(result.job, result.filename || filename);
     } catch (error) {
       console.error('Export error:', error);
       showToast('Error al exportar el mapa', 'error');
@@ -258,6 +296,35 @@ function wireMenuControls(els) {
     }
   });
 
+  // Polling del trabajo de exportación hasta que termina (varias pueden correr en paralelo)
+  async function watchExport(jobId, filename) {
+    let lastStage = null;
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 500));
+      let status;
+      try {
+        status = await exportStatus(jobId);
+      } catch (error) {
+        console.error('Export status error:', error);
+        showToast('Error al consultar la exportación', 'error');
+        return;
+      }
+      if (status.status === 'done') {
+        showToast(`✓ Exportado exitosamente: ${filename}`, 'success', 4000);
+        // NO cerrar el menú - comportamiento esperado
+        return;
+      }
+      if (status.status !== 'queued' && status.status !== 'running') {
+        showToast(status.error || 'Error al exportar', 'error');
+        return;
+      }
+      if (status.stage !== lastStage) {
+        lastStage = status.stage;
+        showToast(`Exportando ${filename}: ${Math.round(status.progress * 100)}% (${status.stage})`, 'info');
+      }
+    }
+  }
+
   els.seedInput.addEventListener('change', () => {
     let value = parseInt(els.seedInput.value.replace(/\D/g, '')) || 1;
     value = Math.max(1, Math.min(100000, Math.abs(value)));
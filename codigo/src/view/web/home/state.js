@@ -11,6 +11,11 @@ export function applyState(s, updateAll = true) {
   const craters = s.craters || s.crater || {};
   Object.assign(state.craters, craters);
 
+  // Límites que dicta el backend (config.py), antes de fijar los valores
+  if (s.limits && els.cDen && s.limits.crater_density != null) {
+    els.cDen.max = String(s.limits.crater_density);
+  }
+
   if (updateAll) {
     // Terrain parameters
     if (els.vh) {
@@ -138,7 +143,7 @@ export function applyState(s, updateAll = true) {
 
   // Update preview if it exists
   if (s.preview && els.preview) {
-    els.preview.src = s.preview + '?t=' + Date.now();
+    els.preview.src = s.preview;
     els.preview.classList.remove('hidden');
   }
 }
@@ -98,7 +98,7 @@ const loadTerrain = async (scene) => {
   try {
     const heightmap = await fetchHeightmap();
     
-    if (!heightmap || !Array.isArray(heightmap.z) || heightmap.z.length === 0) {
+    if (!heightmap || !heightmap.z || heightmap.z.length === 0) {
       showBanner('No hay heightmap disponible. Genera el mapa en Home e inténtalo nuevamente.');
       return false;
     }
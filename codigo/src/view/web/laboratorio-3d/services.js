@@ -4,10 +4,83 @@
  */
 
 /**
- * Fetch heightmap data from backend
- * @returns {Promise<{width: number, height: number, z: number[][]}>}
+ * Fetch heightmap data from backend.
+ * Uses the binary endpoint (Float32Array, flat z[j*width + i]) and falls back to JSON.
+ * @returns {Promise<{width: number, height: number, z: Float32Array|number[][]}>}
  */
 export async function fetchHeightmap() {
+  try {
+    return await fetchHeightmapBinary();
+  } catch (error) {
+    console.warn('Binary heightmap unavailable, falling back to JSON:', error);
+  }
+  return fetchHeightmapJson();
+}
+
+/**
+ * Fetch heightmap as raw little-endian bytes from /heightmap.bin
+ * @param {{fmt?: 'f32'|'u16', gzip?: boolean}} options
+ * @returns {Promise<{width: number, height: number, z: Float32Array}>}
+ */
+export async function fetchHeightmapBinary({ fmt = 'f32', gzip = false } = {}) {
+  const response = await fetch(`/heightmap.bin?fmt=${fmt}&gzip=${gzip ? 1 : 0}`, { cache: 'no-store' });
+  if (!response.ok) {
+    throw new Error(`HTTP ${response.status}`);
+  }
+
+  const width = parseInt(response.headers.get('X-Heightmap-Width'), 10);
+  const height = parseInt(response.headers.get('X-Heightmap-Height'), 10);
+  const format = response.headers.get('X-Heightmap-Format') || fmt;
+  if (!(width > 0 && height > 0)) {
+    throw new Error('Invalid heightmap headers');
+  }
+
+  const buffer = await response.arrayBuffer();
+  let z;
+  if (format === 'u16') {
+    // Dequantize [0, 65535] -> [min, max]
+    const min = parseFloat(response.headers.get('X-Heightmap-Min'));
+    const max = parseFloat(response.headers.get('X-Heightmap-Max'));
+    const q = new Uint16Array(buffer);
+    const step = (max - min) / 65535;
+    z = new Float32Array(q.length);
+    for (let i = 0; i < q.length; i++) {
+      z[i] = min + q[i] * step;
+    }
+  } else {
+    // Zero-copy view over the response buffer
+    z = new Float32Array(buffer);
+  }
+
+  if (z.length !== width * height) {
+    throw new Error(`Unexpected heightmap size: ${z.length} (expected ${width * height})`);
+  }
+  return { width, height, z };
+}
+
+/**
+ * Upload an external heightmap as raw bytes to POST /heightmap
+ * @param {ArrayBuffer|ArrayBufferView|Blob} data - float32/uint16 (z[j*width + i]) or PNG bytes
+ * @param {{fmt?: 'f32'|'u16'|'png', width?: number, height?: number, normalize?: boolean}} options
+ * @returns {Promise<{ok: boolean, width?: number, height?: number, preview?: string, error?: string}>}
+ */
+export async function uploadHeightmap(data, { fmt = 'f32', width, height, normalize = true } = {}) {
+  const params = new URLSearchParams({ fmt, normalize: normalize ? '1' : '0' });
+  if (width) params.set('width', String(width));
+  if (height) params.set('height', String(height));
+  const response = await fetch(`/heightmap?${params}`, {
+    method: 'POST',
+    headers: { 'Content-Type': fmt === 'png' ? 'image/png' : 'application/octet-stream' },
+    body: data
+  });
+  return response.json();
+}
+
+/**
+ * Fetch heightmap as JSON through Eel (fallback)
+ * @returns {Promise<{width: number, height: number, z: number[][]}>}
+ */
+export async function fetchHeightmapJson() {
   try {
     const response = await eel.api_get_heightmap()();
     
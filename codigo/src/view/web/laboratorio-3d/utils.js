@@ -89,7 +89,8 @@ export const validateHeightmap = (heightmap) => {
     errors.push(`Invalid height: ${heightmap.height}`);
   }
 
-  if (!Array.isArray(heightmap.z)) {
+  // Array JS (JSON) o Float32Array (transporte binario)
+  if (!Array.isArray(heightmap.z) && !ArrayBuffer.isView(heightmap.z)) {
     errors.push('Heightmap z is not an array');
     return { valid: false, errors };
   }
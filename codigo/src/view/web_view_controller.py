@@ -2,13 +2,21 @@
 View Controller - Maneja la interacción con la interfaz web mediante Eel
 Actúa como adaptador entre el controlador y la vista (HTML/JS)
 """
+import copy
+import gzip
 import os
 import sys
 import eel
 import bottle
+import gevent
 from typing import Dict, Any, Callable
 from datetime import datetime
 
+from controller.config import MAX_CRATERS
+from view.export_jobs import ExportJobManager
+from view.preview_store import PREVIEW_ROUTE, PreviewStore
+from view.render_scheduler import RenderScheduler
+
 # Asegurar que el directorio src esté en el path
 if __name__ == "__main__":
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -20,7 +28,11 @@ class WebViewController:
     Responsable de:
     - Exponer endpoints Eel para la comunicación JS ↔ Python
     - Manejar rutas HTTP para exportación
-    - Gestionar archivos temporales de preview
+    - Exportar en un pool de procesos (ExportJobManager): id de trabajo,
+      consulta de progreso y descarga cuando está listo
+    - Servir la preview desde memoria (PreviewStore, sin archivos temporales)
+    - Procesar las actualizaciones en segundo plano (RenderScheduler) y
+      empujar cada preview terminada a la página (callback Eel onPreviewReady)
     - Delegar lógica de negocio al MapController
     """
     
@@ -31,17 +43,24 @@ class WebViewController:
         Args:
             map_controller: Instancia de MapController para delegar operaciones
             web_dir: Directorio con archivos estáticos (HTML/CSS/JS)
-            preview_dir: Subdirectorio para imágenes de preview
+            preview_dir: Subdirectorio para archivos temporales (exportaciones HTTP)
         """
         self.map_controller = map_controller
         self.web_dir = web_dir
         self.preview_dir = os.path.join(web_dir, preview_dir)
         
-        # Asegurar que existe el directorio de previews
+        # Asegurar que existe el directorio temporal
         os.makedirs(self.preview_dir, exist_ok=True)
         
-        # Ruta del preview actual
-        self.preview_path = os.path.join(self.preview_dir, 'preview.png')
+        # Preview actual en memoria
+        self.preview_store = PreviewStore()
+        
+        # Actualizaciones en segundo plano (solo se conserva la última pendiente)
+        self.render_scheduler = RenderScheduler(self._render_update, self._push_update)
+        self._hub_loop = None
+        
+        # Exportaciones en procesos aparte (el servidor sigue respondiendo)
+        self.export_jobs = ExportJobManager()
         
         # Limpiar archivos antiguos al iniciar
         self._cleanup_old_files()
@@ -59,7 +78,9 @@ class WebViewController:
             keep_files: Lista de nombres de archivos a conservar (opcional)
         """
         if keep_files is None:
-            keep_files = ['preview.png']
+            keep_files = []
+        # Nunca borrar salidas de trabajos de exportación en curso o por descargar
+        keep_files = set(keep_files) | {os.path.basename(p) for p in self.export_jobs.output_files()}
         
         try:
             for filename in os.listdir(self.preview_dir):
@@ -76,6 +97,8 @@ class WebViewController:
         
     def setup_eel_routes(self):
         """Registra todas las rutas Eel para comunicación con JS"""
+        # Bucle de gevent del servidor Eel: los resultados del hilo de fondo se entregan en él
+        self._hub_loop = gevent.get_hub().loop
         
         @eel.expose
         def api_get_state():
@@ -85,7 +108,9 @@ class WebViewController:
                 'terrain': state['params']['terrain'],
                 'visual': state['params']['visual'],
                 'craters': state['params'].get('crater', {}),
-                'preview': 'tmp/preview.png'
+                'preview': self.preview_store.url(),
+                # Límites de los controles (la validación del modelo usa los mismos)
+                'limits': {'crater_density': MAX_CRATERS}
             }
             # Agregar estadísticas del terreno si existen
             if 'terrain_stats' in state['params']:
@@ -94,44 +119,53 @@ class WebViewController:
         
         @eel.expose
         def api_update(params: dict):
-            """Actualiza parámetros y regenera el mapa"""
-            result = self.map_controller.handle_update(params)
-            if result['ok']:
-                # Generar preview
-                self._generate_preview()
-                result['preview'] = 'tmp/preview.png'
-                # Agregar estadísticas del terreno si existen
-                if 'params' in result and 'terrain_stats' in result['params']:
-                    result['terrain_stats'] = result['params']['terrain_stats']
-            return result
+            """
+            Encola la actualización de parámetros y vuelve de inmediato.
+            El resultado (preview, estadísticas o error) llega por onPreviewReady.
+            """
+            seq = self.render_scheduler.submit(params)
+            return {'ok': True, 'pending': True, 'seq': seq}
         
         @eel.expose
         def api_random_seed():
             """Genera una semilla aleatoria"""
             import random
             seed = random.randint(1, 10_000_000)
-            result = self.map_controller.handle_terrain_update(seed=seed)
-            if result['ok']:
-                self._generate_preview()
-                result['preview'] = 'tmp/preview.png'
-                # Agregar estadísticas del terreno si existen
-                if 'params' in result and 'terrain_stats' in result['params']:
-                    result['terrain_stats'] = result['params']['terrain_stats']
-            return result
+            
+            def work():
+                result = self.map_controller.handle_terrain_update(seed=seed)
+                if result['ok']:
+                    result['preview'] = self._generate_preview()
+                    # Agregar estadísticas del terreno si existen
+                    if 'params' in result and 'terrain_stats' in result['params']:
+                        result['terrain_stats'] = result['params']['terrain_stats']
+                return result
+            return self._run_exclusive(work)
         
         @eel.expose
         def api_export_options(opts: dict):
             """
-            Exporta el mapa con opciones específicas.
+            Encola la exportación del mapa con opciones específicas y vuelve de inmediato.
             opts: { fmt: 'png'|'svg', includeGrid: bool, scale: 1|2|4, path: string }
+            El progreso se consulta con api_export_status(job).
             """
-            export_params = {
-                'format': opts.get('fmt', 'png'),
-                'path': opts.get('path'),
-                'scale': opts.get('scale', 1),
-                'include_grid': opts.get('includeGrid', True)
-            }
-            return self.map_controller.handle_export(export_params)
+            try:
+                job_id = self._submit_export(
+                    fmt=opts.get('fmt', 'png'),
+                    save_path=opts.get('path'),
+                    include_grid=opts.get('includeGrid', True),
+                    scale=opts.get('scale', 1)
+                )
+            except Exception as e:
+                return {'ok': False, 'error': f"Error al exportar: {str(e)}"}
+            result = self.export_jobs.status(job_id)
+            result['pending'] = True
+            return result
+        
+        @eel.expose
+        def api_export_status(job_id: str):
+            """Estado de un trabajo de exportación: {status, progress, stage, path, error}"""
+            return self.export_jobs.status(job_id)
         
         @eel.expose
         def api_suggest_download_path():
@@ -229,31 +263,32 @@ class WebViewController:
         @eel.expose
         def api_reset_view():
             """Resetea la vista a ángulos por defecto"""
-            result = self.map_controller.handle_reset_rotation()
-            if result['ok']:
-                self._generate_preview()
-                result['preview'] = 'tmp/preview.png'
-            return result
+            def work():
+                result = self.map_controller.handle_reset_rotation()
+                if result['ok']:
+                    result['preview'] = self._generate_preview()
+                return result
+            return self._run_exclusive(work)
         
         @eel.expose
         def api_get_heightmap():
             """Devuelve el mapa de alturas como JSON para WebGL"""
-            generator = self.map_controller.model.generator
-            return generator.get_heightmap_payload()
+            return self._snapshot_generator().get_heightmap_payload()
         
         @eel.expose
         def api_set_heightmap(payload: dict):
-            """Inyecta un mapa de alturas externo desde JSON"""
+            """Inyecta un mapa de alturas externo desde JSON (para buffers grandes usar POST /heightmap)"""
             try:
                 z = payload.get('z')
                 if not z:
                     return {'ok': False, 'error': 'z vacío'}
                 
-                generator = self.map_controller.model.generator
-                generator.set_heightmap(z, normalize=True)
-                self._generate_preview()
-                
-                return {'ok': True, 'preview': 'tmp/preview.png'}
+                def work():
+                    model = self.map_controller.model
+                    model.generator.set_heightmap(z, normalize=True)
+                    model.install_heightmap(model.generator.terrain)
+                    return {'ok': True, 'preview': self._generate_preview()}
+                return self._run_exclusive(work)
             except Exception as e:
                 return {'ok': False, 'error': str(e)}
 
@@ -327,74 +362,295 @@ class WebViewController:
             laboratorio_root = os.path.join(self.web_dir, 'laboratorio-3d')
             return bottle.static_file(filename, root=laboratorio_root)
         
-        # Serve tmp directory for preview images
+        @bottle.route(PREVIEW_ROUTE)
+        def http_preview():
+            """Preview actual desde memoria; responde 304 si el ETag del cliente coincide"""
+            data, etag = self.preview_store.get()
+            if data is None:
+                bottle.response.status = 404
+                return 'No preview'
+            
+            bottle.response.set_header('ETag', f'"{etag}"')
+            bottle.response.set_header('Cache-Control', 'no-cache')
+            if_none_match = bottle.request.headers.get('If-None-Match', '')
+            if etag in {tag.strip().strip('"') for tag in if_none_match.split(',')}:
+                bottle.response.status = 304
+                return ''
+            bottle.response.content_type = 'image/png'
+            return data
+        
+        # Serve tmp directory for exported files
         @bottle.route('/tmp/<filename>')
         def http_tmp(filename):
             tmp_root = os.path.join(self.web_dir, 'tmp')
             return bottle.static_file(filename, root=tmp_root)
         
-        @bottle.route('/export')
-        def http_export():
-            """Endpoint HTTP para exportación con descarga directa"""
-            from view.visualization import export_map_clean, ensure_unique_path
-            
+        @bottle.route('/heightmap.bin')
+        def http_heightmap_binary():
+            """
+            Heightmap binario little-endian para el visor WebGL (alternativa al JSON).
+            Query: fmt=f32|u16, gzip=1 (solo si el cliente acepta gzip).
+            Cabeceras: X-Heightmap-Width/Height/Min/Max/Format.
+            """
             q = bottle.request.query
-            fmt = str(q.get('fmt', 'png')).lower()
-            include_grid = str(q.get('includeGrid', '1')).lower() in ('1', 'true', 'yes')
-            
-            try:
-                scale = int(q.get('scale', '1'))
-            except Exception:
-                scale = 1
-            
-            if fmt not in ('png', 'svg'):
-                fmt = 'png'
-            if scale not in (1, 2, 4):
-                scale = 1
-            
-            tmp_dir = os.path.join(self.web_dir, 'tmp')
-            os.makedirs(tmp_dir, exist_ok=True)
+            fmt = str(q.get('fmt', 'f32')).lower()
+            if fmt not in ('f32', 'u16'):
+                fmt = 'f32'
             
-            ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-            desired = os.path.join(tmp_dir, f'mapa_topografico_3d_{ts}.{fmt}')
-            final_path = ensure_unique_path(desired)
+            data, meta = self._snapshot_generator().get_heightmap_binary(fmt)
+            if data is None:
+                bottle.response.status = 404
+                return 'No heightmap'
             
-            # Usar el generador del modelo
-            generator = self.map_controller.model.generator
-            visual_params = self.map_controller.model.visual_params
+            bottle.response.content_type = 'application/octet-stream'
+            bottle.response.set_header('Cache-Control', 'no-store')
+            bottle.response.set_header('X-Heightmap-Width', str(meta['width']))
+            bottle.response.set_header('X-Heightmap-Height', str(meta['height']))
+            bottle.response.set_header('X-Heightmap-Min', repr(meta['min']))
+            bottle.response.set_header('X-Heightmap-Max', repr(meta['max']))
+            bottle.response.set_header('X-Heightmap-Format', meta['format'])
             
-            export_map_clean(
-                generator, visual_params,
-                fmt=fmt, save_path=final_path,
-                include_grid=include_grid, scale=scale
-            )
-            
-            if not os.path.isfile(final_path):
+            want_gzip = str(q.get('gzip', '0')).lower() in ('1', 'true', 'yes')
+            if want_gzip and 'gzip' in bottle.request.headers.get('Accept-Encoding', ''):
+                data = gzip.compress(data, compresslevel=1)
+                bottle.response.set_header('Content-Encoding', 'gzip')
+            return data
+        
+        @bottle.route('/heightmap', method='POST')
+        def http_set_heightmap():
+            """
+            Importa un heightmap externo desde el cuerpo binario de la petición.
+            Query: fmt=f32|u16|png, width, height (formatos crudos, orden z[j*width + i]),
+            normalize=1|0.
+            """
+            q = bottle.request.query
+            fmt = str(q.get('fmt', 'f32')).lower()
+            normalize = str(q.get('normalize', '1')).lower() in ('1', 'true', 'yes')
+            try:
+                data = bottle.request.body.read()
+                if not data:
+                    bottle.response.status = 400
+                    return {'ok': False, 'error': 'cuerpo vacío'}
+                
+                def work():
+                    model = self.map_controller.model
+                    width, height = model.generator.set_heightmap_bytes(
+                        data, fmt=fmt,
+                        width=q.get('width'), height=q.get('height'),
+                        normalize=normalize
+                    )
+                    # Copia propia y contigua: sin vistas sobre el cuerpo de la petición
+                    model.install_heightmap(model.generator.terrain)
+                    return {'ok': True, 'width': width, 'height': height, 'preview': self._generate_preview()}
+                return self._run_exclusive(work)
+            except ValueError as e:
+                bottle.response.status = 400
+                return {'ok': False, 'error': str(e)}
+        
+        @bottle.route('/export')
+        def http_export():
+            """
+            Endpoint HTTP para exportación con descarga directa.
+            El trabajo corre en el pool; la petición espera cediendo el bucle de gevent.
+            """
+            try:
+                job_id = self._submit_http_export(bottle.request.query)
+            except ValueError as e:
+                bottle.response.status = 400
+                return str(e)
+            self.export_jobs.wait(job_id, sleep=gevent.sleep)
+            job = self.export_jobs.get(job_id)
+            if job is None or job.status != 'done':
                 bottle.response.status = 500
                 return 'Export failed'
             
-            # Limpiar archivos antiguos, manteniendo solo el preview y el recién exportado
-            self._cleanup_old_files(keep_files=['preview.png', os.path.basename(final_path)])
-            
-            return bottle.static_file(
-                os.path.basename(final_path),
-                root=os.path.dirname(final_path),
-                download=os.path.basename(final_path)
-            )
+            # Limpiar archivos antiguos (se conservan los de otros trabajos)
+            self._cleanup_old_files(keep_files=[os.path.basename(job.path)])
+            return self._download_export(job)
+        
+        @bottle.route('/export/jobs', method='POST')
+        def http_export_submit():
+            """
+            Encola una exportación. Query: fmt=png|svg, scale=1|2|4, includeGrid=1|0.
+            Devuelve el id del trabajo y las URLs de estado y descarga.
+            """
+            try:
+                job_id = self._submit_http_export(bottle.request.query)
+            except ValueError as e:
+                bottle.response.status = 400
+                return {'ok': False, 'error': str(e)}
+            bottle.response.status = 202
+            result = self.export_jobs.status(job_id)
+            result['status_url'] = f'/export/jobs/{job_id}'
+            result['download_url'] = f'/export/jobs/{job_id}/download'
+            return result
+        
+        @bottle.route('/export/jobs/<job_id>')
+        def http_export_status(job_id):
+            """Estado y progreso de un trabajo de exportación (polling)"""
+            result = self.export_jobs.status(job_id)
+            if result['status'] == 'unknown':
+                bottle.response.status = 404
+            bottle.response.set_header('Cache-Control', 'no-store')
+            return result
+        
+        @bottle.route('/export/jobs/<job_id>/download')
+        def http_export_download(job_id):
+            """Descarga el archivo de un trabajo terminado (409 si aún no está listo)"""
+            job = self.export_jobs.get(job_id)
+            if job is None:
+                bottle.response.status = 404
+                return {'ok': False, 'error': 'Trabajo desconocido'}
+            if job.status != 'done':
+                bottle.response.status = 409 if not job.done else 500
+                return self.export_jobs.status(job_id)
+            return self._download_export(job)
         
         # Catch-all route for other static files (CSS, JS, etc.) in web root
         @bottle.route('/<filename:re:.*\\.(js|css|png|jpg|jpeg|gif|svg|ico)$>')
         def http_static_files(filename):
             return bottle.static_file(filename, root=self.web_dir)
     
+    def _submit_export(self, fmt='png', save_path=None, include_grid=True, scale=1):
+        """
+        Encola la exportación del mapa actual en el pool. Devuelve el id del trabajo.
+        El envío se hace con el lock del RenderScheduler: la copia del heightmap a
+        memoria compartida y la de visual_params son una instantánea coherente,
+        aunque un render en segundo plano reemplace el terreno justo después.
+        """
+        model = self.map_controller.model
+        
+        def submit():
+            if model.heightmap is None:
+                raise ValueError("No hay mapa generado para exportar.")
+            return self.export_jobs.submit(
+                model.generator, dict(model.visual_params),
+                fmt=fmt, save_path=save_path,
+                include_grid=include_grid, scale=scale
+            )
+        return self._read_model(submit)
+    
+    def _submit_http_export(self, q):
+        """Encola una exportación HTTP (salida en tmp/) a partir de la query"""
+        fmt = str(q.get('fmt', 'png')).lower()
+        include_grid = str(q.get('includeGrid', '1')).lower() in ('1', 'true', 'yes')
+        
+        try:
+            scale = int(q.get('scale', '1'))
+        except Exception:
+            scale = 1
+        
+        if fmt not in ('png', 'svg'):
+            fmt = 'png'
+        if scale not in (1, 2, 4):
+            scale = 1
+        
+        tmp_dir = os.path.join(self.web_dir, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        
+        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+        desired = os.path.join(tmp_dir, f'mapa_topografico_3d_{ts}.{fmt}')
+        return self._submit_export(fmt=fmt, save_path=desired, include_grid=include_grid, scale=scale)
+    
+    @staticmethod
+    def _download_export(job):
+        """Respuesta de descarga para el archivo de un trabajo terminado"""
+        if not os.path.isfile(job.path):
+            bottle.response.status = 410
+            return 'Export file no longer available'
+        return bottle.static_file(
+            os.path.basename(job.path),
+            root=os.path.dirname(job.path),
+            download=os.path.basename(job.path)
+        )
+    
     def _generate_preview(self):
-        """Genera la imagen de preview usando el modelo actual"""
-        from view.visualization import export_preview_image
+        """
+        Genera la preview del modelo actual en memoria (backend según RENDER_CONFIG).
         
+        Returns:
+            URL versionada de la preview (cambia con el contenido)
+        """
         generator = self.map_controller.model.generator
         visual_params = self.map_controller.model.visual_params
         
-        export_preview_image(generator, visual_params, self.preview_path)
+        png = self.map_controller.render_controller.render_preview_bytes(generator, visual_params)
+        self.preview_store.put(png)
+        return self.preview_store.url()
+    
+    def _run_exclusive(self, work):
+        """
+        Ejecuta una operación síncrona sobre el modelo serializada con el RenderScheduler.
+        El lock del planificador es un threading.RLock que el hilo de fondo retiene durante
+        todo un render: esperarlo desde un greenlet congelaría el bucle de gevent (HTTP,
+        websocket y previews). Por eso se espera en el threadpool del hub; solo el greenlet
+        que llama queda suspendido.
+        
+        Returns:
+            Resultado de work() con 'seq' (mismo orden que las actualizaciones encoladas)
+        """
+        hub = gevent.get_hub()
+        seq, result = hub.threadpool.apply(self.render_scheduler.run_exclusive, (work,))
+        if isinstance(result, dict):
+            result['seq'] = seq
+        return result
+    
+    def _read_model(self, fn):
+        """
+        Ejecuta fn() con el lock del RenderScheduler (nunca a mitad de un render) sin
+        descartar actualizaciones pendientes. Se espera en el threadpool del hub, como
+        en _run_exclusive.
+        """
+        return gevent.get_hub().threadpool.apply(self.render_scheduler.read, (fn,))
+    
+    def _snapshot_generator(self):
+        """
+        Copia ligera del generador (terreno, tamaño y escala coherentes entre sí).
+        El terreno publicado nunca se modifica in situ (se reemplaza entero), así que
+        basta copiar la referencia; la serialización ocurre ya fuera del lock.
+        """
+        return self._read_model(lambda: copy.copy(self.map_controller.model.generator))
+    
+    def _render_update(self, job):
+        """
+        Trabajo del RenderScheduler: aplica los parámetros y genera la preview (hilo de fondo).
+        En mapas grandes se empuja antes un borrador; si llegan parámetros nuevos
+        el trabajo se cancela tras el borrador (devuelve None, nada que publicar).
+        """
+        render_controller = self.map_controller.render_controller
+        
+        def on_draft(draft):
+            if job.superseded():
+                return False
+            png = render_controller.render_draft_bytes(draft, self.map_controller.model.visual_params)
+            self.preview_store.put(png)
+            self._push_update({'ok': True, 'draft': True, 'preview': self.preview_store.url()}, job)
+            return not job.superseded()
+        
+        try:
+            result = self.map_controller.handle_update(job.params, on_draft=on_draft)
+            if result.get('cancelled'):
+                return None
+            if result['ok']:
+                result['preview'] = self._generate_preview()
+                # Agregar estadísticas del terreno si existen
+                if 'params' in result and 'terrain_stats' in result['params']:
+                    result['terrain_stats'] = result['params']['terrain_stats']
+        except Exception as e:
+            result = {'ok': False, 'error': str(e)}
+        return result
+    
+    def _push_update(self, result, job):
+        """Entrega el resultado a la página desde el bucle de gevent (seguro entre hilos)"""
+        if result is None:
+            return
+        result['seq'] = job.seq
+        # Un borrador nunca es el resultado final
+        result['latest'] = not result.get('draft') and not job.superseded()
+        callback = getattr(eel, 'onPreviewReady', None)
+        if self._hub_loop is None or callback is None:
+            return
+        self._hub_loop.run_callback_threadsafe(gevent.spawn, callback, result)
     
     def initialize_preview(self):
         """Genera el preview inicial al arrancar la aplicación"""
@@ -1,8 +1,34 @@
+import importlib
 import os
 import sys
 
+import pytest
+
 # Add <project_root>/src to sys.path for tests so `import config` works
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
 if SRC_DIR not in sys.path:
     sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture
+def visual_params():
+    """Parámetros visuales de las pruebas de exportación (copia nueva por prueba)"""
+    return {
+        'num_contour_levels': 6,
+        'elevation_angle': 25,
+        'azimuth_angle': 125,
+        'line_color': '#ff7825',
+        'sea_level': 0.0,
+        'show_axis_labels': True,
+    }
+
+
+@pytest.fixture
+def small_generator():
+    """Generador 48x27 con terreno ya generado, sin cráteres (exportaciones rápidas)"""
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    gen = terrain_module.TopographicMapGenerator(width=48, height=27)
+    gen.generate_terrain(terrain_roughness=40, height_variation=3.0, seed=9, crater_enabled=False,
+                         num_craters=0, crater_size=0.4, crater_depth=0.4)
+    return gen
@@ -0,0 +1,72 @@
+import importlib
+import json
+import os
+import sys
+
+import numpy as np
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def test_grid_expansion_and_seed_specs():
+    batch = importlib.import_module('batch')
+
+    assert batch.parse_seeds('1-3,7,2') == [1, 2, 3, 7]
+    axes = batch.parse_grid(['terrain_roughness=20,80', 'visual.line_color=#ffffff'])
+    assert axes == [(('terrain', 'terrain_roughness'), [20, 80]), (('visual', 'line_color'), ['#ffffff'])]
+
+    items = list(batch.expand_items(axes, seeds=[1, 2], width=32, height=18))
+    assert len(items) == 4
+    assert len({item['id'] for item in items}) == 4
+    # Ids estables entre ejecuciones
+    assert [item['id'] for item in items] == [item['id'] for item in batch.expand_items(axes, seeds=[1, 2], width=32, height=18)]
+    assert items[0]['params']['terrain'] == {'terrain_roughness': 20, 'seed': 1}
+
+
+def test_batch_item_backend_does_not_leak_into_config(tmp_path, monkeypatch):
+    batch = importlib.import_module('batch')
+    config = importlib.import_module('controller.config')
+    monkeypatch.setattr(config, 'NOISE_BACKEND', 'fbm')
+
+    items = list(batch.expand_items([], seeds=[3], width=32, height=18, backend='spectral'))
+    counts = batch.run_batch(items, str(tmp_path / 'lote'), formats=('npy',), workers=1, log=lambda msg: None)
+    assert counts['ok'] == 1
+    assert batch.load_manifest(str(tmp_path / 'lote'))[items[0]['id']]['backend'] == 'spectral'
+    assert config.NOISE_BACKEND == 'fbm'
+
+
+def test_batch_writes_manifest_and_resumes(tmp_path):
+    batch = importlib.import_module('batch')
+    out_dir = str(tmp_path / 'lote')
+    items = list(batch.expand_items(batch.parse_grid(['terrain_roughness=30']), seeds=[4, 5, 6], width=32, height=18))
+    logs = []
+
+    counts = batch.run_batch(items, out_dir, formats=('npy',), workers=1, log=logs.append)
+    assert counts == {'total': 3, 'skipped': 0, 'ok': 3, 'errors': 0}
+    records = batch.load_manifest(out_dir)
+    assert set(records) == {item['id'] for item in items}
+    first = records[items[0]['id']]
+    terrain = np.load(os.path.join(out_dir, first['files']['npy']))
+    assert terrain.shape == (32, 18)
+    assert first['stats']['max_height'] == float(terrain.max())
+    # El modelo del worker no retiene heightmaps: cada mapa del lote es único
+    stats = batch._worker_models[(32, 18, first['backend'])].cache_stats()
+    assert stats['entries'] == 0 and stats['bytes'] == 0
+
+    # Interrupción simulada: el último mapa quedó sin registrar (línea cortada)
+    manifest = os.path.join(out_dir, batch.MANIFEST_NAME)
+    with open(manifest, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(manifest, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:20])
+    missing = json.loads(lines[-1])['id']
+
+    counts = batch.run_batch(items, out_dir, formats=('npy',), workers=1, log=logs.append)
+    assert counts == {'total': 3, 'skipped': 2, 'ok': 1, 'errors': 0}
+    assert set(batch.load_manifest(out_dir)) == {item['id'] for item in items}
+    assert os.path.isfile(os.path.join(out_dir, f'{missing}.npy'))
@@ -0,0 +1,75 @@
+import importlib
+import os
+import sys
+import numpy as np
+import pytest
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+pytest.importorskip("contourpy")
+
+
+def _cone(width=90, height=70, cx=40.0, cy=30.0):
+    ii, jj = np.meshgrid(np.arange(width), np.arange(height), indexing='ij')
+    return (50.0 - np.hypot(ii - cx, jj - cy)).astype(np.float32)
+
+
+def test_extract_contours_all_levels_in_one_pass():
+    contours = importlib.import_module('view.contours')
+    contours.clear_contour_cache()
+    terrain = _cone()
+    levels = [30.0, 40.0, 45.0]
+
+    result = contours.extract_contours(terrain, levels)
+
+    assert len(result) == len(levels)
+    for level, polylines in zip(levels, result):
+        # Cono: cada nivel es una circunferencia de radio 50 - nivel en (x, y)
+        assert len(polylines) == 1
+        xyz = polylines[0]
+        assert np.allclose(xyz[:, 2], level)
+        radius = np.hypot(xyz[:, 0] - 40.0, xyz[:, 1] - 30.0)
+        assert np.allclose(radius, 50.0 - level, atol=0.1)
+
+
+def test_extract_contours_is_cached_per_heightmap_and_levels():
+    contours = importlib.import_module('view.contours')
+    contours.clear_contour_cache()
+    terrain = _cone()
+
+    first = contours.extract_contours(terrain, [35.0, 42.0])
+    assert contours.extract_contours(terrain.copy(), np.array([35.0, 42.0])) is first
+    assert contours.extract_contours(terrain, [35.0]) is not first
+
+    changed = terrain.copy()
+    changed[0, 0] += 1.0
+    assert contours.extract_contours(changed, [35.0, 42.0]) is not first
+    assert not first[0][0].flags.writeable
+
+
+def test_merged_mode_draws_at_most_two_collections():
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    vis = importlib.import_module('view.visualization')
+    terrain = _cone()
+    levels = np.linspace(10.0, 45.0, 30)
+
+    fig = plt.figure()
+    try:
+        ax = fig.add_subplot(111, projection='3d')
+        vis._draw_contour_levels(ax, terrain, levels, '#ff7825', linewidth=1.0, alpha=0.8,
+                                 sea_level=25.0, mode='merged')
+        gids = sorted(c.get_gid() for c in ax.collections)
+        assert gids == ['TerrainContour_dashed', 'TerrainContour_solid']
+
+        ax.clear()
+        vis._draw_contour_levels(ax, terrain, levels, '#ff7825', linewidth=1.0, alpha=0.8,
+                                 sea_level=25.0, mode='per_level')
+        assert len(ax.collections) == len(levels)
+    finally:
+        plt.close(fig)
@@ -0,0 +1,41 @@
+import importlib
+import os
+import sys
+from multiprocessing import shared_memory
+
+import pytest
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def test_export_jobs_run_in_pool_with_reserved_paths_and_progress(tmp_path, small_generator, visual_params):
+    jobs_module = importlib.import_module('view.export_jobs')
+    gen = small_generator
+
+    manager = jobs_module.ExportJobManager(max_workers=2)
+    try:
+        target = str(tmp_path / 'mapa.png')
+        # Mismo destino dos veces: cada trabajo reserva su propio archivo
+        first = manager.submit(gen, visual_params, fmt='png', save_path=target)
+        shm_names = [manager._shm[first].name]
+        second = manager.submit(gen, visual_params, fmt='png', save_path=target)
+        assert manager.wait(first, timeout=120) and manager.wait(second, timeout=120)
+
+        statuses = [manager.status(job_id) for job_id in (first, second)]
+        assert [s['status'] for s in statuses] == ['done', 'done']
+        assert all(s['progress'] == 1.0 for s in statuses)
+        paths = [s['path'] for s in statuses]
+        assert paths == [target, str(tmp_path / 'mapa (1).png')]
+        assert all(os.path.getsize(p) > 0 for p in paths)
+
+        # La memoria compartida se libera al terminar cada trabajo
+        for name in shm_names:
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+        assert manager.status('nope')['status'] == 'unknown'
+    finally:
+        manager.close()
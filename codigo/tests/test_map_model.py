@@ -0,0 +1,167 @@
+import importlib
+import os
+import sys
+import numpy as np
+import pytest
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+pytest.importorskip("scipy")
+
+
+def test_generate_reuses_cached_heightmap():
+    map_model = importlib.import_module('model.map_model')
+    model = map_model.MapModel(width=64, height=36)
+
+    first = model.generate()
+    model.update_terrain_params(seed=7)
+    other = model.generate()
+    model.update_terrain_params(seed=42)
+    again = model.generate()
+
+    stats = model.cache_stats()
+    assert stats['misses'] == 2 and stats['hits'] == 1
+    assert again is first
+    assert not np.array_equal(first, other)
+    # Los valores cacheados no se pueden modificar por accidente
+    with pytest.raises(ValueError):
+        again += 1.0
+
+
+def test_cache_key_follows_the_resolved_backend_and_tiling(monkeypatch):
+    config = importlib.import_module('controller.config')
+    map_model = importlib.import_module('model.map_model')
+    model = map_model.MapModel(width=64, height=36)
+    monkeypatch.setattr(config, 'NOISE_BACKEND', 'fbm')
+    monkeypatch.setattr(config, 'TILED_MIN_PIXELS', None)
+    untiled = model.generate()
+
+    # Teselado y no teselado dan mapas distintos para la misma semilla
+    monkeypatch.setattr(config, 'TILED_MIN_PIXELS', 1)
+    tiled = model.generate(force=True)
+    assert model.cache_stats()['hits'] == 0
+    assert not np.array_equal(untiled, tiled)
+    monkeypatch.setattr(config, 'TILE_NOISE_BLOCK', 64)
+    model.generate(force=True)
+    assert model.cache_stats()['hits'] == 0
+
+    # Perlin rebajado a fBm por PERLIN_MAX_PIXELS: el acierto restaura last_backend
+    monkeypatch.setattr(config, 'TILED_MIN_PIXELS', None)
+    monkeypatch.setattr(config, 'NOISE_BACKEND', 'perlin')
+    monkeypatch.setattr(config, 'PERLIN_MAX_PIXELS', 100)
+    assert model.generate(force=True) is untiled
+    assert model.generator.last_backend == 'fbm'
+    monkeypatch.setattr(config, 'PERLIN_MAX_PIXELS', None)
+    model.generate(force=True)
+    assert model.generator.last_backend == 'perlin'
+    monkeypatch.setattr(config, 'NOISE_BACKEND', 'fbm')
+    assert model.generate(force=True) is untiled
+    assert model.generator.last_backend == 'fbm'
+
+
+def test_heightmap_cache_eviction_and_disk_tier(tmp_path):
+    cache_module = importlib.import_module('model.heightmap_cache')
+    hm = np.ones((32, 32), dtype=np.float32)
+    cache = cache_module.HeightmapCache(max_bytes=2 * hm.nbytes, disk_dir=str(tmp_path))
+
+    keys = [cache.make_key(seed=s, crater_enabled=False, num_craters=3) for s in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, hm * i)
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 2
+    # El crater se ignora si está desactivado
+    assert keys[0] == cache.make_key(seed=0.0, crater_enabled=False, num_craters=9)
+
+    # Una instancia nueva recupera la entrada desalojada desde disco
+    fresh = cache_module.HeightmapCache(max_bytes=2 * hm.nbytes, disk_dir=str(tmp_path))
+    restored = fresh.get(keys[0])
+    assert restored is not None and np.array_equal(restored, hm * 0)
+    assert fresh.stats()['disk_hits'] == 1
+    assert fresh.get('missing') is None and fresh.stats()['misses'] == 1
+
+
+def test_imported_heightmap_becomes_the_model_terrain():
+    map_model = importlib.import_module('model.map_model')
+    model = map_model.MapModel(width=64, height=36)
+    model.generate()
+
+    # Importación cruda sin normalizar: vista traspuesta de solo lectura sobre el buffer
+    body = bytearray(np.arange(40 * 30, dtype='<f4').tobytes())
+    model.generator.set_heightmap_bytes(body, 'f32', width=40, height=30, normalize=False)
+    hm = model.install_heightmap(model.generator.terrain)
+
+    assert model.heightmap is hm and model.generator.terrain is hm
+    assert hm.shape == (40, 30) and hm.dtype == np.float32 and hm.flags['C_CONTIGUOUS']
+    assert not np.shares_memory(hm, np.frombuffer(body, dtype='<f4'))
+    assert not model.terrain_dirty and model.generate() is hm
+
+    # Un cambio de parámetros vuelve a generar con el tamaño importado
+    model.update_terrain_params(seed=9)
+    assert model.generate().shape == (40, 30) and model.heightmap is not hm
+
+
+def test_visual_updates_do_not_regenerate_terrain(monkeypatch):
+    map_model = importlib.import_module('model.map_model')
+    map_controller = importlib.import_module('controller.map_controller')
+    model = map_model.MapModel(width=64, height=36)
+    controller = map_controller.MapController(model)
+
+    calls = []
+    original = model.generator.generate_terrain
+    monkeypatch.setattr(model.generator, 'generate_terrain',
+                        lambda **kw: (calls.append(kw), original(**kw))[1])
+
+    assert controller.initialize_map()['ok']
+    assert len(calls) == 1 and not model.terrain_dirty
+
+    assert controller.handle_visual_update(line_color='#00ff00', num_contour_levels=30)['ok']
+    # Reenviar los mismos valores de terreno tampoco ensucia el modelo
+    assert controller.handle_terrain_update(seed=model.terrain_params['seed'])['ok']
+    assert len(calls) == 1
+
+    assert controller.handle_crater_update(enabled=True)['ok']
+    assert len(calls) == 2 and not model.terrain_dirty
+
+
+def test_progressive_update_drafts_then_generates_or_cancels(monkeypatch):
+    map_model = importlib.import_module('model.map_model')
+    map_controller = importlib.import_module('controller.map_controller')
+    monkeypatch.setitem(map_controller.RENDER_CONFIG, 'progressive_min_pixels', 10_000)
+    monkeypatch.setitem(map_controller.RENDER_CONFIG, 'draft_max_pixels', 1_000)
+    monkeypatch.setitem(map_controller.RENDER_CONFIG, 'draft_min_seconds', 0)
+    controller = map_controller.MapController(map_model.MapModel(width=160, height=90))
+    assert controller.draft_factor() == 4
+
+    drafts = []
+    result = controller.handle_update({'terrain': {'seed': 11}}, on_draft=drafts.append)
+    assert result['ok'] and not result.get('cancelled')
+    assert [(d.width, d.height) for d in drafts] == [(40, 23)]
+    assert not controller.model.terrain_dirty
+
+    # Cancelado tras el borrador: el terreno completo queda pendiente
+    result = controller.handle_update({'terrain': {'seed': 12}}, on_draft=lambda draft: False)
+    assert result == {'ok': True, 'cancelled': True}
+    assert controller.model.terrain_dirty
+
+    # Solo cambios visuales: sin borrador
+    controller.model.generate()
+    drafts.clear()
+    controller.handle_update({'visual': {'azimuth_angle': 30}}, on_draft=drafts.append)
+    assert drafts == []
+
+    # Volver a una semilla ya generada: el heightmap sale de la caché, sin borrador
+    result = controller.handle_update({'terrain': {'seed': 11}}, on_draft=drafts.append)
+    assert result['ok'] and drafts == []
+    assert controller.model._cache.stats()['hits'] == 1
+
+    # Generación completa más rápida que draft_min_seconds: el borrador solo la retrasaría
+    assert controller.model.expected_generate_seconds() < 60
+    monkeypatch.setitem(map_controller.RENDER_CONFIG, 'draft_min_seconds', 60)
+    assert controller.draft_factor() == 1
+    result = controller.handle_update({'terrain': {'seed': 13}}, on_draft=drafts.append)
+    assert result['ok'] and drafts == [] and not controller.model.terrain_dirty
@@ -0,0 +1,174 @@
+import importlib
+import os
+import sys
+import threading
+import pytest
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+matplotlib = pytest.importorskip("matplotlib")
+matplotlib.use('Agg')
+
+
+@pytest.fixture
+def scene():
+    config = importlib.import_module('controller.config')
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    gen = terrain_module.TopographicMapGenerator(width=80, height=50)
+    gen.generate_terrain(terrain_roughness=40, height_variation=6.0, seed=3, crater_enabled=False,
+                         num_craters=0, crater_size=0.5, crater_depth=0.5)
+    return gen, dict(config.VISUAL_PARAMS, num_contour_levels=12)
+
+
+def test_preview_renderer_only_rebuilds_changed_artists(scene, tmp_path):
+    vis = importlib.import_module('view.visualization')
+    gen, visual = scene
+    renderer = vis.PreviewRenderer(figsize=(4, 3), dpi=50)
+    out = str(tmp_path / 'preview.png')
+
+    renderer.render(gen, visual, out)
+    fig, contours = renderer.fig, list(renderer._artists['contours'])
+    style = list(renderer._artists['style'])
+    assert os.path.getsize(out) > 0 and contours
+
+    # Solo cámara: mismos artistas y misma figura
+    renderer.render(gen, dict(visual, azimuth_angle=120, elevation_angle=30), out)
+    assert renderer.fig is fig
+    assert renderer._artists['contours'] == contours
+    assert renderer._artists['style'] == style
+
+    # Niveles distintos: se rehacen los contornos, sin acumular artistas
+    n_collections = len(renderer.ax.collections)
+    renderer.render(gen, dict(visual, num_contour_levels=20), out)
+    assert renderer._artists['contours'] != contours
+    assert len(renderer.ax.collections) == n_collections
+
+
+def test_preview_structure_and_box_are_cached_collections(scene, tmp_path):
+    vis = importlib.import_module('view.visualization')
+    projection = importlib.import_module('view.projection')
+    gen, visual = scene
+    renderer = vis.PreviewRenderer(figsize=(4, 3), dpi=50)
+    out = str(tmp_path / 'preview.png')
+
+    renderer.render(gen, dict(visual, show_axis_labels=True), out)
+    structure, style = renderer._artists['structure'], renderer._artists['style']
+    # Soportes, base y perímetro (un estilo cada uno) y la caja de límites
+    assert len(structure) == 3 and len(style) == 1
+    assert not renderer.ax.lines
+    cached = structure + style
+    assert all(isinstance(a, projection.CachedLine3DCollection) for a in cached)
+
+    # Repetir una vista ya vista no vuelve a proyectar
+    renderer.render(gen, dict(visual, azimuth_angle=120), out)
+    counts = [a.projections for a in cached]
+    renderer.render(gen, dict(visual, azimuth_angle=120), out)
+    assert [a.projections for a in cached] == counts
+
+
+def test_preview_renderer_is_thread_safe(scene, tmp_path):
+    vis = importlib.import_module('view.visualization')
+    gen, visual = scene
+    renderer = vis.PreviewRenderer(figsize=(4, 3), dpi=50)
+    errors = []
+
+    def worker(k):
+        try:
+            renderer.render(gen, dict(visual, azimuth_angle=30 * k), str(tmp_path / f'p{k}.png'))
+        except Exception as e:  # pragma: no cover - se reporta abajo
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert all(os.path.getsize(tmp_path / f'p{k}.png') > 0 for k in range(4))
+
+
+def test_cached_collection_projects_once_per_view():
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection
+    projection = importlib.import_module('view.projection')
+
+    rng = np.random.default_rng(1)
+    lines = [rng.random((n, 3)) * 10 for n in (5, 9, 2)]
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    cached = projection.CachedLine3DCollection(lines)
+    reference = Line3DCollection(lines)
+    ax.add_collection3d(cached)
+    ax.add_collection3d(reference)
+
+    fig.canvas.draw()
+    fig.canvas.draw()
+    assert cached.projections == 1
+    for a, b in zip(cached.get_segments(), reference.get_segments()):
+        assert np.allclose(a, b)
+
+    ax.view_init(elev=10, azim=80)
+    fig.canvas.draw()
+    ax.view_init(elev=30, azim=-60)  # vista por defecto: ya memorizada
+    fig.canvas.draw()
+    assert cached.projections == 2
+
+
+def test_raster_backend_draws_same_scene_without_mplot3d(scene, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    np = pytest.importorskip("numpy")
+    vis = importlib.import_module('view.visualization')
+    raster = importlib.import_module('view.raster_preview')
+    gen, visual = scene
+    renderer = raster.RasterPreviewRenderer(figsize=(4, 3), dpi=50)
+    out = str(tmp_path / 'raster.png')
+
+    png = renderer.render(gen, visual, out)
+    with open(out, 'rb') as f:
+        assert f.read() == png
+    img = np.asarray(Image.open(out).convert('RGB'))
+    assert img.shape[2] == 3 and img.size > 0
+    # Fondo negro y trazos del color de línea (naranja por defecto)
+    assert tuple(img[0, 0]) == (0, 0, 0)
+    assert (img[..., 0] > 150).any()
+
+    # Solo cámara: la geometría 3D empaquetada se reutiliza
+    geometry = renderer._geometry
+    renderer.render(gen, dict(visual, azimuth_angle=120, elevation_angle=30))
+    assert renderer._geometry is geometry
+    renderer.render(gen, dict(visual, num_contour_levels=5))
+    assert renderer._geometry is not geometry
+
+    assert vis.export_preview_image(gen, visual, out, backend='raster') == out
+    with pytest.raises(ValueError):
+        vis.export_preview_image(gen, visual, out, backend='vulkan')
+
+
+def test_preview_bytes_are_stored_in_memory_with_content_etag(scene, tmp_path, monkeypatch):
+    config = importlib.import_module('controller.config')
+    render_module = importlib.import_module('controller.render_controller')
+    store_module = importlib.import_module('view.preview_store')
+    monkeypatch.setitem(config.RENDER_CONFIG, 'preview_backend', 'raster')
+    gen, visual = scene
+    controller = render_module.RenderController()
+    store = store_module.PreviewStore()
+    assert store.get() == (None, None) and store.url() is None
+
+    png = controller.render_preview_bytes(gen, visual)
+    assert png.startswith(b'\x89PNG')
+    etag = store.put(png)
+    assert store.get() == (png, etag)
+    assert store.url() == f'{store_module.PREVIEW_ROUTE}?v={etag}'
+
+    # Mismo contenido => mismo ETag; otra vista => otro ETag
+    assert store.put(controller.render_preview_bytes(gen, visual)) == etag
+    assert store.put(controller.render_preview_bytes(gen, dict(visual, azimuth_angle=10))) != etag
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,127 @@
+import importlib
+import os
+import sys
+import threading
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def test_scheduler_coalesces_pending_updates_and_publishes_in_order():
+    scheduler_module = importlib.import_module('view.render_scheduler')
+    started, release = threading.Event(), threading.Event()
+    rendered, published = [], []
+
+    def render(job):
+        rendered.append(job.params['value'])
+        started.set()
+        release.wait(5)
+        return {'value': job.params['value']}
+
+    def publish(result, job):
+        published.append((result['value'], job.seq, job.superseded()))
+
+    scheduler = scheduler_module.RenderScheduler(render, publish)
+    try:
+        assert scheduler.submit({'value': 1}) == 1
+        assert started.wait(5)
+        # Ráfaga mientras el primer render sigue en curso: solo sobrevive el último
+        for value in (2, 3, 4):
+            scheduler.submit({'value': value})
+        release.set()
+        assert scheduler.wait_idle(5)
+    finally:
+        scheduler.close(5)
+
+    assert rendered == [1, 4]
+    assert published == [(1, 1, True), (4, 4, False)]
+    assert (scheduler.submitted, scheduler.dropped, scheduler.completed) == (4, 2, 2)
+
+
+def test_scheduler_survives_render_errors():
+    scheduler_module = importlib.import_module('view.render_scheduler')
+    published = []
+
+    def render(job):
+        if job.params == 'boom':
+            raise RuntimeError('boom')
+        return job.params
+
+    scheduler = scheduler_module.RenderScheduler(render, lambda result, job: published.append(result))
+    try:
+        scheduler.submit('boom')
+        assert scheduler.wait_idle(5)
+        scheduler.submit('ok')
+        assert scheduler.wait_idle(5)
+    finally:
+        scheduler.close(5)
+    assert published == ['ok']
+
+
+def test_exclusive_work_waits_off_the_gevent_hub_and_supersedes_older_jobs():
+    gevent = importlib.import_module('gevent')
+    scheduler_module = importlib.import_module('view.render_scheduler')
+    started, release = threading.Event(), threading.Event()
+    published = []
+
+    def render(job):
+        started.set()
+        release.wait(5)
+        return job.params
+
+    scheduler = scheduler_module.RenderScheduler(render, lambda result, job: published.append((result, job.superseded())))
+    try:
+        scheduler.submit('slider')
+        assert started.wait(5)
+        scheduler.submit('pendiente')
+        hub = gevent.get_hub()
+        exclusive = gevent.spawn(hub.threadpool.apply, scheduler.run_exclusive, (lambda: 'semilla',))
+        # El render retiene el lock, pero el bucle de gevent sigue atendiendo a otros greenlets
+        ticks = gevent.spawn(lambda: [gevent.sleep(0.01) for _ in range(5)])
+        ticks.join(timeout=2)
+        assert ticks.ready()
+        assert not exclusive.ready()
+        release.set()
+        assert exclusive.get(timeout=5) == (3, 'semilla')
+        assert scheduler.wait_idle(5)
+    finally:
+        scheduler.close(5)
+
+    # El render en curso quedó obsoleto y el pendiente (más antiguo) se descartó
+    assert published == [('slider', True)]
+    assert scheduler.dropped == 1
+
+
+def test_read_waits_for_the_render_without_dropping_pending_updates():
+    gevent = importlib.import_module('gevent')
+    scheduler_module = importlib.import_module('view.render_scheduler')
+    started, release = threading.Event(), threading.Event()
+    published = []
+
+    def render(job):
+        started.set()
+        release.wait(5)
+        return job.params
+
+    scheduler = scheduler_module.RenderScheduler(render, lambda result, job: published.append(result))
+    try:
+        scheduler.submit('slider')
+        assert started.wait(5)
+        scheduler.submit('pendiente')
+        hub = gevent.get_hub()
+        reader = gevent.spawn(hub.threadpool.apply, scheduler.read, (lambda: 'lectura',))
+        gevent.sleep(0.05)
+        # La lectura espera al render en curso (nunca ve un modelo a medias)
+        assert not reader.ready()
+        release.set()
+        assert reader.get(timeout=5) == 'lectura'
+        assert scheduler.wait_idle(5)
+    finally:
+        scheduler.close(5)
+
+    # La cola sigue intacta: ambos trabajos se publican
+    assert published == ['slider', 'pendiente']
+    assert scheduler.dropped == 0
@@ -0,0 +1,90 @@
+import importlib
+import os
+import re
+import sys
+
+import numpy as np
+from lxml import etree
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+
+
+def test_matplotlib_svg_export_is_parsed_once_and_keeps_layers(tmp_path, monkeypatch, small_generator,
+                                                               visual_params):
+    visualization = importlib.import_module('view.visualization')
+    svg_writer = importlib.import_module('view.svg_writer')
+    optimizer_module = importlib.import_module('utils.svg_optimizer')
+
+    gen = small_generator
+    parses = []
+    real_parse = optimizer_module.etree.parse
+    monkeypatch.setattr(optimizer_module.etree, 'parse', lambda *a, **k: parses.append(a) or real_parse(*a, **k))
+
+    target = str(tmp_path / 'mapa.svg')
+    assert visualization.export_map_clean(gen, visual_params, fmt='svg', save_path=target, svg_backend='matplotlib')
+    assert len(parses) == 1
+    assert os.listdir(tmp_path) == ['mapa.svg']
+
+    root = etree.parse(target).getroot()
+    assert root.tag == SVG_NS + 'svg'
+    ids = {g.get('id') for g in root.iter(SVG_NS + 'g')}
+    assert {'Terrain Render', 'Grid', 'Terrain', 'Terrain Lines', 'Terrain Cake'} <= ids
+    params = {p.get('name'): p.get('value') for p in root.iter('{*}param')}
+    assert params == svg_writer.svg_metadata_params(visual_params)
+
+
+def _absolute_points(d):
+    """Decodifica un path relativo m/l/z (salida compactada) a subtrayectos absolutos"""
+    subpaths, current, start = [], np.zeros(2), np.zeros(2)
+    for cmd, args in re.findall(r'([MmLlZz])([^MmLlZz]*)', d):
+        values = np.array(re.findall(r'-?\d*\.?\d+', args), dtype=float).reshape(-1, 2)
+        if cmd in 'Zz':
+            current = start.copy()
+            continue
+        for k, xy in enumerate(values):
+            current = xy.copy() if cmd == 'M' else current + xy
+            if k == 0 and cmd in 'Mm':
+                start = current.copy()
+                subpaths.append([current])
+            else:
+                subpaths[-1].append(current)
+    return [np.array(points) for points in subpaths]
+
+
+def test_path_compaction_quantizes_relative_commands_and_simplifies():
+    optimizer_module = importlib.import_module('utils.svg_optimizer')
+
+    rng = np.random.default_rng(3)
+    line = np.cumsum(rng.normal(size=(200, 2)), axis=0) * 7.3 + 500
+    d = ' '.join(['M %f %f ' % tuple(line[0])] + ['L %f %f ' % tuple(p) for p in line[1:]])
+    d += ' M 10.004 20.006 L 30.5 20.006 L 30.5 40.25 z'
+    points, starts, closed = optimizer_module.parse_line_path(d)
+    assert starts.tolist() == [0, 200] and closed.tolist() == [False, True]
+
+    compact, written = optimizer_module.format_line_path(points, starts, closed, precision=2)
+    assert compact.startswith('M') and 'L' not in compact and compact.endswith('z')
+    assert written == 203 and len(compact) < len(d) / 2
+    decoded = _absolute_points(compact)
+    # Redondeo de absolutos antes de los deltas: error acotado en todo el path
+    assert np.abs(decoded[0] - line).max() <= 0.005 + 1e-9
+    assert np.allclose(decoded[1], [[10.0, 20.01], [30.5, 20.01], [30.5, 40.25]])
+
+    simple, kept = optimizer_module.format_line_path(points, starts, closed, precision=2, tolerance=2.0)
+    assert kept < written
+    decoded = _absolute_points(simple)[0]
+    assert np.allclose(decoded[[0, -1]], line[[0, -1]], atol=0.005)
+    # Douglas-Peucker: todo vértice original queda a <= tolerancia de la polilínea simplificada
+    a, b = decoded[:-1], decoded[1:]
+    ab = b - a
+    t = np.clip(np.einsum('ijk,jk->ij', line[:, None] - a, ab) / np.maximum((ab ** 2).sum(1), 1e-12), 0, 1)
+    nearest = a + t[..., None] * ab
+    assert np.linalg.norm(line[:, None] - nearest, axis=2).min(axis=1).max() <= 2.0 + 0.01
+
+    # Curvas (glifos) no se tocan
+    assert optimizer_module.parse_line_path('M 0 0 Q 1 1 2 0 z') is None
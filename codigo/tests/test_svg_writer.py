@@ -0,0 +1,107 @@
+import importlib
+import os
+import sys
+
+from lxml import etree
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+SVG_NS = '{http://www.w3.org/2000/svg}'
+
+
+def test_native_svg_has_final_layers_metadata_and_one_path_per_level(tmp_path, small_generator, visual_params):
+    visualization = importlib.import_module('view.visualization')
+    svg_writer = importlib.import_module('view.svg_writer')
+    gen = small_generator
+
+    target = str(tmp_path / 'mapa.svg')
+    assert visualization.export_map_clean(gen, visual_params, fmt='svg', save_path=target, svg_backend='native')
+    root = etree.parse(target).getroot()
+    groups = {g.get('id'): g for g in root.iter(SVG_NS + 'g')}
+    for layer in ('Terrain Render', 'Grid', 'Grid BoundingBox', 'Axis Height Elements',
+                  'Axis Y Elements', 'Axis X Elements', 'Terrain', 'Terrain Lines', 'Terrain Cake'):
+        assert layer in groups
+
+    params = {p.get('name'): p.get('value') for p in root.iter('{*}param')}
+    assert params == svg_writer.svg_metadata_params(visual_params)
+
+    terrain = gen.terrain
+    levels = visualization._compute_levels(float(terrain.min()), float(terrain.max()),
+                                           visual_params['num_contour_levels'])
+    level_ids = [p.get('id') for p in groups['Terrain Lines'].iter(SVG_NS + 'path')
+                 if p.get('id', '').startswith('Level')]
+    assert len(level_ids) == len(set(level_ids)) <= len(levels)
+    assert level_ids
+    assert len(groups['Terrain Cake'].findall(SVG_NS + 'path')) == 5
+    # Etiquetas de ejes como texto editable
+    assert list(root.iter(SVG_NS + 'text'))
+
+    # Sin grilla: solo la capa del terreno
+    bare = svg_writer.write_contour_svg(gen, visual_params, str(tmp_path / 'sin_grilla.svg'), include_grid=False)
+    bare_ids = {g.get('id') for g in etree.parse(bare).getroot().iter(SVG_NS + 'g')}
+    assert 'Grid' not in bare_ids and 'Terrain Lines' in bare_ids
+    assert not list(etree.parse(bare).getroot().iter(SVG_NS + 'text'))
+
+
+def test_number_format_keeps_integer_zeros(small_generator, visual_params):
+    svg_writer = importlib.import_module('view.svg_writer')
+    gen = small_generator
+
+    exact = svg_writer.SVGContourWriter(gen, visual_params, precision=0)
+    assert [exact._fmt(v) for v in (10, 100.4, -0.2, 0, 250.6)] == ['10', '100', '0', '0', '251']
+    fine = svg_writer.SVGContourWriter(gen, visual_params, precision=2)
+    assert [fine._fmt(v) for v in (10, 10.5, 10.004, -0.001)] == ['10', '10.5', '10', '0']
+
+
+def _decode_path(d):
+    """Puntos absolutos de un path M/m/l (comandos relativos tras el primero)"""
+    import re
+    import numpy as np
+    points, current, command, pending = [], np.zeros(2), None, []
+    for token in re.findall(r'[Mml]|-?\d+(?:\.\d+)?', d):
+        if token in 'Mml':
+            command = token
+            continue
+        pending.append(float(token))
+        if len(pending) == 2:
+            delta = np.array(pending)
+            current = delta if command == 'M' else current + delta
+            points.append(current)
+            pending = []
+    return np.array(points)
+
+
+def test_native_paths_are_relative_quantized_and_simplified(small_generator, visual_params):
+    import io
+    import numpy as np
+    svg_writer = importlib.import_module('view.svg_writer')
+    gen = small_generator
+
+    writer = svg_writer.SVGContourWriter(gen, visual_params, precision=2)
+    scene = writer._build_scene()
+    out = io.StringIO()
+    writer._emit(out, scene)
+    full = out.getvalue()
+    root = etree.fromstring(full.encode('utf-8'))
+    paths = {p.get('id'): p.get('d') for p in root.iter(SVG_NS + 'path') if p.get('id')}
+
+    level, _, lines = scene['levels'][0]
+    d = paths[f'Level {level:g}']
+    assert 'L' not in d and ',' not in d
+    # Mismos vértices que la escena proyectada (salvo repetidos tras cuantizar), a 0.01 pt
+    ox, oy = writer._origin
+    expected = np.concatenate(lines)
+    expected = np.column_stack([expected[:, 0] - ox, writer._fig_height - expected[:, 1] - oy])
+    decoded = _decode_path(d)
+    assert len(decoded) <= len(expected)
+    dist = np.abs(decoded[:, None, :] - expected[None, :, :]).max(axis=2).min(axis=1)
+    assert dist.max() <= 0.0051
+
+    simple = svg_writer.SVGContourWriter(gen, visual_params, precision=2, simplify_tolerance=1.0)
+    out = io.StringIO()
+    simple._emit(out, simple._build_scene())
+    assert len(out.getvalue()) < len(full)
@@ -0,0 +1,325 @@
+import importlib
+import os
+import sys
+import numpy as np
+import pytest
+
+# Fallback to add <project_root>/src to sys.path for static analyzers and direct runs
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+pytest.importorskip("scipy")
+
+BASE_PARAMS = {
+    'terrain_roughness': 50,
+    'height_variation': 5.0,
+    'seed': 42,
+    'crater_enabled': False,
+    'num_craters': 0,
+    'crater_size': 0.5,
+    'crater_depth': 0.5,
+}
+
+
+def _scalar_perlin(noise, x, y):
+    """Referencia escalar (una celda) del Perlin 2D clásico."""
+    fade = lambda t: t * t * t * (t * (t * 6 - 15) + 10)
+    gx = [1, -1, 1, -1, 1, -1, 0, 0]
+    gy = [1, 1, -1, -1, 0, 0, 1, -1]
+    xi, yi = int(np.floor(x)), int(np.floor(y))
+    dx, dy = x - xi, y - yi
+    p = noise.perm
+
+    def grad(ix, iy, ddx, ddy):
+        h = p[p[ix & 255] + (iy & 255)] & 7
+        return gx[h] * ddx + gy[h] * ddy
+
+    u, v = fade(dx), fade(dy)
+    n00 = grad(xi, yi, dx, dy)
+    n10 = grad(xi + 1, yi, dx - 1, dy)
+    n01 = grad(xi, yi + 1, dx, dy - 1)
+    n11 = grad(xi + 1, yi + 1, dx - 1, dy - 1)
+    nx0 = n00 + u * (n10 - n00)
+    nx1 = n01 + u * (n11 - n01)
+    return nx0 + v * (nx1 - nx0)
+
+
+def test_perlin_vectorized_matches_scalar_reference():
+    perlin = importlib.import_module('controller.perlin_noise')
+    noise = perlin.PerlinNoise(1234)
+    xs = np.linspace(3.1, 17.9, 23)
+    for ys in (np.linspace(0.2, 9.7, 19), np.linspace(0.2, 400.5, 700)):
+        grid = noise.noise2(xs, ys)
+        assert grid.shape == (len(xs), len(ys))
+        for i in (0, 7, 22):
+            for j in (0, 5, len(ys) - 1):
+                assert grid[i, j] == pytest.approx(_scalar_perlin(noise, xs[i], ys[j]), abs=1e-5)
+
+
+def test_perlin_backend_deterministic_and_no_auto_switch(monkeypatch):
+    config = importlib.import_module('controller.config')
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    monkeypatch.setattr(config, 'NOISE_BACKEND', 'perlin', raising=False)
+
+    gen = terrain_module.TopographicMapGenerator(width=640, height=360)
+    gen.generate_terrain(**BASE_PARAMS)
+    first = gen.terrain.copy()
+    gen.generate_terrain(**BASE_PARAMS)
+
+    assert gen.last_backend == 'perlin'
+    assert np.array_equal(first, gen.terrain)
+    assert float(np.ptp(first)) > 0.0
+
+    gen.generate_terrain(**dict(BASE_PARAMS, seed=43))
+    assert not np.array_equal(first, gen.terrain)
+
+
+def test_tiled_generation_is_seamless_and_uses_out(monkeypatch, tmp_path):
+    config = importlib.import_module('controller.config')
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    params = dict(BASE_PARAMS, terrain_roughness=30)
+    gen = terrain_module.TopographicMapGenerator(width=300, height=200)
+
+    monkeypatch.setattr(config, 'TILE_SIZE', 512, raising=False)
+    gen.generate_terrain(**params, tiled=True)
+    single_tile = gen.terrain.copy()
+
+    # Teselas pequeñas con halo: mismo resultado bit a bit, sin costuras
+    monkeypatch.setattr(config, 'TILE_SIZE', 64, raising=False)
+    out = np.lib.format.open_memmap(str(tmp_path / 'hm.npy'), mode='w+', dtype=np.float32, shape=(300, 200))
+    gen.generate_terrain(**params, out=out)
+
+    assert gen.terrain is out
+    assert np.array_equal(single_tile, np.asarray(out))
+    assert float(out.min()) == pytest.approx(20.0)
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parallel_fbm_is_bit_identical_for_any_worker_count(monkeypatch, executor):
+    config = importlib.import_module('controller.config')
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    monkeypatch.setattr(config, 'FBM_EXECUTOR', executor, raising=False)
+    monkeypatch.setattr(config, 'TILE_SIZE', 64, raising=False)
+    params = dict(BASE_PARAMS, terrain_roughness=80)
+
+    results = {}
+    for workers in (None, 3):
+        monkeypatch.setattr(config, 'FBM_WORKERS', workers, raising=False)
+        for tiled in (False, True):
+            # Generador nuevo: sin etapas memorizadas de la iteración anterior
+            gen = terrain_module.TopographicMapGenerator(width=160, height=90)
+            gen.generate_terrain(**params, tiled=tiled)
+            results[(workers, tiled)] = gen.terrain.copy()
+
+    assert np.array_equal(results[(None, False)], results[(3, False)])
+    assert np.array_equal(results[(None, True)], results[(3, True)])
+
+
+def test_parallel_map_reuses_one_pool_and_bounds_in_flight_jobs(monkeypatch):
+    config = importlib.import_module('controller.config')
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    monkeypatch.setattr(config, 'FBM_EXECUTOR', 'thread', raising=False)
+
+    started = []
+    def square(job):
+        started.append(job)
+        return job * job
+
+    results = terrain_module._parallel_map(square, list(range(20)), 2)
+    assert next(results) == 0
+    # Envío acotado: solo 2 * workers trabajos enviados antes del primer resultado
+    assert len(started) <= 4
+    assert list(results) == [job * job for job in range(1, 20)]
+
+    # Un solo pool persistente; si cambia la configuración el anterior sigue
+    # sirviendo a quien aún lo usa
+    with terrain_module._borrow_pool('thread', 2) as pool:
+        assert list(terrain_module._parallel_map(square, [1, 2, 3], 2)) == [1, 4, 9]
+        with terrain_module._borrow_pool('thread', 3) as other:
+            assert other is not pool
+        assert pool.submit(square, 5).result() == 25
+    assert terrain_module._pools['thread'][1] is other
+    terrain_module._shutdown_pools()
+    assert terrain_module._pools == {}
+
+
+def test_spectral_backend_is_selectable_and_deterministic(monkeypatch):
+    config = importlib.import_module('controller.config')
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    monkeypatch.setattr(config, 'NOISE_BACKEND', 'spectral', raising=False)
+    gen = terrain_module.TopographicMapGenerator(width=160, height=90)
+
+    gen.generate_terrain(**BASE_PARAMS)
+    first = gen.terrain.copy()
+    gen.generate_terrain(**BASE_PARAMS)
+
+    assert gen.last_backend == 'spectral'
+    assert first.shape == (160, 90)
+    assert np.array_equal(first, gen.terrain)
+    assert float(first.min()) == pytest.approx(20.0)
+    assert 0.0 < float(np.ptp(first)) <= 2 * 5.0 + 1e-4
+
+    # La síntesis FFT es global: en modo teselado se usa fBm
+    gen.generate_terrain(**BASE_PARAMS, tiled=True)
+    assert gen.last_backend == 'fbm'
+
+
+def test_staged_pipeline_matches_fresh_generation():
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    gen = terrain_module.TopographicMapGenerator(width=200, height=150)
+    gen.generate_terrain(**BASE_PARAMS)
+    assert gen.last_stages == ('noise', 'relief', 'base_height')
+
+    edits = [
+        ({'base_height': 35.0}, ('base_height',)),
+        ({'height_variation': 12.0}, ('relief', 'base_height')),
+        ({'crater_enabled': True, 'num_craters': 4}, ('relief', 'base_height')),
+        ({'seed': 7}, ('noise', 'relief', 'base_height')),
+    ]
+    params = dict(BASE_PARAMS)
+    for change, expected_stages in edits:
+        params.update(change)
+        gen.generate_terrain(**params)
+        assert gen.last_stages == expected_stages
+
+        fresh = terrain_module.TopographicMapGenerator(width=200, height=150)
+        fresh.generate_terrain(**params)
+        assert np.array_equal(gen.terrain, fresh.terrain)
+
+    # Modo teselado (mapas grandes): sin etapas memorizadas, cada llamada regenera
+    gen.generate_terrain(**params, tiled=True)
+    gen.generate_terrain(**dict(params, base_height=40.0), tiled=True)
+    assert gen.last_stages == ('noise', 'relief', 'base_height')
+    assert gen._stages == {}
+
+
+@pytest.mark.parametrize('tiled', [False, True])
+def test_terrain_is_published_only_when_complete(monkeypatch, tiled):
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    gen = terrain_module.TopographicMapGenerator(width=160, height=90)
+    gen.generate_terrain(**BASE_PARAMS, tiled=tiled)
+    previous = gen.terrain
+    seen = []
+    real_craters = gen._apply_craters_visible
+    def craters(*args, **kwargs):
+        # Otro hilo que lea gen.terrain durante la generación ve el mapa anterior
+        seen.append(gen.terrain is previous)
+        return real_craters(*args, **kwargs)
+    monkeypatch.setattr(gen, '_apply_craters_visible', craters)
+
+    params = dict(BASE_PARAMS, seed=8, crater_enabled=True, num_craters=3)
+    gen.generate_terrain(**params, tiled=tiled)
+    assert seen == [True]
+    fresh = terrain_module.TopographicMapGenerator(width=160, height=90)
+    fresh.generate_terrain(**params, tiled=tiled)
+    assert np.array_equal(gen.terrain, fresh.terrain)
+
+
+def _legacy_craters(terrain, num_craters, crater_size, crater_depth, rng):
+    """Referencia: bucle por cráter previo al estampado por lotes."""
+    width, height = terrain.shape
+    relief = float(np.ptp(terrain)) or 1.0
+    amp = (5.0 + relief * 0.35) * np.clip(crater_depth, 0.1, 1.0)
+    R = max(5, min(int(12 + crater_size * 25), min(width, height) // 2 - 2))
+    rim_w = max(2, int(0.25 * R))
+    margin = 6 + R + rim_w
+    for _ in range(num_craters):
+        if width <= 2 * margin or height <= 2 * margin:
+            cx, cy = width // 2, height // 2
+        else:
+            cx = int(rng.integers(margin, width - margin))
+            cy = int(rng.integers(margin, height - margin))
+        ix0, ix1 = max(0, cx - (R + rim_w)), min(width, cx + (R + rim_w) + 1)
+        jy0, jy1 = max(0, cy - (R + rim_w)), min(height, cy + (R + rim_w) + 1)
+        ii, jj = np.ogrid[ix0:ix1, jy0:jy1]
+        r = np.sqrt((ii - cx) ** 2 + (jj - cy) ** 2)
+        profile = np.zeros(r.shape)
+        r0 = 0.65 * R
+        profile[r <= r0] = -amp
+        m = (r > r0) & (r <= R)
+        t = (r[m] - r0) / (R - r0)
+        profile[m] = -amp * (1.0 - (3.0 * t**2 - 2.0 * t**3))
+        m = (r > R) & (r <= R + rim_w)
+        tr = (r[m] - R) / rim_w
+        profile[m] += 0.8 * amp * np.exp(-((tr - 0.35) ** 2) / (2 * 0.15**2))
+        patch = terrain[ix0:ix1, jy0:jy1].copy()
+        baseline = float(patch.mean())
+        mask_all = r <= (R + rim_w)
+        patch[mask_all] = 0.4 * patch[mask_all] + 0.6 * baseline
+        weight = np.clip(1.0 - (r / (R + rim_w)) ** 2, 0.0, 1.0)
+        combined = patch * (1 - 0.85 * weight) + (baseline + profile) * (0.85 * weight)
+        terrain[ix0:ix1, jy0:jy1] = np.where(mask_all, combined, terrain[ix0:ix1, jy0:jy1])
+
+
+@pytest.mark.parametrize('shape, num_craters', [((300, 200), 40), ((60, 50), 3)])
+def test_batched_craters_match_per_crater_loop(shape, num_craters):
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    base = np.random.default_rng(0).random(shape, dtype=np.float32) * 5.0
+    expected = base.copy()
+    _legacy_craters(expected, num_craters, 0.6, 0.7, np.random.default_rng(9))
+
+    gen = terrain_module.TopographicMapGenerator(width=shape[0], height=shape[1])
+    gen.terrain = base.copy()
+    gen._apply_craters_visible(num_craters, 0.6, 0.7, np.random.default_rng(9))
+
+    assert np.allclose(gen.terrain, expected, atol=1e-4)
+
+
+def test_heightmap_binary_matches_flat_viewer_layout():
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    gen = terrain_module.TopographicMapGenerator(width=120, height=80)
+    data, meta = gen.get_heightmap_binary('f32')
+    assert data is None and meta['width'] == 120
+
+    gen.generate_terrain(**BASE_PARAMS)
+    data, meta = gen.get_heightmap_binary('f32')
+    z = np.frombuffer(data, dtype='<f4')
+    # Visor: z[j * width + i] == terrain[i, j]
+    assert np.array_equal(z.reshape(80, 120), gen.terrain.T)
+    assert meta['min'] == pytest.approx(float(gen.terrain.min()))
+
+    data, meta = gen.get_heightmap_binary('u16')
+    q = np.frombuffer(data, dtype='<u2').reshape(80, 120)
+    step = (meta['max'] - meta['min']) / 65535.0
+    assert np.allclose(meta['min'] + q * step, gen.terrain.T, atol=step)
+
+
+def test_heightmap_bytes_round_trip_and_validation():
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    src = terrain_module.TopographicMapGenerator(width=120, height=80)
+    src.generate_terrain(**BASE_PARAMS)
+    data, meta = src.get_heightmap_binary('f32')
+
+    dst = terrain_module.TopographicMapGenerator(width=10, height=10)
+    assert dst.set_heightmap_bytes(data, 'f32', width=120, height=80, normalize=False) == (120, 80)
+    assert np.array_equal(dst.terrain, src.terrain)
+
+    data, _ = src.get_heightmap_binary('u16')
+    dst.set_heightmap_bytes(data, 'u16', width=120, height=80)
+    assert dst.terrain.dtype == np.float32
+    assert float(dst.terrain.min()) == 0.0 and float(dst.terrain.max()) == 1.0
+
+    with pytest.raises(ValueError):
+        dst.set_heightmap_bytes(data, 'u16', width=100, height=80)
+    with pytest.raises(ValueError):
+        dst.set_heightmap_bytes(data, 'u16')
+
+
+@pytest.mark.parametrize('backend, tiled', [('fbm', False), ('fbm', True), ('spectral', False), ('perlin', False)])
+def test_draft_is_low_resolution_version_of_same_terrain(monkeypatch, backend, tiled):
+    config = importlib.import_module('controller.config')
+    terrain_module = importlib.import_module('controller.terrain_generator')
+    monkeypatch.setattr(config, 'NOISE_BACKEND', backend, raising=False)
+    params = dict(BASE_PARAMS, crater_enabled=True, num_craters=3)
+
+    gen = terrain_module.TopographicMapGenerator(width=320, height=180)
+    gen.generate_terrain(**params, tiled=tiled)
+    draft = gen.make_draft(5)  # potencia de 2 inferior: 4
+    assert (draft.width, draft.height, draft.cell_size) == (80, 45, 4)
+    draft.generate_terrain(**params, tiled=tiled)
+
+    coarse = gen.terrain.reshape(80, 4, 45, 4).mean(axis=(1, 3))
+    assert np.corrcoef(coarse.ravel(), draft.terrain.ravel())[0, 1] > 0.95
+    assert float(np.ptp(draft.terrain)) == pytest.approx(float(np.ptp(gen.terrain)), rel=0.15)
@@ -2,6 +2,7 @@
 Launcher script para VISTAR Map Generator
 Ejecuta la aplicación con las rutas correctas configuradas
 Incluye funcionalidad de reinicio automático si hay procesos previos
+`python run.py batch ...` lanza la exportación por lotes (codigo/src/batch.py) sin servidor
 """
 import sys
 import os
@@ -69,6 +70,11 @@ sys.path.insert(0, src_dir)
 from main import main
 
 if __name__ == '__main__':
+    # Modo por lotes sin servidor: python run.py batch --out DIR --seeds 1-100 ...
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+    
     # Verificar y cerrar procesos previos si los hay
     check_and_kill_processes()
     